@@ -0,0 +1,82 @@
+"""Measures memory taken by node trees and garbage collector pauses.
+
+Usage: python benchmarks/bench_nodes.py [groups] [shapes-per-group]
+"""
+
+from __future__ import annotations
+
+import gc
+import io
+import sys
+import time
+import tracemalloc
+
+from typing import Iterator
+
+from pgfgen.svg.nodes import SVGElementNode
+from pgfgen.svg.nodes import SVGNode
+
+
+def make_svg(groups: int, shapes: int) -> str:
+    body = []
+    for g in range(groups):
+        body.append(f'<g id="g{g}" transform="translate({g},0)">')
+        for s in range(shapes):
+            body.append(f'<path d="M 0 {s} L 1 {s} L 1 {s + 1} Z"/>')
+            body.append(f'<circle cx="{s}" cy="{g}" r="0.5"/>')
+        body.append("</g>")
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100">'
+        + "".join(body)
+        + "</svg>"
+    )
+
+
+def build(node: SVGElementNode) -> Iterator[object]:
+    """Builds all the (lazily created) nodes, yields them."""
+    yield node
+    for child in getattr(node, "children", []):
+        yield from build(child)
+    yield from getattr(node, "children_path_segment_nodes", [])
+
+
+def sizeof(obj: object) -> int:
+    """Size of the object itself and its instance dictionary, if any."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main(groups: int = 100, shapes: int = 100) -> None:
+    svg = SVGNode.parse(io.StringIO(make_svg(groups, shapes)))
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = list(build(svg))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    count = len(nodes)
+    own = sum(sizeof(node) for node in nodes)
+    del nodes
+
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(10):
+        gc.collect()
+    pause = (time.perf_counter() - start) / 10
+
+    print(f"nodes:          {count}")
+    print(f"bytes per node: {own / count:.1f} (node objects)")
+    print(f"                {(after - before) / count:.1f} (all allocations)")
+    print(f"gc.collect():   {pause * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    del svg
+    gc.collect()
+    print(f"tree teardown:  {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
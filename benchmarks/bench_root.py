@@ -0,0 +1,59 @@
+"""Measures time taken to find roots of all nodes of deeply nested documents.
+The time per node should stay flat as the nesting gets deeper.
+
+Usage: python benchmarks/bench_root.py [depth ...]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from typing import Any
+
+from svgelements import SVG
+from svgelements import Group
+from svgelements import Path
+
+from pgfgen.svg.nodes import PathNode
+from pgfgen.svg.nodes import SVGNode
+
+
+def make_tree(depth: int) -> SVGNode:
+    """Built directly, as the svgelements parser recurses on nested groups."""
+    svg = SVG()
+    parent: Group = svg
+    for _ in range(depth):
+        group = Group()
+        parent.append(group)
+        parent = group
+    parent.append(Path("M 0 0 L 1 1 L 1 0 Z"))
+    return SVGNode(svg)
+
+
+def chain(node: SVGNode) -> list[Any]:
+    nodes: list[Any] = [node]
+    while not isinstance(nodes[-1], PathNode):
+        nodes.append(nodes[-1].children[0])
+    nodes.extend(nodes[-1].children_path_segment_nodes)
+    return nodes
+
+
+def main(*depths: int) -> None:
+    print(f"{'depth':>8} {'nodes':>8} {'total ms':>10} {'us/node':>8}")
+    for depth in depths or (1000, 2000, 4000, 8000, 16000):
+        svg = make_tree(depth)
+        nodes = chain(svg)
+        # deepest first, the worst case for an uncached walk
+        start = time.perf_counter()
+        for node in reversed(nodes):
+            node.root
+        elapsed = time.perf_counter() - start
+        print(
+            f"{depth:>8} {len(nodes):>8} {elapsed * 1000:>10.2f} "
+            f"{elapsed * 1e6 / len(nodes):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
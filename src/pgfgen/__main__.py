@@ -4,15 +4,49 @@ from __future__ import annotations
 import sys
 from .config import TomlConfigLoader
 from .exceptions import SvgFileNotFound
+from .svg.formatting import parse_length
 from .templating import EnvironmentFactory
 from .templating import SvgFileLoader
 from .types import PGFGenOptions
 from argparse import ArgumentParser
+from argparse import ArgumentTypeError
+from jinja2 import Environment
 from jinja2.exceptions import TemplateNotFound
 from jinja2.loaders import FileSystemLoader
 from typing import Optional
 
 
+def non_negative_int(value: str) -> int:
+    """Argument type of counts, such as the number of jobs."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 0:
+        raise ArgumentTypeError(f"must not be negative: {value!r}")
+    return number
+
+
+def tolerance(value: str) -> float:
+    """Argument type of tolerances, non-negative numbers."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid float value: {value!r}")
+    if not 0 <= number < float("inf"):
+        raise ArgumentTypeError(f"must be a non-negative number: {value!r}")
+    return number
+
+
+def length(value: str) -> str:
+    """Argument type of lengths, such as the PGF unit."""
+    try:
+        parse_length(value)
+    except ValueError as e:
+        raise ArgumentTypeError(str(e))
+    return value
+
+
 class App:
     def __init__(self, config_loader: Optional[TomlConfigLoader] = None):
         self.argument_parser = self.get_argument_parser()
@@ -43,6 +77,53 @@ class App:
         parser.add_argument(
             "--output", "-o", metavar="FILE", type=str, help="output file"
         )
+        parser.add_argument(
+            "--cache-dir",
+            metavar="DIR",
+            type=str,
+            help="directory for caching generated code",
+        )
+        parser.add_argument(
+            "--plan",
+            action="store_true",
+            help="analyze templates before rendering, load only used fragments",
+        )
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            metavar="N",
+            type=non_negative_int,
+            help="parse svg files in N processes (0 for the number of CPUs)",
+        )
+        parser.add_argument(
+            "--optimize",
+            action="store_true",
+            help="strip svg files of data not affecting rendering, report it",
+        )
+        parser.add_argument(
+            "--detach",
+            action="store_true",
+            help="release svgelements objects after parsing, to save memory",
+        )
+        parser.add_argument(
+            "--simplify",
+            metavar="TOLERANCE",
+            type=tolerance,
+            help="remove vertices of paths off by at most TOLERANCE, in PGF "
+            "units, report it",
+        )
+        parser.add_argument(
+            "--curve-tolerance",
+            metavar="TOLERANCE",
+            type=tolerance,
+            help="let --simplify flatten curves off by at most TOLERANCE",
+        )
+        parser.add_argument(
+            "--unit",
+            metavar="LENGTH",
+            type=length,
+            help="write coordinates as absolute dimensions, LENGTH per PGF unit",
+        )
 
     def get_argument_parser(self) -> ArgumentParser:
         parser = ArgumentParser(description="Generate LaTeX/PGF code from template.")
@@ -65,6 +146,20 @@ class App:
                 return None
         return None
 
+    def write_optimizations(self, env: Environment) -> None:
+        """Writes reports of the optimizer on loaded svg files to stderr."""
+        loader = env.globals.get("loadsvg")
+        if isinstance(loader, SvgFileLoader):
+            for name, report in loader.optimizations.items():
+                sys.stderr.write(f"{name}: {report}\n")
+
+    def write_simplifications(self, env: Environment) -> None:
+        """Writes reports of the simplifier on loaded svg files to stderr."""
+        loader = env.globals.get("loadsvg")
+        if isinstance(loader, SvgFileLoader):
+            for name, report in loader.simplifications.items():
+                sys.stderr.write(f"{name}: {report}\n")
+
     def run(self) -> int:
         arguments = self.argument_parser.parse_args()
         config = self.try_load_config_files()
@@ -79,9 +174,10 @@ class App:
         if self.config_loader.has_errors:
             return 1
 
-        env = EnvironmentFactory.create(arguments, config).get_environment()
+        factory = EnvironmentFactory.create(arguments, config)
+        env = factory.get_environment()
         try:
-            pgf = env.get_template(arguments.template).render()
+            pgf = factory.get_template(env, arguments.template).render()
         except TemplateNotFound as e:
             sys.stderr.write(f"error: {str(e)}: template not found")
             if isinstance(env.loader, FileSystemLoader):
@@ -96,6 +192,10 @@ class App:
             sys.stderr.write("\n")
             return 1
 
+        if arguments.optimize:
+            self.write_optimizations(env)
+        self.write_simplifications(env)
+
         if arguments.output is None:
             sys.stdout.write(f"{pgf}\n")
         else:
@@ -0,0 +1,321 @@
+"""Provides caches for parsed SVG documents and generated code"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import os.path
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+from typing import Any
+from typing import Hashable
+from typing import Optional
+
+from . import __version__
+
+from .svg import binary
+from .svg.formatting import EXACT
+from .svg.formatting import NumberFormat
+from .svg.nodes import SVGNode
+from .svg.sources import open_file
+from .svg.sources import source_stat
+
+from .defaults import CODE_CACHE_MAX_BYTES
+from .defaults import PARSE_CACHE_MAX_ENTRIES
+from .defaults import PARSE_CACHE_MAX_SOURCE_BYTES
+
+
+class SvgParseCache:
+    """Memoizes parsed SVG files.
+
+    Entries are keyed by the resolved file path, its modification time and
+    size, and by the arguments passed to the parser, so a file modified on
+    disk is never served from the cache. Least recently used entries get
+    evicted once the entry budget, or the budget of source bytes is
+    exceeded. The latter limits the total size of the parsed files, not the
+    memory taken by parsed trees, which is several times larger. A budget
+    set to ``None`` is unlimited.
+
+    Cached trees are shared, each get() of an entry returns the same root
+    node, so anything set on nodes of a tree (e.g. its svg2pgf_transform)
+    is seen by whoever gets the entry later. Trees are meant to be treated
+    as read-only, a loader with a dedicated cache isolates its trees."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = PARSE_CACHE_MAX_ENTRIES,
+        max_source_bytes: Optional[int] = PARSE_CACHE_MAX_SOURCE_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_source_bytes = max_source_bytes
+        self.hits = 0
+        self.misses = 0
+        self.source_bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[SVGNode, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    @staticmethod
+    def key(file: str, **parse_args: Any) -> Optional[tuple[Hashable, int]]:
+        """Returns a tuple ``(key, size)`` for the given file and parser
+        arguments, or ``None`` if the result of parsing is not cacheable."""
+        if parse_args.get("context") is not None:
+            # the parser appends elements to the context, that is a side
+            # effect we can't replay
+            return None
+        try:
+            (mtime_ns, size) = source_stat(file)
+        except OSError:
+            return None
+        args = tuple(
+            sorted((k, v if v is None else str(v)) for k, v in parse_args.items())
+        )
+        key = (os.path.realpath(file), mtime_ns, size, args)
+        return (key, size)
+
+    def get(self, key: Hashable) -> Optional[SVGNode]:
+        with self._lock:
+            try:
+                node, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return node
+
+    def put(self, key: Hashable, node: SVGNode, size: int) -> None:
+        with self._lock:
+            if self.max_source_bytes is not None and size > self.max_source_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.source_bytes -= previous[1]
+            self._entries[key] = (node, size)
+            self.source_bytes += size
+            self._evict()
+
+    def resize(
+        self,
+        max_entries: Optional[int] = None,
+        max_source_bytes: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_source_bytes = max_source_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.source_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self) -> None:
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (
+                self.max_source_bytes is not None
+                and self.source_bytes > self.max_source_bytes
+            )
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.source_bytes -= size
+
+
+default_parse_cache = SvgParseCache()
+
+
+def source_digest(file: str, **parse_args: Any) -> str:
+    """Hash of file contents and the arguments it gets parsed with."""
+    sha = hashlib.sha256()
+    with open_file(file) as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            sha.update(chunk)
+    for k, v in sorted(parse_args.items()):
+        sha.update(f"\0{k}={v}".encode("utf-8"))
+    return sha.hexdigest()
+
+
+class _FileCache:
+    """Persistent, content-addressed cache of files.
+
+    Entries live in a directory, one file per entry, and get written
+    atomically (to a temporary file renamed over the target), so several
+    processes may share the directory. Once the total size of entries
+    exceeds ``max_bytes``, the least recently used ones get pruned first.
+    Caches with different suffixes may share a directory."""
+
+    SUFFIX = ""
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + self.SUFFIX)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fp:
+                data = fp.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        try:
+            # size of the entry being overwritten, if any
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            (fd, tmp) = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fp:
+                    fp.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            # the cache is an optimization, we don't fail when it's unusable
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._total_size()
+            else:
+                self._bytes += len(data) - replaced
+            if self.max_bytes is not None and self._bytes > self.max_bytes:
+                self._prune(self.max_bytes)
+
+    def prune(self, max_bytes: Optional[int] = None) -> None:
+        """Removes the least recently used entries until the total size of
+        the cache does not exceed ``max_bytes``."""
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        if max_bytes is not None:
+            with self._lock:
+                self._prune(max_bytes)
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _total_size(self) -> int:
+        return sum(size for (_, size, _) in self._entries())
+
+    def _prune(self, max_bytes: int) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for (_, size, _) in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+        self._bytes = total
+
+
+class PgfCodeCache(_FileCache):
+    """Persistent cache of generated PGF code, keyed by digests of sources
+    (see source_digest()), indentation, fragment names, number formats and
+    whether styles are interned."""
+
+    SUFFIX = ".pgf"
+
+    def __init__(
+        self, directory: str, max_bytes: Optional[int] = CODE_CACHE_MAX_BYTES
+    ):
+        super().__init__(directory, max_bytes)
+
+    @staticmethod
+    def key(
+        digest: str,
+        indent: str,
+        fragment: Optional[str] = None,
+        fmt: NumberFormat = EXACT,
+        intern_styles: bool = False,
+    ) -> str:
+        sha = hashlib.sha256()
+        for item in (__version__, digest, indent, fragment, fmt, intern_styles):
+            sha.update(f"{item!r}\0".encode("utf-8"))
+        return sha.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        data = self._read(key)
+        if data is None:
+            return None
+        return data.decode("utf-8")
+
+    def put(self, key: str, code: str) -> None:
+        self._write(key, code.encode("utf-8"))
+
+
+class SvgTreeCache(_FileCache):
+    """Persistent cache of parsed SVG documents, serialized in the compact
+    binary format (see svg.binary), keyed by digests of sources. Restoring
+    a tree is much cheaper than parsing the document again."""
+
+    SUFFIX = ".tree"
+
+    def __init__(
+        self, directory: str, max_bytes: Optional[int] = CODE_CACHE_MAX_BYTES
+    ):
+        super().__init__(directory, max_bytes)
+
+    @staticmethod
+    def key(digest: str) -> str:
+        sha = hashlib.sha256()
+        for item in (__version__, binary.FORMAT_VERSION, digest):
+            sha.update(f"{item!r}\0".encode("utf-8"))
+        return sha.hexdigest()
+
+    def get(self, key: str) -> Optional[SVGNode]:
+        data = self._read(key)
+        if data is None:
+            return None
+        try:
+            return binary.loads(data)
+        except ValueError:
+            return None
+
+    def put(self, key: str, node: SVGNode) -> None:
+        try:
+            data = binary.dumps(node)
+        except ValueError:
+            # some trees can't be serialized, they're just parsed each time
+            return
+        self._write(key, data)
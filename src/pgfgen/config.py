@@ -10,6 +10,8 @@ import abc
 import contextlib
 import tomli
 
+from .svg.formatting import TEX_MAX_DECIMALS
+from .svg.formatting import parse_length
 from .types import ValueGuard
 from .types import PGFGenOptions
 
@@ -23,6 +25,38 @@ class Guards:
             return False
         return all([isinstance(v, str) for v in value])
 
+    @staticmethod
+    def is_str(value: Any) -> TypeGuard[str]:
+        return isinstance(value, str)
+
+    @staticmethod
+    def is_bool(value: Any) -> TypeGuard[bool]:
+        return isinstance(value, bool)
+
+    @staticmethod
+    def is_non_negative_int(value: Any) -> TypeGuard[int]:
+        if isinstance(value, bool) or not isinstance(value, int):
+            return False
+        return value >= 0
+
+    @staticmethod
+    def is_positive_int(value: Any) -> TypeGuard[int]:
+        return Guards.is_non_negative_int(value) and value > 0
+
+    @staticmethod
+    def is_decimals(value: Any) -> TypeGuard[int]:
+        return Guards.is_non_negative_int(value) and value <= TEX_MAX_DECIMALS
+
+    @staticmethod
+    def is_length(value: Any) -> TypeGuard[str]:
+        if not isinstance(value, str):
+            return False
+        try:
+            parse_length(value)
+        except ValueError:
+            return False
+        return True
+
 
 class OptionsValidator:
     """A base class for concrete validators."""
@@ -137,6 +171,18 @@ class PGFGenOptionsValidator(OptionsValidator):
             result = False
         if not self.validate_search_path(options, "template_path"):
             result = False
+        if not self.validate_size(options, "parse_cache_entries"):
+            result = False
+        if not self.validate_size(options, "parse_cache_source_bytes"):
+            result = False
+        if not self.validate_directory(options, "cache_dir"):
+            result = False
+        if not self.validate_size(options, "cache_size"):
+            result = False
+        if not self.validate_number_format(options):
+            result = False
+        if not self.validate_flag(options, "intern_styles"):
+            result = False
 
         # only for warnings, result is unaltered
         self.validate_no_unsupported_keys(options)
@@ -151,9 +197,73 @@ class PGFGenOptionsValidator(OptionsValidator):
             "is not a valid list of strings",
         )
 
+    def validate_directory(self, options: dict[Any, Any], key: str) -> bool:
+        return self.validate_optional_key(
+            key,
+            options,
+            Guards.is_str,
+            "is not a string",
+        )
+
+    def validate_size(self, options: dict[Any, Any], key: str) -> bool:
+        return self.validate_optional_key(
+            key,
+            options,
+            Guards.is_non_negative_int,
+            "is not a non-negative integer",
+        )
+
+    def validate_flag(self, options: dict[Any, Any], key: str) -> bool:
+        return self.validate_optional_key(
+            key,
+            options,
+            Guards.is_bool,
+            "is not a boolean",
+        )
+
+    def validate_length(self, options: dict[Any, Any], key: str) -> bool:
+        return self.validate_optional_key(
+            key,
+            options,
+            Guards.is_length,
+            "is not a length, such as '1cm'",
+        )
+
+    def validate_number_format(self, options: dict[Any, Any]) -> bool:
+        result = self.validate_optional_key(
+            "precision",
+            options,
+            Guards.is_positive_int,
+            "is not a positive integer",
+        )
+        if not self.validate_optional_key(
+            "decimals",
+            options,
+            Guards.is_decimals,
+            f"is not an integer between 0 and {TEX_MAX_DECIMALS}",
+        ):
+            result = False
+        if "precision" in options and "decimals" in options:
+            self.error("may not have both precision and decimals")
+            result = False
+        if not self.validate_length(options, "unit"):
+            result = False
+        return result
+
     @property
     def supported_keys(self) -> list[str]:
-        return ["svg_path", "template_path"]
+        return [
+            "svg_path",
+            "template_path",
+            "parse_cache_entries",
+            "parse_cache_source_bytes",
+            "cache_dir",
+            "cache_size",
+            "precision",
+            "decimals",
+            "intern_styles",
+            "unit",
+        ]
 
 
 class ConfigLoader(abc.ABC):
@@ -12,3 +12,7 @@ TRIM_BLOCKS = True
 AUTOESCAPE = False
 TEMPLATE_PATH = ["."]
 SVG_PATH = TEMPLATE_PATH
+PARSE_CACHE_MAX_ENTRIES = 128
+PARSE_CACHE_MAX_SOURCE_BYTES = 256 * 1024 * 1024
+CODE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+STREAMING_BATCH_SIZE = 256
@@ -0,0 +1,229 @@
+"""Static analysis of templates, performed before rendering.
+
+The planner walks the syntax trees of a template and of the templates it
+extends, includes or imports, looking for ``loadsvg("...")`` calls and for
+the fragments (``pgf.frags["..."]``) used out of loaded files. Files, whose
+usage can't be determined statically (dynamic names or keys, ``pgf.code``,
+objects passed around to macros or filters, etc.), are planned for a full
+load."""
+
+from __future__ import annotations
+
+from jinja2 import Environment
+from jinja2 import meta
+from jinja2 import nodes
+
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+
+LOADSVG = "loadsvg"
+SVGTOPGF = "svgtopgf"
+
+
+class TemplatePlan:
+    """Result of planning. Maps names of SVG files, as passed to
+    ``loadsvg()``, onto sets of ids of fragments used, or onto ``None``
+    when the whole file is needed.
+
+    A plan is not ``complete`` if some templates or files could not be
+    determined statically, such plans must not be used to restrict loads."""
+
+    def __init__(self) -> None:
+        self.svg_files: dict[str, Optional[set[str]]] = {}
+        # names of analyzed templates
+        self.templates: list[str] = []
+        self.complete = True
+
+    def require(self, name: str, keys: Optional[set[str]]) -> None:
+        if name in self.svg_files:
+            planned = self.svg_files[name]
+            if planned is None or keys is None:
+                self.svg_files[name] = None
+            else:
+                planned.update(keys)
+        else:
+            self.svg_files[name] = None if keys is None else set(keys)
+
+    def selections(self) -> dict[str, tuple[str, ...]]:
+        """Ids to be loaded out of files, which are not needed entirely."""
+        if not self.complete:
+            return {}
+        return {
+            name: tuple(sorted(keys))
+            for name, keys in self.svg_files.items()
+            if keys is not None
+        }
+
+
+class _TemplateScan:
+    """Nodes of analyzed templates, collected in a single walk."""
+
+    def __init__(self) -> None:
+        self.parents: dict[int, nodes.Node] = {}
+        self.calls: list[nodes.Call] = []
+        self.usages: dict[str, list[nodes.Node]] = {}
+        # Variables bound to loaded files. Names are not scoped, usages of a
+        # name anywhere in analyzed templates are attributed to all the files
+        # bound to it, which errs on the side of loading more.
+        self.bindings: dict[str, list[str]] = {}
+
+    def add(self, node: nodes.Node, parent: Optional[nodes.Node]) -> None:
+        if parent is not None:
+            self.parents[id(node)] = parent
+        if isinstance(node, nodes.Call) and TemplatePlanner._is_global(
+            node.node, LOADSVG
+        ):
+            self.calls.append(node)
+        elif isinstance(node, nodes.Name) and node.ctx == "load":
+            self.usages.setdefault(node.name, []).append(node)
+
+
+class TemplatePlanner:
+    """Plans SVG work for templates of an environment."""
+
+    def __init__(self, environment: Environment):
+        self.environment = environment
+
+    def plan(self, name: str) -> TemplatePlan:
+        """Analyzes the template with given name and templates it refers to."""
+        plan = TemplatePlan()
+        scan = _TemplateScan()
+        for tree in list(self._parse_templates(name, plan)):
+            for node, parent in self._walk(tree):
+                scan.add(node, parent)
+        self._plan_loader_usages(plan, scan)
+        for call in scan.calls:
+            self._plan_call(plan, scan, call)
+        self._plan_bindings(plan, scan)
+        return plan
+
+    def _plan_loader_usages(self, plan: TemplatePlan, scan: _TemplateScan) -> None:
+        # the loader used other way than called directly (passed to a macro,
+        # aliased, etc.) may load anything
+        for usage in scan.usages.get(LOADSVG, []):
+            caller = scan.parents.get(id(usage))
+            if not (isinstance(caller, nodes.Call) and caller.node is usage):
+                plan.complete = False
+
+    def _plan_call(
+        self, plan: TemplatePlan, scan: _TemplateScan, call: nodes.Call
+    ) -> None:
+        file = self._literal_file_name(call)
+        if file is None:
+            # dynamic name, any of the planned files may get loaded
+            plan.complete = False
+            return
+        keys: Optional[set[str]] = None
+        converter = scan.parents.get(id(call))
+        if (
+            not call.kwargs
+            and isinstance(converter, nodes.Call)
+            and self._converts(converter, call)
+        ):
+            keys = _keys(self._used_keys(converter, scan.parents, scan.bindings, file))
+        plan.require(file, keys)
+
+    def _plan_bindings(self, plan: TemplatePlan, scan: _TemplateScan) -> None:
+        for variable, files in scan.bindings.items():
+            keys = _keys(
+                key
+                for usage in scan.usages.get(variable, [])
+                for key in self._used_keys(usage, scan.parents, {}, None)
+            )
+            for file in files:
+                plan.require(file, keys)
+
+    def _parse_templates(
+        self, name: str, plan: TemplatePlan
+    ) -> Iterator[nodes.Template]:
+        pending = [name]
+        while pending:
+            name = pending.pop()
+            if name in plan.templates:
+                continue
+            plan.templates.append(name)
+            assert self.environment.loader is not None
+            (source, _, _) = self.environment.loader.get_source(self.environment, name)
+            tree = self.environment.parse(source, name)
+            yield tree
+            for referenced in meta.find_referenced_templates(tree):
+                if referenced is None:
+                    # dynamically named templates can't be analyzed
+                    plan.complete = False
+                else:
+                    pending.append(referenced)
+
+    @staticmethod
+    def _walk(node: nodes.Node) -> Iterator[tuple[nodes.Node, Optional[nodes.Node]]]:
+        stack: list[tuple[nodes.Node, Optional[nodes.Node]]] = [(node, None)]
+        while stack:
+            (node, parent) = stack.pop()
+            yield (node, parent)
+            stack.extend((child, node) for child in node.iter_child_nodes())
+
+    @staticmethod
+    def _is_global(node: nodes.Node, name: str) -> bool:
+        return isinstance(node, nodes.Name) and node.name == name
+
+    @classmethod
+    def _converts(cls, converter: nodes.Call, call: nodes.Call) -> bool:
+        """Whether the converter is ``svgtopgf()`` applied to the call."""
+        return (
+            cls._is_global(converter.node, SVGTOPGF)
+            and bool(converter.args)
+            and converter.args[0] is call
+        )
+
+    @staticmethod
+    def _literal_file_name(call: nodes.Call) -> Optional[str]:
+        if (
+            len(call.args) != 1
+            or call.dyn_args is not None
+            or call.dyn_kwargs is not None
+            or not isinstance(call.args[0], nodes.Const)
+            or not isinstance(call.args[0].value, str)
+        ):
+            return None
+        name: str = call.args[0].value
+        return name
+
+    @staticmethod
+    def _used_keys(
+        node: nodes.Node,
+        parents: dict[int, nodes.Node],
+        bindings: dict[str, list[str]],
+        name: Optional[str],
+    ) -> Iterator[Optional[str]]:
+        """Yields fragment keys used out of the value of the node, or None
+        if the value is used in a way that requires the whole file."""
+        parent = parents.get(id(node))
+        if isinstance(parent, nodes.Assign) and parent.node is node:
+            if isinstance(parent.target, nodes.Name) and name is not None:
+                bindings.setdefault(parent.target.name, []).append(name)
+            else:
+                yield None
+        elif isinstance(parent, nodes.Getattr) and parent.attr == "bbox":
+            pass
+        elif isinstance(parent, nodes.Getattr) and parent.attr == "frags":
+            frags = parents.get(id(parent))
+            if isinstance(frags, nodes.Getitem) and isinstance(frags.arg, nodes.Const):
+                yield str(frags.arg.value)
+            elif isinstance(frags, nodes.Getattr):
+                yield frags.attr
+            else:
+                yield None
+        else:
+            yield None
+
+
+def _keys(used: Iterable[Optional[str]]) -> Optional[set[str]]:
+    """Collects used keys, None if any of the usages needs the whole file."""
+    keys: Optional[set[str]] = set()
+    for key in used:
+        if key is None or keys is None:
+            keys = None
+        else:
+            keys.add(key)
+    return keys
@@ -0,0 +1,157 @@
+"""Provides access to SVG files bundled in zip archives.
+
+An archive may appear in search path in place of a directory. Its central
+directory is read once, into an in-memory index, so looking up a member is
+a dictionary hit instead of a filesystem probe. Members are read straight
+from the archive, which is memory-mapped where possible.
+
+Files within archives are referred to with paths, in which the archive
+plays the role of a directory, e.g. ``icons.zip/arrows/left.svg``."""
+
+from __future__ import annotations
+
+import mmap
+import os
+import os.path
+import threading
+import zipfile
+
+from io import RawIOBase
+
+from typing import BinaryIO
+from typing import Optional
+from typing import cast
+
+ARCHIVE_SUFFIXES = (".zip",)
+
+
+class _MappedFile(RawIOBase):
+    """Read-only, seekable file object backed by a memory map."""
+
+    def __init__(self, data: mmap.mmap):
+        self.data = data
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:  # type: ignore[override]
+        chunk = self.data[self.position : self.position + len(buffer)]
+        buffer[: len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += len(self.data)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self) -> None:
+        self.data.close()
+        super().close()
+
+
+class SvgArchive:
+    """A zip archive with SVG files, indexed by member names. Archives are
+    context managers, they get closed on exit. Members opened from an
+    archive have to be closed before the archive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            stat = os.fstat(fp.fileno())
+            try:
+                data: BinaryIO = cast(
+                    BinaryIO,
+                    _MappedFile(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)),
+                )
+            except (OSError, ValueError):
+                # not mappable (e.g. empty, or on a special filesystem)
+                data = open(path, "rb")
+        self.mtime_ns = stat.st_mtime_ns
+        self.data = data
+        self.zipfile = zipfile.ZipFile(data)
+        self.index = {
+            info.filename: info
+            for info in self.zipfile.infolist()
+            if not info.is_dir()
+        }
+
+    def __contains__(self, member: str) -> bool:
+        return member in self.index
+
+    def open(self, member: str) -> BinaryIO:
+        return cast(BinaryIO, self.zipfile.open(self.index[member]))
+
+    def stat(self, member: str) -> tuple[int, int]:
+        """Returns ``(mtime_ns, size)``, the modification time is the one of
+        the archive."""
+        return (self.mtime_ns, self.index[member].file_size)
+
+    def close(self) -> None:
+        self.zipfile.close()
+        self.data.close()
+
+    def __enter__(self) -> SvgArchive:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+# archives opened so far, by paths, with modification times of the files
+# (None for missing files), the archives are None for other files
+_archives: dict[str, tuple[Optional[int], Optional[SvgArchive]]] = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(path: str) -> Optional[SvgArchive]:
+    """Returns the archive at ``path``, or ``None`` if there is no archive.
+    Archives are opened once, and reopened when modified."""
+    if not path.endswith(ARCHIVE_SUFFIXES):
+        return None
+    try:
+        mtime_ns: Optional[int] = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    with _archives_lock:
+        (cached_mtime_ns, archive) = _archives.get(path, (None, None))
+        if path in _archives and cached_mtime_ns == mtime_ns:
+            return archive
+        if archive is not None:
+            archive.close()
+        archive = None
+        if mtime_ns is not None and zipfile.is_zipfile(path):
+            archive = SvgArchive(path)
+        _archives[path] = (mtime_ns, archive)
+        return archive
+
+
+def close_archives() -> None:
+    """Closes the archives opened so far, they get reopened on demand."""
+    with _archives_lock:
+        for _, archive in _archives.values():
+            if archive is not None:
+                archive.close()
+        _archives.clear()
+
+
+def split_member(file: str) -> Optional[tuple[SvgArchive, str]]:
+    """Splits a path of a file within an archive into the archive and the
+    member name, returns ``None`` for paths of other files."""
+    pieces = file.split("/")
+    for i in range(1, len(pieces)):
+        if pieces[i - 1].endswith(ARCHIVE_SUFFIXES):
+            archive = get_archive("/".join(pieces[:i]))
+            if archive is not None:
+                return (archive, "/".join(pieces[i:]))
+    return None
@@ -0,0 +1,698 @@
+"""Compact binary serialization of parsed node trees.
+
+A tree is written in pre-order into a few typed arrays: a byte stream
+(kinds of nodes, flags, types of values, path opcodes), a stream of unsigned
+integers (string references and counts), a stream of float64 numbers
+(transforms, bounding boxes, geometry) and a stream of signed integers
+(colors). Strings are stored once, in a table. The data is prefixed with
+a magic number and a format version, data of other versions is rejected.
+
+Trees get restored with stand-ins of svgelements elements (see detached),
+without parsing any XML, CSS or path data. Elements not supported by nodes
+(e.g. texts, images) are kept as opaque leaves, with their values and the
+names of their types only. ValueError is raised for trees with unsupported
+shapes or path segments.
+
+The same round trip detaches parsed trees from svgelements (see detach()),
+only values used by nodes and generators are then kept."""
+
+from __future__ import annotations
+
+import struct
+import sys
+
+from array import array
+
+from typing import Any
+from typing import Callable
+from typing import Collection
+from typing import Optional
+from typing import Sequence
+
+from svgelements import Color
+from svgelements import Group
+from svgelements import Matrix
+from svgelements import Point
+from svgelements import SVGElement
+from svgelements import Shape
+from svgelements import Transformable
+from svgelements import Use
+
+from ..types import BboxTuple
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+from .detached import DetachedCircle
+from .detached import DetachedElement
+from .detached import DetachedEllipse
+from .detached import DetachedGroup
+from .detached import DetachedPath
+from .detached import DetachedPolygon
+from .detached import DetachedPolyline
+from .detached import DetachedRect
+from .detached import DetachedSVG
+from .detached import DetachedSimpleLine
+from .detached import DetachedUse
+from .detached import is_opaque_type
+from .detached import opaque_type
+from .geometry import COORDS
+from .geometry import OTHER
+from .geometry import PathGeometry
+from .nodes import CircleNode
+from .nodes import EllipseNode
+from .nodes import GroupNode
+from .nodes import PathNode
+from .nodes import PolygonNode
+from .nodes import PolylineNode
+from .nodes import RectNode
+from .nodes import SVGElementNode
+from .nodes import SVGNode
+from .nodes import SimpleLineNode
+from .nodes import SymbolNode
+from .nodes import UnsupportedSVGElementNode
+from .nodes import UseNode
+
+
+MAGIC = b"PGFGTREE"
+FORMAT_VERSION = 3
+
+_HEADER = struct.Struct("<8sHH")
+_SECTION = struct.Struct("<Q")
+
+# kinds of nodes
+SVG = 0
+GROUP = 1
+USE = 2
+SYMBOL = 3
+ELEMENT = 4  # unsupported (plain) SVG element
+PATH = 5
+CIRCLE = 6
+ELLIPSE = 7
+RECT = 8
+SIMPLE_LINE = 9
+POLYLINE = 10
+POLYGON = 11
+OPAQUE = 12  # unsupported element of an svgelements type
+
+CONTAINERS = (SVG, GROUP, USE)
+PLAIN = (SYMBOL, ELEMENT, OPAQUE)
+SHAPES = (PATH, CIRCLE, ELLIPSE, RECT, SIMPLE_LINE, POLYLINE, POLYGON)
+
+# attributes of shapes, stored as numbers
+SHAPE_ATTRIBUTES = {
+    CIRCLE: ("cx", "cy", "rx", "ry"),
+    ELLIPSE: ("cx", "cy", "rx", "ry"),
+    RECT: ("x", "y", "width", "height", "rx", "ry"),
+    SIMPLE_LINE: ("x1", "y1", "x2", "y2"),
+}
+
+# flags of nodes
+APPLY = 0x01
+BBOX = 0x02
+FILL = 0x04
+FILL_VALUE = 0x08
+STROKE = 0x10
+STROKE_VALUE = 0x20
+STROKE_WIDTH = 0x40
+DOCUMENT_BBOX = 0x80
+
+# values of elements kept by detach(), besides attributes
+DETACHED_VALUES = frozenset(
+    (
+        "tag",
+        "id",
+        "attributes",
+        "transform",
+        "viewport_transform",
+        "vector-effect",
+        "stroke-dasharray",
+        "stroke-dashoffset",
+        "stroke-linecap",
+        "stroke-linejoin",
+        "stroke-miterlimit",
+    )
+)
+
+# types of values
+STR = 0
+ATTRIBUTES = 1
+TRUE = 2
+FALSE = 3
+NONE = 4
+
+
+def dumps(node: SVGNode) -> bytes:
+    """Serializes the tree."""
+    writer = _Writer()
+    writer.node(node)
+    return writer.getvalue()
+
+
+def loads(data: bytes) -> SVGNode:
+    """Restores a tree serialized with dumps()."""
+    node = _Reader(data).node(None)
+    assert isinstance(node, SVGNode)
+    return node
+
+
+def detach(node: SVGNode) -> SVGNode:
+    """Returns a copy of the tree made of stand-ins of svgelements elements,
+    with values of elements reduced to DETACHED_VALUES and attributes to
+    these rendered by generators. The svgelements objects of the original
+    tree may then be released. Strings are shared within the copy. Raises
+    ValueError for trees that can't be serialized."""
+    writer = _Writer(detached=True)
+    writer.node(node)
+    detached = loads(writer.getvalue())
+    detached.source_digest = node.source_digest
+    detached.optimization = node.optimization
+    detached.simplification = node.simplification
+    detached._svg2pgf_transform = node._svg2pgf_transform
+    return detached
+
+
+# kinds of nodes by their types, subclasses are looked up along their MROs
+_KINDS: dict[type[SVGElementNode], int] = {
+    SVGNode: SVG,
+    GroupNode: GROUP,
+    UseNode: USE,
+    SymbolNode: SYMBOL,
+    UnsupportedSVGElementNode: ELEMENT,
+    PathNode: PATH,
+    CircleNode: CIRCLE,
+    EllipseNode: ELLIPSE,
+    RectNode: RECT,
+    SimpleLineNode: SIMPLE_LINE,
+    PolylineNode: POLYLINE,
+    PolygonNode: POLYGON,
+}
+
+
+def _kind(node: SVGElementNode) -> int:
+    kind = next((_KINDS[t] for t in type(node).__mro__ if t in _KINDS), None)
+    if kind == ELEMENT and type(node.element) is not SVGElement:
+        # generators print types of unsupported elements, they're restored
+        # with stand-ins of the same names
+        kind = OPAQUE if is_opaque_type(type(node.element)) else None
+    if kind is None:
+        raise ValueError(f"{type(node).__name__} can't be serialized")
+    if isinstance(node, PathNode) and node.geometry.others:
+        raise ValueError("unsupported path segments can't be serialized")
+    return kind
+
+
+class _Writer:
+    def __init__(self, detached: bool = False) -> None:
+        # whether to keep only values needed by nodes and generators
+        self.detached = detached
+        # bounding boxes of elements other than groups, by ids of elements
+        self.bboxes: dict[int, Optional[BboxTuple]] = {}
+        self.strings: dict[str, int] = {}
+        self.bytes = array("B")
+        self.uints = array("I")
+        self.floats = array("d")
+        self.ints = array("q")
+
+    def getvalue(self) -> bytes:
+        strings = "\0".join(self.strings).encode("utf-8")
+        parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, 0)]
+        for section in (strings, self.bytes, self.uints, self.floats, self.ints):
+            if isinstance(section, array):
+                if sys.byteorder != "little":
+                    section = array(section.typecode, section)
+                    section.byteswap()
+                section = section.tobytes()
+            parts.append(_SECTION.pack(len(section)))
+            parts.append(section)
+        return b"".join(parts)
+
+    def string(self, value: Optional[str]) -> None:
+        # 0 stands for None
+        if value is None:
+            self.uints.append(0)
+        else:
+            if "\0" in value:
+                raise ValueError("strings with NUL characters can't be serialized")
+            self.uints.append(self.strings.setdefault(value, len(self.strings)) + 1)
+
+    def numbers(self, values: Sequence[Any]) -> None:
+        """Writes up to 8 numbers, preceded by masks of NumPy floats and of
+        integers among them, so they're restored with the same types (and
+        the same representations)."""
+        (numpy_mask, int_mask) = (0, 0)
+        for i, value in enumerate(values):
+            if type(value) is int:
+                int_mask |= 1 << i
+            elif type(value) is not float:
+                if not isinstance(value, float) or numpy is None:
+                    raise ValueError(f"{value!r} is not a number")
+                if not isinstance(value, numpy.float64):
+                    raise ValueError(f"{value!r} is not a number")
+                numpy_mask |= 1 << i
+        self.bytes.extend((numpy_mask, int_mask))
+        self.floats.extend(values)
+
+    def node(self, node: SVGElementNode) -> None:
+        kind = _kind(node)
+        element = node.element
+        self.bytes.append(kind)
+        self.string(element.id)
+        if self.detached:
+            self.values(element.values, _attribute_names(node))
+        else:
+            self.values(element.values)
+        if kind == OPAQUE:
+            self.string(type(element).__name__)
+        elif kind not in PLAIN:
+            self.graphics(node)
+            _WRITERS[kind](self, node, kind)
+
+    def graphics(self, node: SVGElementNode) -> None:
+        """Writes flags, the transform, the bounding box and presentation
+        values of shapes, common to nodes other than plain ones."""
+        element = node.element
+        assert isinstance(element, Transformable)
+        flags = APPLY if element.apply else 0
+        bbox = self.bbox(element)
+        if bbox is not None:
+            flags |= BBOX
+        if isinstance(element, Shape):
+            flags |= self.color_flags(element.fill, FILL, FILL_VALUE)
+            flags |= self.color_flags(element.stroke, STROKE, STROKE_VALUE)
+            if element.stroke_width is not None:
+                flags |= STROKE_WIDTH
+        if isinstance(node, SVGNode) and node.document_bbox is not None:
+            flags |= DOCUMENT_BBOX
+        self.bytes.append(flags)
+
+        m = element.transform
+        self.numbers((m.a, m.b, m.c, m.d, m.e, m.f))
+        if bbox is not None:
+            self.numbers(bbox)
+        if isinstance(element, Shape):
+            if flags & FILL_VALUE:
+                self.ints.append(element.fill.value)
+            if flags & STROKE_VALUE:
+                self.ints.append(element.stroke.value)
+            if element.stroke_width is not None:
+                self.numbers((element.stroke_width,))
+
+    def shape_attributes(self, node: SVGElementNode, kind: int) -> None:
+        element = node.element
+        self.numbers([getattr(element, name) for name in SHAPE_ATTRIBUTES[kind]])
+
+    def points(self, node: SVGElementNode, kind: int) -> None:
+        points = node.element.points
+        self.uints.append(len(points))
+        for point in points:
+            self.floats.extend((point.x, point.y))
+
+    def path(self, node: SVGElementNode, kind: int) -> None:
+        assert isinstance(node, PathNode)
+        geometry = node.geometry
+        self.uints.append(len(geometry.opcodes))
+        self.bytes.extend(geometry.opcodes)
+        self.floats.extend(geometry.coords)
+
+    def svg(self, node: SVGElementNode, kind: int) -> None:
+        assert isinstance(node, SVGNode)
+        if node.document_bbox is not None:
+            self.numbers(node.document_bbox)
+        self.bytes.append(TRUE if node.reified else FALSE)
+        self.children(node, kind)
+
+    def children(self, node: SVGElementNode, kind: int) -> None:
+        assert isinstance(node, (GroupNode, UseNode))
+        children = node.children_element_nodes
+        self.uints.append(len(children))
+        for child in children:
+            self.node(child)
+
+    def bbox(self, element: Any) -> Optional[BboxTuple]:
+        """Same as element.bbox(), but the (costly) bounding boxes of shapes
+        are computed once, not again for each group containing them."""
+        if not isinstance(element, (Group, Use)):
+            key = id(element)
+            if key not in self.bboxes:
+                self.bboxes[key] = element.bbox()
+            return self.bboxes[key]
+        # the same as Group.union_bbox()
+        boxes = [
+            box
+            for e in element.select()
+            if hasattr(e, "bbox") and not isinstance(e, (Group, Use))
+            for box in (self.bbox(e),)
+            if box is not None
+        ]
+        if not boxes:
+            return None
+        (xmins, ymins, xmaxs, ymaxs) = zip(*boxes)
+        return (min(xmins), min(ymins), max(xmaxs), max(ymaxs))
+
+    @staticmethod
+    def color_flags(color: Optional[Color], flag: int, value_flag: int) -> int:
+        if color is None:
+            return 0
+        if not isinstance(color, Color):
+            raise ValueError(f"{color!r} is not a color")
+        return flag if color.value is None else flag | value_flag
+
+    def values(
+        self, values: dict[str, Any], attributes: Optional[Collection[str]] = None
+    ) -> None:
+        """Writes values of an element. With ``attributes`` given, only
+        DETACHED_VALUES and the given attributes are written."""
+        items: list[tuple[str, Any]] = [
+            (k, v)
+            for k, v in values.items()
+            if v is None or isinstance(v, (str, bool, dict))
+        ]
+        if attributes is not None:
+            items = [
+                (k, v if k != "attributes" else _subset(v, attributes))
+                for (k, v) in items
+                if k in DETACHED_VALUES
+            ]
+        self.uints.append(len(items))
+        for key, value in items:
+            self.string(key)
+            if isinstance(value, str):
+                self.bytes.append(STR)
+                self.string(value)
+            elif isinstance(value, dict):
+                # attributes of the element
+                self.bytes.append(ATTRIBUTES)
+                self.uints.append(len(value))
+                for k, v in value.items():
+                    self.string(k)
+                    self.string(v)
+            elif value is None:
+                self.bytes.append(NONE)
+            else:
+                self.bytes.append(TRUE if value else FALSE)
+
+
+def _attribute_names(node: SVGElementNode) -> set[str]:
+    return {
+        item[1] if isinstance(item, tuple) else item
+        for item in node.element_attributes
+    }
+
+
+def _subset(attributes: Any, names: Collection[str]) -> Any:
+    if not isinstance(attributes, dict):
+        return attributes
+    return {k: v for (k, v) in attributes.items() if k in names}
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        if len(data) < _HEADER.size:
+            raise ValueError("truncated data")
+        (magic, version, _) = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a serialized node tree")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported format version {version}")
+        sections = []
+        offset = _HEADER.size
+        for _ in range(5):
+            if offset + _SECTION.size > len(data):
+                raise ValueError("truncated data")
+            (size,) = _SECTION.unpack_from(data, offset)
+            offset += _SECTION.size
+            if offset + size > len(data):
+                raise ValueError("truncated data")
+            sections.append(data[offset : offset + size])
+            offset += size
+        self.strings = sections[0].decode("utf-8").split("\0")
+        # bytes, unsigned integers, floats and signed integers
+        self.streams = [
+            self._array(typecode, section)
+            for typecode, section in zip("BIdq", sections[1:])
+        ]
+        self.positions = [0, 0, 0, 0]
+        # colors are shared by elements, they're never modified by nodes
+        self.colors: dict[Optional[int], Color] = {}
+
+    @staticmethod
+    def _array(typecode: str, data: bytes) -> array[Any]:
+        values = array(typecode)
+        if len(data) % values.itemsize:
+            raise ValueError("corrupted data")
+        values.frombytes(data)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def _take(self, stream: int, n: int) -> array[Any]:
+        values = self.streams[stream]
+        i = self.positions[stream]
+        if i + n > len(values):
+            raise ValueError("corrupted data")
+        self.positions[stream] = i + n
+        return values[i : i + n]
+
+    def byte(self) -> int:
+        value: int = self._take(0, 1)[0]
+        return value
+
+    def uint(self) -> int:
+        value: int = self._take(1, 1)[0]
+        return value
+
+    def floats(self, n: int) -> array[float]:
+        return self._take(2, n)
+
+    def numbers(self, n: int) -> list[Any]:
+        (numpy_mask, int_mask) = self._take(0, 2)
+        values: list[Any] = list(self._take(2, n))
+        if numpy_mask and numpy is None:
+            raise ValueError("NumPy is required to restore the data")
+        for i in range(n):
+            if int_mask & (1 << i):
+                values[i] = int(values[i])
+            elif numpy_mask & (1 << i):
+                values[i] = numpy.float64(values[i])
+        return values
+
+    def integer(self) -> int:
+        value: int = self._take(3, 1)[0]
+        return value
+
+    def string(self) -> Optional[str]:
+        i = self.uint()
+        if i == 0:
+            return None
+        if i > len(self.strings):
+            raise ValueError("corrupted data")
+        return self.strings[i - 1]
+
+    def values(self) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        for _ in range(self.uint()):
+            key = self.string()
+            vtype = self.byte()
+            value: Any
+            if vtype == STR:
+                value = self.string()
+            elif vtype == ATTRIBUTES:
+                value = {}
+                for _ in range(self.uint()):
+                    k = self.string()
+                    value[k] = self.string()
+            elif vtype == NONE:
+                value = None
+            else:
+                value = vtype == TRUE
+            values[str(key)] = value
+        return values
+
+    def bbox(self) -> BboxTuple:
+        (xmin, ymin, xmax, ymax) = self.numbers(4)
+        return (xmin, ymin, xmax, ymax)
+
+    def color(self, flags: int, flag: int, value_flag: int) -> Optional[Color]:
+        if not flags & flag:
+            return None
+        value = self.integer() if flags & value_flag else None
+        if value not in self.colors:
+            color = Color()
+            color.value = value
+            self.colors[value] = color
+        return self.colors[value]
+
+    def node(self, parent: Optional[SVGElementNode]) -> SVGElementNode:
+        kind = self.byte()
+        id = self.string()
+        values = self.values()
+        if kind in PLAIN:
+            return self.plain(kind, id, values, parent)
+        if kind not in _READERS:
+            raise ValueError(f"unknown kind of node {kind}")
+
+        flags = self.byte()
+        attributes: dict[str, Any] = dict(values=values, id=id)
+        attributes["apply"] = bool(flags & APPLY)
+        attributes["transform"] = Matrix(*self.numbers(6))
+        bbox = self.bbox() if flags & BBOX else None
+        if kind in SHAPES:
+            attributes["fill"] = self.color(flags, FILL, FILL_VALUE)
+            attributes["stroke"] = self.color(flags, STROKE, STROKE_VALUE)
+            attributes["stroke_width"] = None
+            if flags & STROKE_WIDTH:
+                attributes["stroke_width"] = self.numbers(1)[0]
+        return _READERS[kind](self, kind, flags, bbox, attributes, parent)
+
+    def plain(
+        self,
+        kind: int,
+        id: Optional[str],
+        values: dict[str, Any],
+        parent: Optional[SVGElementNode],
+    ) -> SVGElementNode:
+        if kind == SYMBOL:
+            return SymbolNode(SVGElement(values), parent)
+        if kind == OPAQUE:
+            element = opaque_type(self.string() or "")(values=values, id=id)
+            return UnsupportedSVGElementNode(element, parent)
+        return UnsupportedSVGElementNode(SVGElement(values), parent)
+
+    def shape(
+        self,
+        kind: int,
+        flags: int,
+        bbox: Optional[BboxTuple],
+        attributes: dict[str, Any],
+        parent: Optional[SVGElementNode],
+    ) -> SVGElementNode:
+        names = SHAPE_ATTRIBUTES[kind]
+        attributes.update(zip(names, self.numbers(len(names))))
+        (node_type, element_type) = _RESTORED_TYPES[kind]
+        return node_type(element_type(bbox, **attributes), parent)
+
+    def polyshape(
+        self,
+        kind: int,
+        flags: int,
+        bbox: Optional[BboxTuple],
+        attributes: dict[str, Any],
+        parent: Optional[SVGElementNode],
+    ) -> SVGElementNode:
+        coords = self.floats(2 * self.uint())
+        attributes["points"] = [
+            Point(x, y) for (x, y) in zip(coords[::2], coords[1::2])
+        ]
+        (node_type, element_type) = _RESTORED_TYPES[kind]
+        return node_type(element_type(bbox, **attributes), parent)
+
+    def path(
+        self,
+        kind: int,
+        flags: int,
+        bbox: Optional[BboxTuple],
+        attributes: dict[str, Any],
+        parent: Optional[SVGElementNode],
+    ) -> SVGElementNode:
+        opcodes = array("B", self._take(0, self.uint()))
+        if any(opcode >= OTHER for opcode in opcodes):
+            raise ValueError("corrupted data")
+        coords = self.floats(sum(COORDS[op] for op in opcodes))
+        path = PathNode(DetachedPath(bbox, **attributes), parent)
+        path._geometry = PathGeometry(opcodes, coords)
+        return path
+
+    def svg(
+        self,
+        kind: int,
+        flags: int,
+        bbox: Optional[BboxTuple],
+        attributes: dict[str, Any],
+        parent: Optional[SVGElementNode],
+    ) -> SVGElementNode:
+        container = DetachedSVG(bbox, **attributes)
+        svg = SVGNode(container, parent)
+        svg.document_bbox = self.bbox() if flags & DOCUMENT_BBOX else None
+        svg.reified = self.byte() == TRUE
+        self.children(svg, container)
+        return svg
+
+    def container(
+        self,
+        kind: int,
+        flags: int,
+        bbox: Optional[BboxTuple],
+        attributes: dict[str, Any],
+        parent: Optional[SVGElementNode],
+    ) -> SVGElementNode:
+        (node_type, element_type) = _RESTORED_TYPES[kind]
+        container = element_type(bbox, **attributes)
+        node = node_type(container, parent)
+        assert isinstance(node, (GroupNode, UseNode))
+        self.children(node, container)
+        return node
+
+    def children(self, node: GroupNode | UseNode, container: DetachedElement) -> None:
+        assert isinstance(container, list)
+        children = [self.node(node) for _ in range(self.uint())]
+        container.extend(child.element for child in children)
+        node._children_element_nodes = children
+
+
+# writers of data specific to kinds of nodes
+_WRITERS: dict[int, Callable[[_Writer, SVGElementNode, int], None]] = {
+    SVG: _Writer.svg,
+    GROUP: _Writer.children,
+    USE: _Writer.children,
+    PATH: _Writer.path,
+    CIRCLE: _Writer.shape_attributes,
+    ELLIPSE: _Writer.shape_attributes,
+    RECT: _Writer.shape_attributes,
+    SIMPLE_LINE: _Writer.shape_attributes,
+    POLYLINE: _Writer.points,
+    POLYGON: _Writer.points,
+}
+
+# readers of nodes of given kinds, following the common data
+_READERS: dict[
+    int,
+    Callable[
+        [
+            _Reader,
+            int,
+            int,
+            Optional[BboxTuple],
+            dict[str, Any],
+            Optional[SVGElementNode],
+        ],
+        SVGElementNode,
+    ],
+] = {
+    SVG: _Reader.svg,
+    GROUP: _Reader.container,
+    USE: _Reader.container,
+    PATH: _Reader.path,
+    CIRCLE: _Reader.shape,
+    ELLIPSE: _Reader.shape,
+    RECT: _Reader.shape,
+    SIMPLE_LINE: _Reader.shape,
+    POLYLINE: _Reader.polyshape,
+    POLYGON: _Reader.polyshape,
+}
+
+# types of restored nodes and elements
+_RESTORED_TYPES: dict[
+    int, tuple[Callable[..., SVGElementNode], Callable[..., DetachedElement]]
+] = {
+    GROUP: (GroupNode, DetachedGroup),
+    USE: (UseNode, DetachedUse),
+    CIRCLE: (CircleNode, DetachedCircle),
+    ELLIPSE: (EllipseNode, DetachedEllipse),
+    RECT: (RectNode, DetachedRect),
+    SIMPLE_LINE: (SimpleLineNode, DetachedSimpleLine),
+    POLYLINE: (PolylineNode, DetachedPolyline),
+    POLYGON: (PolygonNode, DetachedPolygon),
+}
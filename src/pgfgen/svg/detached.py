@@ -0,0 +1,132 @@
+"""Lightweight stand-ins for svgelements elements.
+
+The classes below are restored from already resolved data (geometry, style,
+transform, bounding box), without running constructors of svgelements, which
+parse the values of elements. They only carry attributes that are used by
+nodes and generators, and return the bounding box computed once, when the
+element was parsed."""
+
+from __future__ import annotations
+
+from typing import Any
+from typing import Optional
+
+import svgelements
+
+from svgelements import Circle
+from svgelements import Ellipse
+from svgelements import Group
+from svgelements import Path
+from svgelements import Polygon
+from svgelements import Polyline
+from svgelements import Rect
+from svgelements import SVG
+from svgelements import SVGElement
+from svgelements import SimpleLine
+from svgelements import Use
+
+from ..types import BboxTuple
+
+
+class DetachedElement:
+    """Mixin of the stand-ins. Attributes are assigned as they are, the
+    bounding box is the one given."""
+
+    def __init__(self, bbox: Optional[BboxTuple] = None, **attributes: Any) -> None:
+        self.__dict__.update(attributes)
+        self.detached_bbox = bbox
+
+    def bbox(
+        self, transformed: bool = True, with_stroke: bool = False
+    ) -> Optional[BboxTuple]:
+        return self.detached_bbox
+
+
+class DetachedCircle(DetachedElement, Circle):  # type: ignore[misc]
+    pass
+
+
+class DetachedEllipse(DetachedElement, Ellipse):  # type: ignore[misc]
+    pass
+
+
+class DetachedRect(DetachedElement, Rect):  # type: ignore[misc]
+    pass
+
+
+class DetachedSimpleLine(DetachedElement, SimpleLine):  # type: ignore[misc]
+    pass
+
+
+class DetachedPolyline(DetachedElement, Polyline):  # type: ignore[misc]
+    pass
+
+
+class DetachedPolygon(DetachedElement, Polygon):  # type: ignore[misc]
+    pass
+
+
+class DetachedPath(DetachedElement, Path):  # type: ignore[misc]
+    """Segments are not restored, the geometry is kept by PathNode."""
+
+    def __init__(self, bbox: Optional[BboxTuple] = None, **attributes: Any) -> None:
+        super().__init__(bbox, **attributes)
+        self._segments: list[Any] = []
+
+
+class DetachedGroup(DetachedElement, Group):  # type: ignore[misc]
+    pass
+
+
+class DetachedUse(DetachedElement, Use):  # type: ignore[misc]
+    pass
+
+
+class DetachedSVG(DetachedElement, SVG):  # type: ignore[misc]
+    pass
+
+
+class DetachedOpaqueElement(DetachedElement):
+    """Mixin of the stand-ins of elements not supported by nodes, see
+    opaque_type(). Stand-ins are pickled by the names of their types, which
+    are the names of svgelements types."""
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (_opaque_element, (type(self).__name__, self.__dict__))
+
+
+def _opaque_element(name: str, attributes: dict[str, Any]) -> DetachedElement:
+    element = opaque_type(name)(None)
+    element.__dict__.update(attributes)
+    return element
+
+
+# stand-ins of elements not supported by nodes, by names of their types
+_opaque_types: dict[str, type[DetachedElement]] = {}
+
+
+def opaque_type(name: str) -> type[DetachedElement]:
+    """Returns the stand-in of the svgelements type with given name, for
+    elements not supported by nodes (e.g. texts, images), which only carry
+    their values. The stand-in is named after the type, so that generators
+    report it as they do the original. Raises ValueError for names of other
+    than svgelements element types."""
+    stand_in = _opaque_types.get(name)
+    if stand_in is None:
+        base = getattr(svgelements, name, None)
+        if not isinstance(base, type) or not issubclass(base, SVGElement):
+            raise ValueError(f"unknown type of element {name!r}")
+        namespace = {"__module__": base.__module__, "__qualname__": base.__qualname__}
+        stand_in = type(name, (DetachedOpaqueElement, base), namespace)
+        _opaque_types[name] = stand_in
+    return stand_in
+
+
+def is_opaque_type(element_type: type) -> bool:
+    """Whether elements of the type get restored with an opaque_type()
+    stand-in, i.e. the type is an svgelements element type or a stand-in."""
+    name = element_type.__name__
+    if element_type is _opaque_types.get(name):
+        return True
+    base = getattr(svgelements, name, None)
+    return element_type is base and issubclass(base, SVGElement)
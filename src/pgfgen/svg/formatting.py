@@ -0,0 +1,201 @@
+"""Formatting of numbers in generated PGF code.
+
+By default numbers are written exactly, as Python's ``repr`` does, which
+takes up to 17 significant digits. A number format may round them instead,
+either to significant digits or to a fixed number of decimals. Rounded
+numbers are written in fixed-point notation, which TeX can read, with
+trailing zeros stripped and ``-0`` written as ``0``. TeX dimensions have a
+resolution of 2^-16pt, so there is no point in more than 5 decimals, and
+may not reach 16384pt, larger numbers are rejected.
+
+For long sequences of numbers, the limit is checked and the decimals are
+determined with NumPy, when available, in one batch.
+
+A number format with a ``unit`` writes points and lengths as absolute
+dimensions: coordinates in PGF units are multiplied by the length of the
+unit, in points, and written as ``\\pgfqpoint{..pt}{..pt}``, which TeX reads
+without any arithmetic on the xy-coordinate system; the transformation matrix
+still applies. Numbers are then rounded to TEX_MAX_DECIMALS unless the format
+says otherwise, as exact ones may be in exponent notation."""
+
+from __future__ import annotations
+
+import re
+
+from dataclasses import dataclass
+from math import floor
+from math import isfinite
+from math import log10
+
+from typing import Optional
+from typing import Sequence
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+# numbers written by TeX have at most 5 decimals
+TEX_MAX_DECIMALS = 5
+
+# the largest dimension, in points, TeX accepts is 16383.99999pt
+TEX_MAX_DIMEN = 16384.0
+
+NUMPY_MIN_NUMBERS = 64
+
+# lengths of TeX units, in points
+TEX_UNITS = {
+    "pt": 1.0,
+    "pc": 12.0,
+    "in": 72.27,
+    "bp": 72.27 / 72,
+    "cm": 72.27 / 2.54,
+    "mm": 72.27 / 25.4,
+    "dd": 1238 / 1157,
+    "cc": 12 * 1238 / 1157,
+    "sp": 1 / 65536,
+}
+
+_LENGTH = re.compile(r"\s*(\d+(?:\.\d*)?|\.\d+)\s*([a-z]{2})\s*")
+
+
+def parse_length(length: str) -> float:
+    """Length such as ``1cm`` or ``.5in``, in points. Units depending on
+    the font (``em``, ``ex``) are not supported."""
+    match = _LENGTH.fullmatch(length)
+    if match is None or match.group(2) not in TEX_UNITS:
+        raise ValueError(f"invalid length: {length!r}")
+    return float(match.group(1)) * TEX_UNITS[match.group(2)]
+
+
+@dataclass(frozen=True)
+class NumberFormat:
+    """Rounds numbers to ``precision`` significant digits or to
+    ``decimals`` decimal places, at most TEX_MAX_DECIMALS either way. With
+    none of them, numbers are written exactly. With a ``unit``, the length
+    of the PGF unit in points, points are absolute."""
+
+    precision: Optional[int] = None
+    decimals: Optional[int] = None
+    unit: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.precision is not None and self.decimals is not None:
+            raise ValueError("precision and decimals are mutually exclusive")
+        if self.precision is not None and self.precision < 1:
+            raise ValueError(f"precision must be positive: {self.precision!r}")
+        if self.decimals is not None and not (
+            0 <= self.decimals <= TEX_MAX_DECIMALS
+        ):
+            raise ValueError(
+                f"decimals must be between 0 and {TEX_MAX_DECIMALS}: "
+                f"{self.decimals!r}"
+            )
+        if self.unit is not None and not (isfinite(self.unit) and self.unit > 0):
+            raise ValueError(f"unit must be a positive length: {self.unit!r}")
+
+    @property
+    def exact(self) -> bool:
+        return self.precision is None and self.decimals is None and self.unit is None
+
+    def number(self, x: float) -> str:
+        return self.numbers((x,))[0]
+
+    def numbers(self, values: Sequence[float]) -> list[str]:
+        if self.exact:
+            return [_exact(x) for x in values]
+        if numpy is not None and len(values) >= NUMPY_MIN_NUMBERS:
+            (values, decimals) = self._batch_decimals(values)
+        else:
+            decimals = [self._checked_decimals(x) for x in values]
+        return [_fixed(x, d) for (x, d) in zip(values, decimals)]
+
+    def length(self, x: float) -> str:
+        return self.lengths((x,))[0]
+
+    def lengths(self, values: Sequence[float]) -> list[str]:
+        """Absolute lengths of values in PGF units, for formats with a
+        unit."""
+        return [x + "pt" for x in self.numbers(self._scaled(values))]
+
+    def point(self, x: float, y: float) -> str:
+        return self.points((x, y))[0]
+
+    def points(self, coords: Sequence[float]) -> tuple[str, ...]:
+        """Points with coordinates packed as ``x0, y0, x1, y1, ...``."""
+        command = r"\pgfpointxy" if self.unit is None else r"\pgfqpoint"
+        return tuple(command + pair for pair in self.pairs(coords))
+
+    def pairs(self, coords: Sequence[float]) -> tuple[str, ...]:
+        """Coordinates packed as ``x0, y0, x1, y1, ...``, formatted as
+        ``{x0}{y0}``, ``{x1}{y1}``, ..., absolute ones with a unit."""
+        if self.unit is None:
+            (numbers, suffix) = (self.numbers(coords), "")
+        else:
+            (numbers, suffix) = (self.numbers(self._scaled(coords)), "pt")
+        return tuple(
+            "{%s%s}{%s%s}" % (numbers[k], suffix, numbers[k + 1], suffix)
+            for k in range(0, len(numbers), 2)
+        )
+
+    def _scaled(self, values: Sequence[float]) -> list[float]:
+        assert self.unit is not None
+        unit = self.unit
+        return [x * unit for x in values]
+
+    def _checked_decimals(self, x: float) -> int:
+        # the rounded number has to be within the limit
+        if not abs(x) < TEX_MAX_DIMEN:
+            raise ValueError(f"{x!r} exceeds the limit of TeX dimensions")
+        d = self._decimals(x)
+        if abs(x) >= TEX_MAX_DIMEN - 0.5 * 10.0**-d:
+            raise ValueError(f"{x!r} exceeds the limit of TeX dimensions")
+        return d
+
+    def _decimals(self, x: float) -> int:
+        if self.decimals is not None:
+            return self.decimals
+        if self.precision is None:
+            return TEX_MAX_DECIMALS
+        if x == 0:
+            return 0
+        d = self.precision - 1 - floor(log10(abs(x)))
+        return min(max(d, 0), TEX_MAX_DECIMALS)
+
+    def _batch_decimals(
+        self, values: Sequence[float]
+    ) -> tuple[Sequence[float], Sequence[int]]:
+        array = numpy.asarray(values, dtype=numpy.float64)
+        magnitudes = numpy.abs(array)
+        if self.precision is None:
+            d = TEX_MAX_DECIMALS if self.decimals is None else self.decimals
+            decimals = numpy.full(len(array), d)
+        else:
+            # not finite numbers are rejected below
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                exponents = numpy.floor(numpy.log10(magnitudes))
+                exponents[magnitudes == 0] = self.precision - 1
+                decimals = numpy.clip(
+                    self.precision - 1 - exponents, 0, TEX_MAX_DECIMALS
+                ).astype(int)
+        # the rounded numbers have to be within the limit
+        valid = magnitudes < TEX_MAX_DIMEN - 0.5 * 10.0**-decimals
+        if not valid.all():
+            x = float(array[~valid][0])
+            raise ValueError(f"{x!r} exceeds the limit of TeX dimensions")
+        return (array.tolist(), decimals.tolist())
+
+
+EXACT = NumberFormat()
+
+
+def _exact(x: float) -> str:
+    # NumPy scalars are written as plain floats
+    return float.__repr__(x) if isinstance(x, float) else repr(x)
+
+
+def _fixed(x: float, decimals: int) -> str:
+    s = "%.*f" % (decimals, x)
+    if decimals:
+        s = s.rstrip("0").rstrip(".")
+    return "0" if s == "-0" else s
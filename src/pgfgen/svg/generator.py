@@ -1,16 +1,34 @@
 from __future__ import annotations
 
 from abc import ABC
+from array import array
 from abc import abstractmethod
+from contextlib import contextmanager
 from math import atan2
 from math import sqrt
 
 from typing import Iterable
+from typing import Iterator
 from typing import Optional
+from typing import Sequence
 from typing import final
 
+from .formatting import EXACT
+from .formatting import NumberFormat
+from .sink import LineSink
+from .styles import StyleRegistry
+from .styles import StyleTable
 from .visitor import NodeVisitor
 
+from .geometry import ARC
+from .geometry import CLOSE
+from .geometry import COORDS
+from .geometry import CUBIC
+from .geometry import LINE
+from .geometry import MOVE
+from .geometry import QUAD
+from .geometry import transform_coords
+
 from .nodes import ArcNode
 from .nodes import CircleNode
 from .nodes import CloseNode
@@ -30,6 +48,7 @@ from .nodes import QuadraticBezierNode
 from .nodes import RectNode
 from .nodes import SVGBboxProvider
 from .nodes import SVGElementChildNode
+from .nodes import SVGElementContainerNode
 from .nodes import SVGElementNode
 from .nodes import SVGElementNodeWrapper
 from .nodes import SVGNode
@@ -57,6 +76,7 @@ from svgelements import Line
 from svgelements import Matrix
 from svgelements import Move
 from svgelements import Path
+from svgelements import PathSegment
 from svgelements import Point
 from svgelements import QuadraticBezier
 from svgelements import Rect
@@ -65,12 +85,21 @@ from svgelements import SimpleLine
 from svgelements import Transformable
 from svgelements.svgelements import _Polyshape
 
+# dimen register holding the scale factor of stroke widths
+SCALE_REGISTER = r"\pgfgen@scale"
+
 
 class Generator(ABC):
+    __slots__ = ()
+
     @abstractmethod
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         pass
 
+    def write(self, sink: LineSink) -> None:
+        """Writes the generated lines to the sink, at its current depth."""
+        sink.lines(self.generate(sink.indent, sink.fmt))
+
     @classmethod
     def indent(cls, lines: Iterable[str], indent: str = "  ") -> list[str]:
         return list([(indent + s) for s in lines])
@@ -79,6 +108,8 @@ class Generator(ABC):
 class SVGElementGenerator(Generator, SVGElementNodeWrapper):
     """Base class for generators handling subclasses of SVGElementNode"""
 
+    __slots__ = ()
+
     def generate_attribute_assignments(self) -> list[str]:
         assignments = []
         for item in self.wrapped.element_attributes:
@@ -91,28 +122,66 @@ class SVGElementGenerator(Generator, SVGElementNodeWrapper):
                 assignments.append(f"{key}={repr(val)}")
         return assignments
 
-    def generate_begin_pgfscope(self, indent: str = "  ") -> list[str]:
+    def generate_begin_pgfscope(
+        self,
+        indent: str = "  ",
+        fmt: NumberFormat = EXACT,
+        styles: Optional[StyleTable] = None,
+        scale: bool = False,
+    ) -> list[str]:
+        """Graphic objects with style bundles interned in ``styles`` get
+        styled as found there, a macro call for shared bundles. With
+        ``scale``, the scope computes the scale factor of stroke widths,
+        which is done by the outermost scope of generated code, unless the
+        format has a unit and widths are absolute. The outermost scope also
+        defines the macros of ``styles``, so they stay local to it."""
         attributes = " ".join(self.generate_attribute_assignments())
         if attributes:
             attributes = " " + attributes
         lines = [r"\begin{pgfscope} %% <%s%s>" % (self.wrapped.tag, attributes)]
         lines.extend(self.indent(SVGElementInfoGenerator(self).generate(), indent))
+        if scale and fmt.unit is None:
+            scale_lines = ScaleFactorGenerator().generate(indent, fmt)
+            lines.extend(self.indent(scale_lines, indent))
+        if scale and styles is not None:
+            lines.extend(self.indent(styles.definitions(indent), indent))
         if isinstance(self.wrapped, GraphicObjectNode):
-            lines.extend(
-                self.indent(
-                    GraphicObjectOptionsGenerator(self.wrapped).generate(indent), indent
+            options = None if styles is None else styles.lines(self.wrapped)
+            if options is None:
+                options = GraphicObjectOptionsGenerator(self.wrapped).generate(
+                    indent, fmt
                 )
-            )
+            lines.extend(self.indent(options, indent))
         return lines
 
     def generate_end_pgfscope(self) -> list[str]:
         return [r"\end{pgfscope} %% </%s>" % self.tag]
 
+    @contextmanager
+    def pgfscope(self, sink: LineSink) -> Iterator[None]:
+        """Writes the scope of the element, lines written within the context
+        go inside, one level deeper."""
+        scaled = sink.scaled
+        sink.lines(
+            self.generate_begin_pgfscope(
+                sink.indent, sink.fmt, sink.styles, scale=not scaled
+            )
+        )
+        sink.scaled = True
+        try:
+            with sink.nested():
+                yield
+        finally:
+            sink.scaled = scaled
+        sink.lines(self.generate_end_pgfscope())
+
 
 # ----------------------------------------------------------------------------
 # SVG generic elements (containers, etc.)
 # ----------------------------------------------------------------------------
 class GroupGenerator(SVGElementGenerator):
+    __slots__ = ("group_node",)
+
     def __init__(self, group_node: GroupNode):
         self.group_node = group_node
 
@@ -120,17 +189,21 @@ class GroupGenerator(SVGElementGenerator):
     def wrapped(self) -> SVGElementNode:
         return self.group_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        lines = self.generate_begin_pgfscope(indent)
-        generator = GeneratorNodeVisitor(indent)
-        for child in self.group_node.children_element_nodes:
-            child.accept_visitor(generator)
-        lines.extend(self.indent(generator.lines, indent))
-        lines.extend(self.generate_end_pgfscope())
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
         return lines
 
+    def write(self, sink: LineSink) -> None:
+        with self.pgfscope(sink):
+            generator = GeneratorNodeVisitor(sink=sink)
+            for child in self.group_node.children_element_nodes:
+                child.accept_visitor(generator)
+
 
 class UseGenerator(SVGElementGenerator):
+    __slots__ = ("use_node",)
+
     def __init__(self, use_node: UseNode):
         self.use_node = use_node
 
@@ -138,17 +211,21 @@ class UseGenerator(SVGElementGenerator):
     def wrapped(self) -> SVGElementNode:
         return self.use_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        lines = self.generate_begin_pgfscope(indent)
-        generator = GeneratorNodeVisitor(indent)
-        for child in self.use_node.children_element_nodes:
-            child.accept_visitor(generator)
-        lines.extend(self.indent(generator.lines, indent))
-        lines.extend(self.generate_end_pgfscope())
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
         return lines
 
+    def write(self, sink: LineSink) -> None:
+        with self.pgfscope(sink):
+            generator = GeneratorNodeVisitor(sink=sink)
+            for child in self.use_node.children_element_nodes:
+                child.accept_visitor(generator)
+
 
 class SymbolGenerator(SVGElementGenerator):
+    __slots__ = ("symbol_node",)
+
     def __init__(self, symbol_node: SymbolNode):
         self.symbol_node = symbol_node
 
@@ -156,7 +233,7 @@ class SymbolGenerator(SVGElementGenerator):
     def wrapped(self) -> SVGElementNode:
         return self.symbol_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         lines = []
         if not isinstance(self.symbol_node.parent, UseNode):
             lines.extend(
@@ -178,12 +255,16 @@ class SymbolGenerator(SVGElementGenerator):
 
 @final
 class SVGGenerator(GroupGenerator):
+    __slots__ = ()
+
     def __init__(self, svg_node: SVGNode):
         super().__init__(svg_node)
 
 
 @final
 class UnsupportedSVGElementGenerator(SVGElementGenerator):
+    __slots__ = ("unsupported_svg_element_node",)
+
     def __init__(self, unsupported_svg_element_node: UnsupportedSVGElementNode):
         self.unsupported_svg_element_node = unsupported_svg_element_node
 
@@ -191,7 +272,7 @@ class UnsupportedSVGElementGenerator(SVGElementGenerator):
     def wrapped(self) -> SVGElementNode:
         return self.unsupported_svg_element_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         extra = ""
         if hasattr(self.element, "id"):
             extra = f" (id={self.element.id})"
@@ -207,6 +288,8 @@ class UnsupportedSVGElementGenerator(SVGElementGenerator):
 class ShapeGenerator(SVGElementGenerator):
     """Base class for shape generators"""
 
+    __slots__ = ()
+
     @property
     @abstractmethod
     def shape_node(self) -> ShapeNode:
@@ -235,6 +318,8 @@ class ShapeGenerator(SVGElementGenerator):
 
 @final
 class CircleGenerator(ShapeGenerator):
+    __slots__ = ("circle_node",)
+
     def __init__(self, circle_node: CircleNode):
         self.circle_node = circle_node
 
@@ -246,39 +331,42 @@ class CircleGenerator(ShapeGenerator):
     def circle(self) -> Circle:
         return self.circle_node.circle
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
+        return lines
+
+    def write(self, sink: LineSink) -> None:
         c = self.circle.implicit_center
-        vrx = Point(self.circle.implicit_rx, 0)
-        vry = Point(0, self.circle.implicit_ry)
+        # radii of the shape, the transform applies to them
+        vrx = Point(self.circle.rx, 0)
+        vry = Point(0, self.circle.ry)
 
         m = self.element.transform
 
         vrx = m.transform_vector(vrx)
         vry = m.transform_vector(vry)
 
-        if isinstance(self.root, SVG2PGFTransform):
-            c = self.root.svg2pgf_point(c)
-            vrx = self.root.svg2pgf_vector(vrx)
-            vry = self.root.svg2pgf_vector(vry)
-
-        c_str = r"\pgfpointxy{%r}{%r}" % (c.x, c.y)
-        vrx_str = r"\pgfpointxy{%r}{%r}" % (vrx.x, vrx.y)
-        vry_str = r"\pgfpointxy{%r}{%r}" % (vry.x, vry.y)
+        root = self.root
+        if isinstance(root, SVG2PGFTransform):
+            c = root.svg2pgf_point(c)
+            vrx = root.svg2pgf_vector(vrx)
+            vry = root.svg2pgf_vector(vry)
 
-        lines = self.generate_begin_pgfscope(indent)
-        lines.extend(
-            self.indent(
-                [r"\pgfpathellipse{%s}{%s}{%s}" % (c_str, vrx_str, vry_str)], indent
-            )
-        )
-        lines.extend(self.indent(self.generate_pgfusepath(), indent))
-        lines.extend(self.generate_end_pgfscope())
+        fmt = sink.fmt
+        c_str = fmt.point(c.x, c.y)
+        vrx_str = fmt.point(vrx.x, vrx.y)
+        vry_str = fmt.point(vry.x, vry.y)
 
-        return lines
+        with self.pgfscope(sink):
+            sink.line(r"\pgfpathellipse{%s}{%s}{%s}" % (c_str, vrx_str, vry_str))
+            sink.lines(self.generate_pgfusepath())
 
 
 @final
 class EllipseGenerator(ShapeGenerator):
+    __slots__ = ("ellipse_node",)
+
     def __init__(self, ellipse_node: EllipseNode):
         self.ellipse_node = ellipse_node
 
@@ -290,37 +378,41 @@ class EllipseGenerator(ShapeGenerator):
     def ellipse(self) -> Ellipse:
         return self.ellipse_node.ellipse
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
+        return lines
+
+    def write(self, sink: LineSink) -> None:
         c = self.ellipse.implicit_center
-        vrx = Point(self.ellipse.implicit_rx, 0)
-        vry = Point(0, self.ellipse.implicit_ry)
+        # radii of the shape, the transform applies to them
+        vrx = Point(self.ellipse.rx, 0)
+        vry = Point(0, self.ellipse.ry)
 
         m = self.element.transform
 
         vrx = m.transform_vector(vrx)
         vry = m.transform_vector(vry)
 
-        if isinstance(self.root, SVG2PGFTransform):
-            c = self.root.svg2pgf_point(c)
-            vrx = self.root.svg2pgf_vector(vrx)
-            vry = self.root.svg2pgf_vector(vry)
-
-        lines = self.generate_begin_pgfscope(indent)
-        c_str = r"\pgfpointxy{%r}{%r}" % (c.x, c.y)
-        vrx_str = r"\pgfpointxy{%r}{%r}" % (vrx.x, vrx.y)
-        vry_str = r"\pgfpointxy{%r}{%r}" % (vry.x, vry.y)
-        lines.extend(
-            self.indent(
-                [r"\pgfpathellipse{%s}{%s}{%s}" % (c_str, vrx_str, vry_str)], indent
-            )
-        )
-        lines.extend(self.indent(self.generate_pgfusepath(), indent))
-        lines.extend(self.generate_end_pgfscope())
-        return lines
+        root = self.root
+        if isinstance(root, SVG2PGFTransform):
+            c = root.svg2pgf_point(c)
+            vrx = root.svg2pgf_vector(vrx)
+            vry = root.svg2pgf_vector(vry)
+
+        fmt = sink.fmt
+        c_str = fmt.point(c.x, c.y)
+        vrx_str = fmt.point(vrx.x, vrx.y)
+        vry_str = fmt.point(vry.x, vry.y)
+        with self.pgfscope(sink):
+            sink.line(r"\pgfpathellipse{%s}{%s}{%s}" % (c_str, vrx_str, vry_str))
+            sink.lines(self.generate_pgfusepath())
 
 
 @final
 class PathGenerator(ShapeGenerator):
+    __slots__ = ("path_node",)
+
     def __init__(self, path_node: PathNode):
         self.path_node = path_node
 
@@ -332,19 +424,84 @@ class PathGenerator(ShapeGenerator):
     def path(self) -> Path:
         return self.path_node.path
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        lines = self.generate_begin_pgfscope(indent)
-        generator = GeneratorNodeVisitor(indent)
-        for child in self.path_node.children_path_segment_nodes:
-            child.accept_visitor(generator)
-        lines.extend(self.indent(generator.lines, indent))
-        lines.extend(self.indent(self.generate_pgfusepath(), indent))
-        lines.extend(self.generate_end_pgfscope())
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
         return lines
 
+    def write(self, sink: LineSink) -> None:
+        with self.pgfscope(sink):
+            sink.lines(self.generate_segments(sink.indent, sink.fmt))
+            sink.lines(self.generate_pgfusepath())
+
+    def generate_segments(
+        self, indent: str = "  ", fmt: NumberFormat = EXACT
+    ) -> list[str]:
+        """Generates path construction commands straight from the packed
+        geometry. Points of the whole path are transformed and formatted at
+        once, then filled in the commands of segments. Segment nodes are only
+        created for arcs and unsupported segments."""
+        geometry = self.path_node.geometry
+        point_coords = self._point_coords()
+        pairs = fmt.pairs(point_coords)
+        commands = _segment_commands(fmt)
+        (coords, others) = (geometry.coords, iter(geometry.others))
+        lines: list[str] = []
+        (i, j) = (0, 0)
+        for opcode in geometry.opcodes:
+            n = COORDS[opcode]
+            command = commands.get(opcode)
+            if command is None:
+                c = coords[i : i + n]
+                lines.extend(self._generate_segment(opcode, c, others, indent, fmt))
+            else:
+                lines.append(command % pairs[j : j + n // 2])
+                j += n // 2
+            i += n
+        return lines
+
+    def _point_coords(self) -> Sequence[float]:
+        """Coordinates of points of the segments other than arcs, in PGF
+        space."""
+        geometry = self.path_node.geometry
+        coords: Sequence[float] = geometry.coords
+        if ARC in geometry.opcodes:
+            points = array("d")
+            i = 0
+            for opcode in geometry.opcodes:
+                if opcode != ARC:
+                    points.extend(coords[i : i + COORDS[opcode]])
+                i += COORDS[opcode]
+            coords = points
+        m = self.path_node.local2pgf_transform
+        return coords if m is None else transform_coords(coords, m)
+
+    def _generate_segment(
+        self,
+        opcode: int,
+        c: Iterable[float],
+        others: Iterator[PathSegment],
+        indent: str,
+        fmt: NumberFormat,
+    ) -> list[str]:
+        generator = GeneratorNodeVisitor(indent, fmt=fmt)
+        if opcode == ARC:
+            c = list(c)
+            points = [Point(c[k], c[k + 1]) for k in range(0, 10, 2)]
+            arc = Arc(*points, c[10])
+            ArcNode(arc, self.path_node).accept_visitor(generator)
+        else:
+            segment = next(others)
+            UnsupportedPathSegmentNode(segment, self.path_node).accept_visitor(
+                generator
+            )
+        return generator.lines
+
 
 @final
 class RectGenerator(ShapeGenerator):
+    __slots__ = ("rect_node",)
+
     def __init__(self, rect_node: RectNode):
         self.rect_node = rect_node
 
@@ -356,38 +513,36 @@ class RectGenerator(ShapeGenerator):
     def rect(self) -> Rect:
         return self.rect_node.rect
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
+        return lines
+
+    def write(self, sink: LineSink) -> None:
         position = Point(self.rect.x, self.rect.y)
         diagonal = Point(self.rect.width, self.rect.height)
 
-        if isinstance(self.root, SVG2PGFTransform):
-            svg2pgf = self.root.svg2pgf_transform
-            position = self.root.svg2pgf_point(position)
-            diagonal = self.root.svg2pgf_vector(diagonal)
+        root = self.root
+        if isinstance(root, SVG2PGFTransform):
+            svg2pgf = root.svg2pgf_transform
+            position = root.svg2pgf_point(position)
+            diagonal = root.svg2pgf_vector(diagonal)
         else:
             svg2pgf = Matrix.identity()
 
-        lines = self.generate_begin_pgfscope(indent)
-        lines.extend(
-            self.indent(
-                PGFTransformcmGenerator(self.element.transform, svg2pgf).generate(),
-                indent,
-            )
-        )
-        position_str = r"\pgfpointxy{%r}{%r}" % (position.x, position.y)
-        diagonal_str = r"\pgfpointxy{%r}{%r}" % (diagonal.x, diagonal.y)
-        lines.extend(
-            self.indent(
-                [r"\pgfpathrectangle{%s}{%s}" % (position_str, diagonal_str)], indent
-            )
-        )
-        lines.extend(self.indent(self.generate_pgfusepath(), indent))
-        lines.extend(self.generate_end_pgfscope())
-        return lines
+        fmt = sink.fmt
+        with self.pgfscope(sink):
+            PGFTransformcmGenerator(self.element.transform, svg2pgf).write(sink)
+            position_str = fmt.point(position.x, position.y)
+            diagonal_str = fmt.point(diagonal.x, diagonal.y)
+            sink.line(r"\pgfpathrectangle{%s}{%s}" % (position_str, diagonal_str))
+            sink.lines(self.generate_pgfusepath())
 
 
 @final
 class SimpleLineGenerator(ShapeGenerator):
+    __slots__ = ("simple_line_node",)
+
     def __init__(self, simple_line_node: SimpleLineNode):
         self.simple_line_node = simple_line_node
 
@@ -399,32 +554,32 @@ class SimpleLineGenerator(ShapeGenerator):
     def simple_line(self) -> SimpleLine:
         return self.simple_line_node.simple_line
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
+        return lines
+
+    def write(self, sink: LineSink) -> None:
         p1 = Point(self.simple_line.implicit_x1, self.simple_line.implicit_y1)
         p2 = Point(self.simple_line.implicit_x2, self.simple_line.implicit_y2)
 
-        if isinstance(self.root, SVG2PGFTransform):
-            p1 = self.root.svg2pgf_point(p1)
-            p2 = self.root.svg2pgf_point(p2)
+        root = self.root
+        if isinstance(root, SVG2PGFTransform):
+            p1 = root.svg2pgf_point(p1)
+            p2 = root.svg2pgf_point(p2)
 
-        lines = self.generate_begin_pgfscope(indent)
-        p1_str = r"\pgfpointxy{%r}{%r}" % (p1.x, p1.y)
-        p2_str = r"\pgfpointxy{%r}{%r}" % (p2.x, p2.y)
-        lines.extend(
-            self.indent(
-                [
-                    r"\pgfpathmoveto{%s}" % p1_str,
-                    r"\pgfpathlineto{%s}" % p2_str,
-                ],
-                indent,
-            )
-        )
-        lines.extend(self.indent(self.generate_pgfusepath(), indent))
-        lines.extend(self.generate_end_pgfscope())
-        return lines
+        coords = (p1.x, p1.y, p2.x, p2.y)
+        (move, line) = sink.fmt.pairs(coords)
+        commands = _segment_commands(sink.fmt)
+        with self.pgfscope(sink):
+            sink.line(commands[MOVE] % move)
+            sink.line(commands[LINE] % line)
+            sink.lines(self.generate_pgfusepath())
 
 
 class _PolyshapeGenerator(ShapeGenerator):
+    __slots__ = ("polyshape_node",)
+
     def __init__(self, polyshape_node: _PolyshapeNode):
         self.polyshape_node = polyshape_node
 
@@ -436,40 +591,47 @@ class _PolyshapeGenerator(ShapeGenerator):
     def shape(self) -> _Polyshape:
         return self.polyshape_node.shape
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        first = True
-        lines = self.generate_begin_pgfscope(indent)
-        for point in self.shape:
-            if isinstance(self.root, SVG2PGFTransform):
-                point = self.root.svg2pgf_point(point)
-            point_str = r"\pgfpointxy{%r}{%r}" % (point.x, point.y)
-            if first:
-                cmd = r"\pgfpathmoveto{%s}" % point_str
-                first = False
-            else:
-                cmd = r"\pgfpathlineto{%s}" % point_str
-            lines.extend(self.indent([cmd], indent))
-        if self.polyshape_node.is_closed:
-            lines.extend(self.indent([r"\pgfpathclose"], indent))
-        lines.extend(self.indent(self.generate_pgfusepath(), indent))
-        lines.extend(self.generate_end_pgfscope())
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        lines: list[str] = []
+        self.write(LineSink(lines.append, indent, fmt))
         return lines
 
+    def write(self, sink: LineSink) -> None:
+        # points are transformed and formatted at once
+        coords: Sequence[float] = [u for p in self.shape for u in (p.x, p.y)]
+        m = self.polyshape_node.local2pgf_transform
+        if m is not None:
+            coords = transform_coords(coords, m)
+        pairs = sink.fmt.pairs(coords)
+        commands = _segment_commands(sink.fmt)
+        with self.pgfscope(sink):
+            sink.lines(commands[MOVE] % p for p in pairs[:1])
+            sink.lines(commands[LINE] % p for p in pairs[1:])
+            if self.polyshape_node.is_closed:
+                sink.line(commands[CLOSE])
+            sink.lines(self.generate_pgfusepath())
+
 
 @final
 class PolylineGenerator(_PolyshapeGenerator):
+    __slots__ = ()
+
     def __init__(self, polyline_node: PolylineNode):
         super().__init__(polyline_node)
 
 
 @final
 class PolygonGenerator(_PolyshapeGenerator):
+    __slots__ = ()
+
     def __init__(self, polygon_node: PolygonNode):
         super().__init__(polygon_node)
 
 
 @final
 class UnsupportedShapeGenerator(ShapeGenerator):
+    __slots__ = ("unsupported_shape_node",)
+
     def __init__(self, unsupported_shape_node: UnsupportedShapeNode):
         self.unsupported_shape_node = unsupported_shape_node
 
@@ -477,7 +639,7 @@ class UnsupportedShapeGenerator(ShapeGenerator):
     def shape_node(self) -> ShapeNode:
         return self.unsupported_shape_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         extra = ""
         if hasattr(self.element, "id"):
             extra = f" (id={self.element.id})"
@@ -490,11 +652,53 @@ class UnsupportedShapeGenerator(ShapeGenerator):
 # ----------------------------------------------------------------------------
 # Path segments
 # ----------------------------------------------------------------------------
-class PathSegmentGenerator(PathSegmentNodeWrapper):
-    pass
+class PathSegmentGenerator(Generator, PathSegmentNodeWrapper):
+    """Generators of the segments which have a fixed number of points also
+    provide a static ``code(coords)``, which returns the path construction
+    command given coordinates of the points, already in PGF space (packed as
+    in PathGeometry). The commands are in _SEGMENT_COMMANDS, PathGenerator
+    fills them with points of whole paths. Formats with a unit use the
+    commands of _ABSOLUTE_SEGMENT_COMMANDS, with points read without
+    arithmetic on the xy-coordinate system, which are still subject to the
+    transformation matrix, as rectangles and ellipses are."""
+
+    __slots__ = ()
+
+    def pgf_coords(self, *points: Point) -> Sequence[float]:
+        """Packed coordinates of the points, in PGF space."""
+        coords = [u for p in points for u in (p.x, p.y)]
+        m = self.local2pgf_transform
+        return coords if m is None else transform_coords(coords, m)
+
+
+# path construction commands of the segments packed in PathGeometry, by
+# opcode, taking coordinates of points formatted as pairs
+_SEGMENT_COMMANDS = {
+    MOVE: r"\pgfpathmoveto{\pgfpointxy%s}",
+    LINE: r"\pgfpathlineto{\pgfpointxy%s}",
+    QUAD: r"\pgfpathquadraticcurveto{\pgfpointxy%s}{\pgfpointxy%s}",
+    CUBIC: r"\pgfpathcurveto{\pgfpointxy%s}{\pgfpointxy%s}{\pgfpointxy%s}",
+    CLOSE: r"\pgfpathclose",
+}
+
+# the same for absolute coordinates; the quick \pgfpathq... commands would
+# ignore the transformation matrix, under which figures get placed
+_ABSOLUTE_SEGMENT_COMMANDS = {
+    MOVE: r"\pgfpathmoveto{\pgfqpoint%s}",
+    LINE: r"\pgfpathlineto{\pgfqpoint%s}",
+    QUAD: r"\pgfpathquadraticcurveto{\pgfqpoint%s}{\pgfqpoint%s}",
+    CUBIC: r"\pgfpathcurveto{\pgfqpoint%s}{\pgfqpoint%s}{\pgfqpoint%s}",
+    CLOSE: r"\pgfpathclose",
+}
+
+
+def _segment_commands(fmt: NumberFormat) -> dict[int, str]:
+    return _SEGMENT_COMMANDS if fmt.unit is None else _ABSOLUTE_SEGMENT_COMMANDS
 
 
 class ArcGenerator(PathSegmentGenerator):
+    __slots__ = ("arc_node",)
+
     def __init__(self, arc_node: ArcNode):
         self.arc_node = arc_node
 
@@ -506,43 +710,45 @@ class ArcGenerator(PathSegmentGenerator):
     def arc(self) -> Arc:
         return self.arc_node.arc
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         if self.arc.start == self.arc.end:
             # this is equivalent to omitting the segment, so do nothing
             return []
+        m = self.local2pgf_transform
         if self.arc.radius.x == 0 or self.arc.radius.y == 0:
             end = self.arc.end
-            if isinstance(self.root, SVG2PGFTransform):
-                end = self.root.svg2pgf_point(end)
-            return [r"\pgfpathlineto{\pgfpointxy{%r}{%r}}" % (end.x, end.y)]
+            if m is not None:
+                end = m.point_in_matrix_space(end)
+            return [LineGenerator.code((end.x, end.y), fmt)]
 
-        if isinstance(self.root, SVG2PGFTransform):
-            arc = self.arc * self.root.svg2pgf_transform
+        if m is not None:
+            arc = self.arc * m
         else:
             arc = self.arc
 
         vrx = arc.prx - arc.center
         vry = arc.pry - arc.center
 
-        sweep = self._determine_sweep(vrx, vry)
+        sweep = self._determine_sweep(vrx, vry, m)
         (start_angle, end_angle) = self._determine_angles(vrx, vry, arc, sweep)
 
-        vrx_str = r"\pgfpointxy{%r}{%r}" % (vrx.x, vrx.y)
-        vry_str = r"\pgfpointxy{%r}{%r}" % (vry.x, vry.y)
-        return [
-            r"\pgfpatharcaxes{%r}{%r}{%s}{%s}"
-            % (start_angle, end_angle, vrx_str, vry_str)
-        ]
+        angles = fmt.numbers((start_angle, end_angle))
+        vrx_str = fmt.point(vrx.x, vrx.y)
+        vry_str = fmt.point(vry.x, vry.y)
+        return [r"\pgfpatharcaxes{%s}{%s}{%s}{%s}" % (*angles, vrx_str, vry_str)]
 
-    def _determine_sweep(self, vrx: Point, vry: Point) -> float:
+    def _determine_sweep(
+        self, vrx: Point, vry: Point, m: Optional[Matrix] = None
+    ) -> float:
         # Test whether our SVG axes transformed to PGF space comprise right- or
         # left-handed pair of vectors. If left-handed,then we have to change
         # sweep sign.
         ex = Point(1, 0)
         ey = Point(0, 1)
-        if isinstance(self.root, SVG2PGFTransform):
-            ex = self.root.svg2pgf_vector(ex)
-            ey = self.root.svg2pgf_vector(ey)
+        if m is not None:
+            v = m.vector()
+            ex = v.point_in_matrix_space(ex)
+            ey = v.point_in_matrix_space(ey)
         ez = ex.x * ey.y - ex.y * ey.x
         if ez > 0:  # right-handed
             sweep = self.arc.sweep
@@ -596,6 +802,8 @@ class ArcGenerator(PathSegmentGenerator):
 
 
 class CloseGenerator(PathSegmentGenerator):
+    __slots__ = ("close_node",)
+
     def __init__(self, close_node: CloseNode):
         self.close_node = close_node
 
@@ -603,11 +811,17 @@ class CloseGenerator(PathSegmentGenerator):
     def wrapped(self) -> PathSegmentNode:
         return self.close_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        return [r"\pgfpathclose"]
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        return [self.code(())]
+
+    @staticmethod
+    def code(coords: Sequence[float], fmt: NumberFormat = EXACT) -> str:
+        return _segment_commands(fmt)[CLOSE]
 
 
 class CubicBezierGenerator(PathSegmentGenerator):
+    __slots__ = ("cubic_bezier_node",)
+
     def __init__(self, cubic_bezier_node: CubicBezierNode):
         self.cubic_bezier_node = cubic_bezier_node
 
@@ -619,21 +833,19 @@ class CubicBezierGenerator(PathSegmentGenerator):
     def cubic_bezier(self) -> CubicBezier:
         return self.cubic_bezier_node.cubic_bezier
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        c1 = self.cubic_bezier.control1
-        c2 = self.cubic_bezier.control2
-        end = self.segment.end
-        if isinstance(self.root, SVG2PGFTransform):
-            c1 = self.root.svg2pgf_point(c1)
-            c2 = self.root.svg2pgf_point(c2)
-            end = self.root.svg2pgf_point(end)
-        c1_str = r"\pgfpointxy{%r}{%r}" % (c1.x, c1.y)
-        c2_str = r"\pgfpointxy{%r}{%r}" % (c2.x, c2.y)
-        end_str = r"\pgfpointxy{%r}{%r}" % (end.x, end.y)
-        return [r"\pgfpathcurveto{%s}{%s}{%s}" % (c1_str, c2_str, end_str)]
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        bezier = self.cubic_bezier
+        coords = self.pgf_coords(bezier.control1, bezier.control2, bezier.end)
+        return [self.code(coords, fmt)]
+
+    @staticmethod
+    def code(coords: Sequence[float], fmt: NumberFormat = EXACT) -> str:
+        return _segment_commands(fmt)[CUBIC] % fmt.pairs(coords)
 
 
 class LineGenerator(PathSegmentGenerator):
+    __slots__ = ("line_node",)
+
     def __init__(self, line_node: LineNode):
         self.line_node = line_node
 
@@ -645,14 +857,17 @@ class LineGenerator(PathSegmentGenerator):
     def line(self) -> Line:
         return self.line_node.line
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        end = self.line.end
-        if isinstance(self.root, SVG2PGFTransform):
-            end = self.root.svg2pgf_point(end)
-        return [r"\pgfpathlineto{\pgfpointxy{%r}{%r}}" % (end.x, end.y)]
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        return [self.code(self.pgf_coords(self.line.end), fmt)]
+
+    @staticmethod
+    def code(coords: Sequence[float], fmt: NumberFormat = EXACT) -> str:
+        return _segment_commands(fmt)[LINE] % fmt.pairs(coords)
 
 
 class MoveGenerator(PathSegmentGenerator):
+    __slots__ = ("move_node",)
+
     def __init__(self, move_node: MoveNode):
         self.move_node = move_node
 
@@ -664,14 +879,17 @@ class MoveGenerator(PathSegmentGenerator):
     def move(self) -> Move:
         return self.move_node.move
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        end = self.move.end
-        if isinstance(self.root, SVG2PGFTransform):
-            end = self.root.svg2pgf_point(end)
-        return [r"\pgfpathmoveto{\pgfpointxy{%r}{%r}}" % (end.x, end.y)]
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        return [self.code(self.pgf_coords(self.move.end), fmt)]
+
+    @staticmethod
+    def code(coords: Sequence[float], fmt: NumberFormat = EXACT) -> str:
+        return _segment_commands(fmt)[MOVE] % fmt.pairs(coords)
 
 
 class QuadraticBezierGenerator(PathSegmentGenerator):
+    __slots__ = ("quadratic_bezier_node",)
+
     def __init__(self, quadratic_bezier_node: QuadraticBezierNode):
         self.quadratic_bezier_node = quadratic_bezier_node
 
@@ -683,18 +901,18 @@ class QuadraticBezierGenerator(PathSegmentGenerator):
     def quadratic_bezier(self) -> QuadraticBezier:
         return self.quadratic_bezier_node.quadratic_bezier
 
-    def generate(self, indent: str = "  ") -> list[str]:
-        c = self.quadratic_bezier.control
-        end = self.segment.end
-        if isinstance(self.root, SVG2PGFTransform):
-            c = self.root.svg2pgf_point(c)
-            end = self.root.svg2pgf_point(end)
-        c_str = r"\pgfpointxy{%r}{%r}" % (c.x, c.y)
-        end_str = r"\pgfpointxy{%r}{%r}" % (end.x, end.y)
-        return [r"\pgfpathquadraticcurveto{%s}{%s}" % (c_str, end_str)]
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        bezier = self.quadratic_bezier
+        return [self.code(self.pgf_coords(bezier.control, bezier.end), fmt)]
+
+    @staticmethod
+    def code(coords: Sequence[float], fmt: NumberFormat = EXACT) -> str:
+        return _segment_commands(fmt)[QUAD] % fmt.pairs(coords)
 
 
 class UnsupportedPathSegmentGenerator(PathSegmentGenerator):
+    __slots__ = ("unsupported_path_segment_node",)
+
     def __init__(self, unsupported_path_segment_node: UnsupportedPathSegmentNode):
         self.unsupported_path_segment_node = unsupported_path_segment_node
 
@@ -702,7 +920,7 @@ class UnsupportedPathSegmentGenerator(PathSegmentGenerator):
     def wrapped(self) -> PathSegmentNode:
         return self.unsupported_path_segment_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         extra = ""
         if hasattr(self.segment, "id"):
             extra = f" (id={self.segment.id})"
@@ -716,6 +934,8 @@ class UnsupportedPathSegmentGenerator(PathSegmentGenerator):
 # ---------------------------------------------------------------------------
 @final
 class GraphicObjectOptionsGenerator(GraphicObjectNodeWrapper):
+    __slots__ = ("graphic_object_node",)
+
     def __init__(self, graphic_object_node: GraphicObjectNode):
         self.graphic_object_node = graphic_object_node
 
@@ -723,50 +943,63 @@ class GraphicObjectOptionsGenerator(GraphicObjectNodeWrapper):
     def wrapped(self) -> GraphicObjectNode:
         return self.graphic_object_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(
+        self,
+        indent: str = "  ",
+        fmt: NumberFormat = EXACT,
+        colors: Optional[StyleRegistry] = None,
+    ) -> list[str]:
+        """With ``colors``, colors are the ones defined by the registry."""
         lines = []
-        lines.extend(self.generate_color_options())
-        lines.extend(self.generate_stroke_width())
-        lines.extend(self.generate_stroke_dash())
+        lines.extend(self.generate_color_options(fmt, colors))
+        lines.extend(self.generate_stroke_width(fmt))
+        lines.extend(self.generate_stroke_dash(fmt))
         lines.extend(self.generate_stroke_linejoin())
-        lines.extend(self.generate_stroke_miterlimit())
+        lines.extend(self.generate_stroke_miterlimit(fmt))
         lines.extend(self.generate_stroke_linecap())
         return lines
 
-    def generate_color_options(self) -> list[str]:
+    def generate_color_options(
+        self, fmt: NumberFormat = EXACT, colors: Optional[StyleRegistry] = None
+    ) -> list[str]:
         lines = []
         for option in ("fill", "stroke"):
-            lines.extend(self.generate_color_option(option))
+            lines.extend(self.generate_color_option(option, fmt, colors))
         return lines
 
-    def generate_color_option(self, option: str) -> list[str]:
+    def generate_color_option(
+        self,
+        option: str,
+        fmt: NumberFormat = EXACT,
+        colors: Optional[StyleRegistry] = None,
+    ) -> list[str]:
         """The option is either 'fill' or 'stroke'"""
         lines = []
         color = getattr(self, option)
         if isinstance(color, Color):
             if color.value is not None:
-                cvar = f"{option}color"
                 chex = color.hexrgb[1:]  # remove leading '#'
-                lines.append(r"\definecolor{%s}{HTML}{%s}" % (cvar, chex))
+                if colors is None:
+                    cvar = f"{option}color"
+                    lines.append(r"\definecolor{%s}{HTML}{%s}" % (cvar, chex))
+                else:
+                    cvar = colors.color(chex)
                 lines.append(r"\pgfset%scolor{%s}" % (option, cvar))
             if color.opacity is not None:
-                lines.append(r"\pgfset%sopacity{%s}" % (option, color.opacity))
+                opacity = fmt.number(color.opacity)
+                lines.append(r"\pgfset%sopacity{%s}" % (option, opacity))
         return lines
 
-    def generate_stroke_width(self) -> list[str]:
+    def generate_stroke_width(self, fmt: NumberFormat = EXACT) -> list[str]:
         if not isinstance(self.implicit_stroke_width, float):
             return []
 
-        e = 1.0 / sqrt(2.0)
         w = self.implicit_stroke_width * self._svg2pgf_scale()
-        return [
-            r"\pgf@process{\pgfpointxy{%r}{%r}}" % (e, e),
-            r"\pgfmathparse{veclen(scalar(\the\pgf@x), scalar(\the\pgf@y))}",
-            r"\pgfmathsetlength\pgf@xa{\pgfmathresult} % scale factor",
-            r"\pgfsetlinewidth{%r*\pgf@xa}" % w,
-        ]
+        if fmt.unit is not None:
+            return [r"\pgfsetlinewidth{%s}" % fmt.length(w)]
+        return [r"\pgfsetlinewidth{%s*%s}" % (fmt.number(w), SCALE_REGISTER)]
 
-    def generate_stroke_dash(self) -> list[str]:
+    def generate_stroke_dash(self, fmt: NumberFormat = EXACT) -> list[str]:
         if not isinstance(self.wrapped, SVGElementNode):
             return []
         dasharray = self.implicit_stroke_dasharray
@@ -777,18 +1010,13 @@ class GraphicObjectOptionsGenerator(GraphicObjectNodeWrapper):
             return [r"\pgfsetdash{}{0pt}"]
 
         scale = self._svg2pgf_scale()
-        dashoffset = scale * dashoffset
-        dasharray = [scale * x for x in dasharray]
-        dasharray_str = "".join([(r"{%r*\pgf@xa}" % x) for x in dasharray])
-
-        e = 1.0 / sqrt(2.0)
-
-        return [
-            r"\pgf@process{\pgfpointxy{%r}{%r}}" % (e, e),
-            r"\pgfmathparse{veclen(scalar(\the\pgf@x), scalar(\the\pgf@y))}",
-            r"\pgfmathsetlength\pgf@xa{\pgfmathresult} % scale factor",
-            r"\pgfsetdash{%s}{%r*\pgf@xa}" % (dasharray_str, dashoffset),
-        ]
+        values = [scale * x for x in dasharray] + [scale * dashoffset]
+        if fmt.unit is not None:
+            lengths = fmt.lengths(values)
+        else:
+            lengths = [r"%s*%s" % (x, SCALE_REGISTER) for x in fmt.numbers(values)]
+        dasharray_str = "".join("{%s}" % x for x in lengths[:-1])
+        return [r"\pgfsetdash{%s}{%s}" % (dasharray_str, lengths[-1])]
 
     def generate_stroke_linejoin(self) -> list[str]:
         if not isinstance(self.wrapped, SVGElementNode):
@@ -807,13 +1035,13 @@ class GraphicObjectOptionsGenerator(GraphicObjectNodeWrapper):
             return [r"\pgfsys@miterjoin"]
         return []
 
-    def generate_stroke_miterlimit(self) -> list[str]:
+    def generate_stroke_miterlimit(self, fmt: NumberFormat = EXACT) -> list[str]:
         if not isinstance(self.wrapped, SVGElementNode):
             return []
         miterlimit: Optional[str] = self.wrapped.values.get("stroke-miterlimit")
         if miterlimit is None:
             return []
-        return [r"\pgfsys@setmiterlimit{%r}" % float(miterlimit)]
+        return [r"\pgfsys@setmiterlimit{%s}" % fmt.number(float(miterlimit))]
 
     def generate_stroke_linecap(self) -> list[str]:
         if not isinstance(self.wrapped, SVGElementNode):
@@ -830,18 +1058,43 @@ class GraphicObjectOptionsGenerator(GraphicObjectNodeWrapper):
         return []
 
     def _svg2pgf_scale(self) -> float:
-        if not isinstance(self.wrapped, SVGElementChildNode) or not isinstance(
-            self.wrapped.root, SVG2PGFTransform
-        ):
+        if not isinstance(self.wrapped, SVGElementChildNode):
+            return 1.0
+        root = self.wrapped.root
+        if not isinstance(root, SVG2PGFTransform):
             return 1.0
-        return self._scale(self.wrapped.root.svg2pgf_transform)
+        return self._scale(root.svg2pgf_transform)
 
     def _scale(self, transform: Matrix) -> float:
         return sqrt(abs(transform.determinant))
 
 
+def collect_styles(
+    node: SVGElementNode,
+    fmt: NumberFormat = EXACT,
+    registry: Optional[StyleRegistry] = None,
+) -> StyleTable:
+    """Collects style bundles of graphic objects in the subtree of the node,
+    in the order they get generated. With a ``registry``, the bundles and
+    their colors are registered there."""
+    styles = StyleTable(registry)
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, UnsupportedShapeNode):
+            continue  # generated without a scope
+        if isinstance(node, GraphicObjectNode):
+            generator = GraphicObjectOptionsGenerator(node)
+            styles.add(node, generator.generate("", fmt, registry))
+        if isinstance(node, SVGElementContainerNode):
+            stack.extend(reversed(node.children))
+    return styles
+
+
 @final
 class SVGElementInfoGenerator(SVGElementNodeWrapper):
+    __slots__ = ("wrapped_element_node",)
+
     def __init__(self, wrapped_element_node: SVGElementNode):
         self.wrapped_element_node = wrapped_element_node
 
@@ -849,23 +1102,24 @@ class SVGElementInfoGenerator(SVGElementNodeWrapper):
     def wrapped(self) -> SVGElementNode:
         return self.wrapped_element_node
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         lines = []
+        root = self.root
         if isinstance(self.wrapped, SVGBboxProvider):
             svg_bb = self.wrapped.svg_bbox()
             lines.extend(self.generate_svg_bbox(svg_bb))
-            if isinstance(self.root, SVG2PGFTransform):
-                pgf_bb = self.root.svg2pgf_bbox(svg_bb)
+            if isinstance(root, SVG2PGFTransform):
+                pgf_bb = root.svg2pgf_bbox(svg_bb)
                 lines.extend(self.generate_pgf_bbox(pgf_bb))
-        if self.wrapped is self.root and isinstance(self.wrapped, SVG2PGFTransform):
+        if self.wrapped is root and isinstance(self.wrapped, SVG2PGFTransform):
             svg2pgf = self.wrapped.svg2pgf_transform
             lines.append(f"% SVG2PGF transform: {repr(svg2pgf)}")
         if isinstance(self.element, Transformable):
             svg_transform = self.element.transform
             if svg_transform is not None:
                 lines.append(f"% SVG transform: {repr(svg_transform)}")
-                if isinstance(self.root, SVG2PGFTransform):
-                    pgf_transform = self.root.svg2pgf_matrix(svg_transform)
+                if isinstance(root, SVG2PGFTransform):
+                    pgf_transform = root.svg2pgf_matrix(svg_transform)
                     lines.append(f"% PGF transform: {repr(pgf_transform)}")
         return lines
 
@@ -881,102 +1135,141 @@ class SVGElementInfoGenerator(SVGElementNodeWrapper):
         return f"{{{xmin}}}{{{ymin}}}{{{xmax}}}{{{ymax}}} % {w} x {h}"
 
 
+@final
+class ScaleFactorGenerator(Generator):
+    """Computes the scale factor of stroke widths, the length of the unit
+    vector (1/sqrt(2), 1/sqrt(2)) in the PGF xy-coordinate system, into
+    SCALE_REGISTER. The register is local to the enclosing scope. The unit
+    vector is written exactly whatever the format, all stroke widths and
+    dashes are scaled by its length."""
+
+    __slots__ = ()
+
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
+        e = 1.0 / sqrt(2.0)
+        return [
+            r"\ifdefined%s\else\newdimen%s\fi" % (SCALE_REGISTER, SCALE_REGISTER),
+            r"\pgf@process{%s}" % EXACT.point(e, e),
+            r"\pgfmathparse{veclen(scalar(\the\pgf@x), scalar(\the\pgf@y))}",
+            r"\pgfmathsetlength%s{\pgfmathresult} %% scale factor" % SCALE_REGISTER,
+        ]
+
+
 @final
 class PGFTransformcmGenerator(Generator):
+    __slots__ = ("svg_transform", "svg2pgf_transform")
+
     def __init__(self, svg_transform: Matrix, svg2pgf_transform: Matrix):
         self.svg_transform = svg_transform
         self.svg2pgf_transform = svg2pgf_transform
 
-    def generate(self, indent: str = "  ") -> list[str]:
+    def generate(self, indent: str = "  ", fmt: NumberFormat = EXACT) -> list[str]:
         m = ~self.svg2pgf_transform * self.svg_transform * self.svg2pgf_transform
-        t = r"\pgfpointxy{%r}{%r}" % (m.e, m.f)  # translation
-        return [r"\pgftransformcm{%r}{%r}{%r}{%r}{%s}" % (m.a, m.b, m.c, m.d, t)]
+        t = fmt.point(m.e, m.f)  # translation
+        abcd = fmt.numbers((m.a, m.b, m.c, m.d))
+        return [r"\pgftransformcm{%s}{%s}{%s}{%s}{%s}" % (*abcd, t)]
 
 
 # ----------------------------------------------------------------------------
 # Node visitor which generates PGF code from SVG nodes.
 # ----------------------------------------------------------------------------
 class GeneratorNodeVisitor(NodeVisitor):
-    def __init__(self, indent: str = "  "):
+    """Writes code of visited nodes to the sink. Without a sink, lines are
+    collected in ``lines``."""
+
+    __slots__ = ("lines", "sink")
+
+    def __init__(
+        self,
+        indent: str = "  ",
+        sink: Optional[LineSink] = None,
+        fmt: NumberFormat = EXACT,
+    ):
         self.lines: list[str] = []
-        self.indent = indent
+        if sink is None:
+            sink = LineSink(self.lines.append, indent, fmt)
+        self.sink = sink
+
+    @property
+    def indent(self) -> str:
+        return self.sink.indent
 
     def visit_arc(self, node: ArcNode) -> None:
         generator = ArcGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_circle(self, node: CircleNode) -> None:
         generator = CircleGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_close(self, node: CloseNode) -> None:
         generator = CloseGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_cubic_bezier(self, node: CubicBezierNode) -> None:
         generator = CubicBezierGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_ellipse(self, node: EllipseNode) -> None:
         generator = EllipseGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_group(self, node: GroupNode) -> None:
         generator = GroupGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_line(self, node: LineNode) -> None:
         generator = LineGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_move(self, node: MoveNode) -> None:
         generator = MoveGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_path(self, node: PathNode) -> None:
         generator = PathGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_polygon(self, node: PolygonNode) -> None:
         generator = PolygonGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_polyline(self, node: PolylineNode) -> None:
         generator = PolylineGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_quadratic_bezier(self, node: QuadraticBezierNode) -> None:
         generator = QuadraticBezierGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_rect(self, node: RectNode) -> None:
         generator = RectGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_simpleline(self, node: SimpleLineNode) -> None:
         generator = SimpleLineGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_svg(self, node: SVGNode) -> None:
         generator = SVGGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_symbol(self, node: SymbolNode) -> None:
         generator = SymbolGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_unsupported_path_semgment(self, node: UnsupportedPathSegmentNode) -> None:
         generator = UnsupportedPathSegmentGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_unsupported_svg_element(self, node: UnsupportedSVGElementNode) -> None:
         generator = UnsupportedSVGElementGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_unsupported_shape(self, node: UnsupportedShapeNode) -> None:
         generator = UnsupportedShapeGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
 
     def visit_use(self, node: UseNode) -> None:
         generator = UseGenerator(node)
-        self.lines.extend(generator.generate(self.indent))
+        generator.write(self.sink)
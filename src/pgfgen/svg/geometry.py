@@ -0,0 +1,349 @@
+"""Compact, array-backed storage for path geometry.
+
+A path is stored as two flat arrays: one byte-sized opcode per segment and
+a contiguous buffer of float64 coordinates. The number of coordinates taken
+by each segment is determined by its opcode (see ``COORDS``).
+
+Coordinates of whole paths (or polyshapes) get transformed at once, with
+NumPy if it's available (see transform_coords())."""
+
+from __future__ import annotations
+
+import re
+
+from array import array
+
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+from typing import Sequence
+
+from svgelements import Arc
+from svgelements import Close
+from svgelements import CubicBezier
+from svgelements import Line
+from svgelements import Matrix
+from svgelements import Move
+from svgelements import Path
+from svgelements import PathSegment
+from svgelements import Point
+from svgelements import QuadraticBezier
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+
+MOVE = 0  # end
+LINE = 1  # end
+QUAD = 2  # control, end
+CUBIC = 3  # control1, control2, end
+ARC = 4  # start, end, center, prx, pry, sweep
+CLOSE = 5  # (nothing)
+OTHER = 6  # (nothing, the segment is kept in PathGeometry.others)
+
+# number of coordinates stored for each opcode
+COORDS = (2, 2, 4, 6, 11, 0, 0)
+
+# fewer coordinates are transformed in Python, NumPy doesn't pay off for them
+NUMPY_MIN_COORDS = 64
+
+
+def transform_coords(coords: Sequence[float], m: Matrix) -> list[float]:
+    """Transforms points, with coordinates packed as ``x0, y0, x1, y1, ...``,
+    by the matrix. Long sequences are transformed with NumPy, in one batch.
+    Either way, the operations are the same as for a single point, so are
+    the results, to the last bit. The results are plain floats, even if the
+    matrix holds NumPy scalars."""
+    if numpy is None or len(coords) < NUMPY_MIN_COORDS:
+        (a, b, c, d, e, f) = (float(v) for v in (m.a, m.b, m.c, m.d, m.e, m.f))
+        return [
+            u
+            for (x, y) in zip(coords[::2], coords[1::2])
+            for u in (x * a + y * c + e, x * b + y * d + f)
+        ]
+    xy = numpy.asarray(coords, dtype=numpy.float64)
+    (x, y) = (xy[0::2], xy[1::2])
+    transformed = numpy.empty_like(xy)
+    transformed[0::2] = x * m.a + y * m.c + m.e
+    transformed[1::2] = x * m.b + y * m.d + m.f
+    result: list[float] = transformed.tolist()
+    return result
+
+
+class PathGeometry:
+    """Geometry of a path, stored in packed arrays."""
+
+    __slots__ = ("opcodes", "coords", "others")
+
+    def __init__(
+        self,
+        opcodes: Optional[array[int]] = None,
+        coords: Optional[array[float]] = None,
+        others: Optional[list[PathSegment]] = None,
+    ):
+        self.opcodes = array("B") if opcodes is None else opcodes
+        self.coords = array("d") if coords is None else coords
+        self.others = [] if others is None else others
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PathGeometry):
+            return NotImplemented
+        return (self.opcodes, self.coords, self.others) == (
+            other.opcodes,
+            other.coords,
+            other.others,
+        )
+
+    def append(self, opcode: int, *coords: float) -> None:
+        assert len(coords) == COORDS[opcode]
+        self.opcodes.append(opcode)
+        self.coords.extend(coords)
+
+    def append_segment(self, segment: PathSegment) -> None:
+        if isinstance(segment, Close):
+            self.append(CLOSE)
+        elif isinstance(segment, Move):
+            self.append(MOVE, segment.end.x, segment.end.y)
+        elif isinstance(segment, Line):
+            self.append(LINE, segment.end.x, segment.end.y)
+        elif isinstance(segment, CubicBezier):
+            (c1, c2, end) = (segment.control1, segment.control2, segment.end)
+            self.append(CUBIC, c1.x, c1.y, c2.x, c2.y, end.x, end.y)
+        elif isinstance(segment, QuadraticBezier):
+            (c, end) = (segment.control, segment.end)
+            self.append(QUAD, c.x, c.y, end.x, end.y)
+        elif isinstance(segment, Arc):
+            points = (segment.start, segment.end, segment.center, segment.prx)
+            coords = [v for p in points + (segment.pry,) for v in (p.x, p.y)]
+            self.append(ARC, *coords, segment.sweep)
+        else:
+            self.opcodes.append(OTHER)
+            self.others.append(segment)
+
+    @classmethod
+    def from_path(cls, path: Path) -> PathGeometry:
+        """Packs segments of an svgelements path."""
+        geometry = cls()
+        for segment in path:
+            geometry.append_segment(segment)
+        return geometry
+
+    @classmethod
+    def from_d(cls, d: str, matrix: Optional[Matrix] = None) -> PathGeometry:
+        """Parses the ``d`` attribute of a path, optionally transforming it
+        with the given matrix. The result is the same as packing segments of
+        ``Path(d) * matrix`` (after reification), without building svgelements
+        objects for anything but arcs."""
+        return _PathDataParser(d, matrix).parse()
+
+    def segments(self) -> Iterator[PathSegment]:
+        """Re-creates svgelements segments out of the packed geometry."""
+        (coords, others) = (self.coords, iter(self.others))
+        start: Optional[Point] = None
+        subpath: Optional[Point] = None
+        i = 0
+        for opcode in self.opcodes:
+            c = coords[i : i + COORDS[opcode]]
+            i += COORDS[opcode]
+            segment: PathSegment
+            if opcode == MOVE:
+                segment = Move(start, Point(c[0], c[1]))
+                subpath = segment.end
+            elif opcode == LINE:
+                segment = Line(start, Point(c[0], c[1]))
+            elif opcode == QUAD:
+                segment = QuadraticBezier(start, Point(c[0], c[1]), Point(c[2], c[3]))
+            elif opcode == CUBIC:
+                segment = CubicBezier(
+                    start, Point(c[0], c[1]), Point(c[2], c[3]), Point(c[4], c[5])
+                )
+            elif opcode == ARC:
+                segment = Arc(
+                    Point(c[0], c[1]),
+                    Point(c[2], c[3]),
+                    Point(c[4], c[5]),
+                    Point(c[6], c[7]),
+                    Point(c[8], c[9]),
+                    c[10],
+                )
+            elif opcode == CLOSE:
+                segment = Close(start, subpath)
+            else:
+                segment = next(others)
+            start = segment.end
+            yield segment
+
+
+_PATH_COMMAND = re.compile(r"[\s,]*([MmZzLlHhVvCcSsQqTtAa])")
+_PATH_NUMBER = re.compile(r"[\s,]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+_PATH_FLAG = re.compile(r"[\s,]*([01])")
+_PATH_END = re.compile(r"[\s,]*$")
+
+
+class _PathDataParser:
+    """Parser of the SVG path data, follows the svgelements' interpretation
+    of the path data (including its handling of smooth curves)."""
+
+    def __init__(self, d: str, matrix: Optional[Matrix] = None):
+        self.d = d
+        self.pos = 0
+        self.matrix = matrix
+        self.geometry = PathGeometry()
+        # current point, start of the current subpath and the smooth point
+        self.current: Optional[tuple[float, float]] = None
+        self.subpath: Optional[tuple[float, float]] = None
+        self.smooth: Optional[tuple[float, float]] = None
+
+    def parse(self) -> PathGeometry:
+        command = None
+        while _PATH_END.match(self.d, self.pos) is None:
+            m = _PATH_COMMAND.match(self.d, self.pos)
+            if m is not None:
+                self.pos = m.end()
+                command = m.group(1)
+            elif command is None or command in "Zz":
+                raise ValueError(f"invalid path data at {self.pos}: {self.d!r}")
+            elif command == "M":
+                command = "L"
+            elif command == "m":
+                command = "l"
+            self._command(command)
+        return self.geometry
+
+    def _number(self) -> float:
+        m = _PATH_NUMBER.match(self.d, self.pos)
+        if m is None:
+            raise ValueError(f"expected number at {self.pos}: {self.d!r}")
+        self.pos = m.end()
+        return float(m.group(1))
+
+    def _flag(self) -> bool:
+        m = _PATH_FLAG.match(self.d, self.pos)
+        if m is None:
+            raise ValueError(f"expected flag at {self.pos}: {self.d!r}")
+        self.pos = m.end()
+        return m.group(1) == "1"
+
+    def _point(self, relative: bool) -> tuple[float, float]:
+        x = self._number()
+        y = self._number()
+        if relative and self.current is not None:
+            return (self.current[0] + x, self.current[1] + y)
+        return (x, y)
+
+    def _smooth_point(self) -> tuple[float, float]:
+        assert self.current is not None
+        if self.smooth is None:
+            return self.current
+        (cx, cy) = self.current
+        return (cx + cx - self.smooth[0], cy + cy - self.smooth[1])
+
+    def _transform(self, *points: tuple[float, float]) -> list[float]:
+        m = self.matrix
+        if m is None:
+            return [v for p in points for v in p]
+        return [
+            v
+            for (x, y) in points
+            for v in (x * m.a + y * m.c + 1 * m.e, x * m.b + y * m.d + 1 * m.f)
+        ]
+
+    def _command(self, command: str) -> None:
+        if self.current is None and command not in "Mm":
+            raise ValueError(f"path data must start with moveto: {self.d!r}")
+        # handlers return the point reflected by the next smooth curve
+        self.smooth = _COMMANDS[command.upper()](self, command.islower())
+
+    def _close(self, relative: bool) -> Optional[tuple[float, float]]:
+        self.geometry.append(CLOSE)
+        self.current = self.subpath
+        return None
+
+    def _move(self, relative: bool) -> Optional[tuple[float, float]]:
+        end = self._point(relative)
+        self.geometry.append(MOVE, *self._transform(end))
+        self.current = self.subpath = end
+        return None
+
+    def _line(self, relative: bool) -> Optional[tuple[float, float]]:
+        return self._line_to(self._point(relative))
+
+    def _horizontal(self, relative: bool) -> Optional[tuple[float, float]]:
+        assert self.current is not None
+        x = self._number()
+        return self._line_to((self.current[0] + x if relative else x, self.current[1]))
+
+    def _vertical(self, relative: bool) -> Optional[tuple[float, float]]:
+        assert self.current is not None
+        y = self._number()
+        return self._line_to((self.current[0], self.current[1] + y if relative else y))
+
+    def _line_to(self, end: tuple[float, float]) -> Optional[tuple[float, float]]:
+        self.geometry.append(LINE, *self._transform(end))
+        self.current = end
+        return None
+
+    def _cubic(self, relative: bool) -> Optional[tuple[float, float]]:
+        return self._cubic_to(self._point(relative), relative)
+
+    def _smooth_cubic(self, relative: bool) -> Optional[tuple[float, float]]:
+        return self._cubic_to(self._smooth_point(), relative)
+
+    def _cubic_to(
+        self, c1: tuple[float, float], relative: bool
+    ) -> Optional[tuple[float, float]]:
+        c2 = self._point(relative)
+        end = self._point(relative)
+        self.geometry.append(CUBIC, *self._transform(c1, c2, end))
+        self.current = end
+        return c2
+
+    def _quadratic(self, relative: bool) -> Optional[tuple[float, float]]:
+        return self._quadratic_to(self._point(relative), relative)
+
+    def _smooth_quadratic(self, relative: bool) -> Optional[tuple[float, float]]:
+        return self._quadratic_to(self._smooth_point(), relative)
+
+    def _quadratic_to(
+        self, c: tuple[float, float], relative: bool
+    ) -> Optional[tuple[float, float]]:
+        end = self._point(relative)
+        self.geometry.append(QUAD, *self._transform(c, end))
+        self.current = end
+        return c
+
+    def _arc(self, relative: bool) -> Optional[tuple[float, float]]:
+        rx = abs(self._number())
+        ry = abs(self._number())
+        rotation = self._number()
+        large = self._flag()
+        sweep = self._flag()
+        end = self._point(relative)
+        arc = Arc(self.current, rx, ry, rotation, large, sweep, end)
+        if self.matrix is not None:
+            arc *= self.matrix
+        self.geometry.append_segment(arc)
+        self.current = end
+        return None
+
+
+# handlers of path commands (in upper case)
+_COMMANDS: dict[
+    str, Callable[[_PathDataParser, bool], Optional[tuple[float, float]]]
+] = {
+    "Z": _PathDataParser._close,
+    "M": _PathDataParser._move,
+    "L": _PathDataParser._line,
+    "H": _PathDataParser._horizontal,
+    "V": _PathDataParser._vertical,
+    "C": _PathDataParser._cubic,
+    "S": _PathDataParser._smooth_cubic,
+    "Q": _PathDataParser._quadratic,
+    "T": _PathDataParser._smooth_quadratic,
+    "A": _PathDataParser._arc,
+}
@@ -0,0 +1,141 @@
+"""Filtering of Inkscape layers.
+
+Layers are groups with ``inkscape:groupmode="layer"``, referred to by their
+labels (``inkscape:label``) or ids. Layers which are not needed get pruned
+from the raw XML tree, before svgelements parses the document, so they
+cost neither time nor memory. Elements of pruned layers, which are
+referenced from the rest of the document, and elements which are never
+rendered directly (``<defs>``, ``<style>``, ``<symbol>``, ...) are moved
+to ``<defs>`` rather than removed."""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+
+from typing import Collection
+from typing import Optional
+
+from .streaming import RETAINED_TAGS
+from .streaming import SVG_NS
+from .streaming import element_references
+from .streaming import local_tag
+
+INKSCAPE_NS = "{http://www.inkscape.org/namespaces/inkscape}"
+INKSCAPE_GROUPMODE = INKSCAPE_NS + "groupmode"
+INKSCAPE_LABEL = INKSCAPE_NS + "label"
+
+
+def is_layer(elem: ET.Element) -> bool:
+    return local_tag(elem.tag) == "g" and elem.get(INKSCAPE_GROUPMODE) == "layer"
+
+
+def layer_matches(elem: ET.Element, names: Collection[str]) -> bool:
+    """Whether the layer is referred to by any of the names (labels or
+    ids)."""
+    return elem.get(INKSCAPE_LABEL) in names or elem.get("id") in names
+
+
+def filter_layers(
+    root: ET.Element,
+    layers: Optional[Collection[str]] = None,
+    exclude_layers: Optional[Collection[str]] = None,
+) -> int:
+    """Prunes, in place, layers of the document with given root element.
+    With ``layers`` only the layers with given names are kept (with their
+    sublayers, and with their ancestor layers as containers); layers with
+    names in ``exclude_layers`` are pruned. Returns the number of pruned
+    layers."""
+    parents = {child: parent for parent in root.iter() for child in parent}
+    all_layers = [e for e in root.iter() if is_layer(e)]
+    kept = _kept_layers(all_layers, parents, layers, exclude_layers)
+    # the outermost of the layers to be pruned
+    pruned = [
+        e
+        for e in all_layers
+        if e not in kept and all(a in kept for a in _ancestor_layers(e, parents))
+    ]
+    if not pruned:
+        return 0
+
+    inside = {e for layer in pruned for e in layer.iter()}
+    _move_to_defs(root, _moved_elements(root, inside), parents)
+    for layer in pruned:
+        parents[layer].remove(layer)
+    return len(pruned)
+
+
+def _kept_layers(
+    all_layers: list[ET.Element],
+    parents: dict[ET.Element, ET.Element],
+    layers: Optional[Collection[str]],
+    exclude_layers: Optional[Collection[str]],
+) -> set[ET.Element]:
+    kept = set(all_layers)
+    if layers is not None:
+        selected = [e for e in all_layers if layer_matches(e, layers)]
+        kept = set(selected)
+        for elem in selected:
+            kept.update(_ancestor_layers(elem, parents))
+            kept.update(e for e in elem.iter() if is_layer(e))
+    if exclude_layers is not None:
+        for elem in all_layers:
+            if layer_matches(elem, exclude_layers):
+                kept.difference_update(e for e in elem.iter() if is_layer(e))
+    return kept
+
+
+def _moved_elements(root: ET.Element, inside: set[ET.Element]) -> set[ET.Element]:
+    """Elements to be moved out of the pruned layers (with elements
+    ``inside``), with what they refer to."""
+    by_id = {e.get("id"): e for e in root.iter() if e.get("id") is not None}
+    moved: set[ET.Element] = set()
+    pending = [e for e in inside if local_tag(e.tag) in RETAINED_TAGS]
+    pending.extend(
+        by_id[i]
+        for e in root.iter()
+        if e not in inside
+        for i in element_references(e)
+        if i in by_id
+    )
+    while pending:
+        elem = pending.pop()
+        if elem in moved or elem not in inside:
+            continue
+        moved.add(elem)
+        for e in elem.iter():
+            pending.extend(by_id[i] for i in element_references(e) if i in by_id)
+    return moved
+
+
+def _move_to_defs(
+    root: ET.Element,
+    moved: set[ET.Element],
+    parents: dict[ET.Element, ET.Element],
+) -> None:
+    order = {e: i for (i, e) in enumerate(root.iter())}
+    defs = None
+    for elem in sorted(moved, key=order.__getitem__):
+        if any(a in moved for a in _ancestors(elem, parents)):
+            continue  # moved together with its ancestor
+        if defs is None:
+            namespace = SVG_NS if root.tag.startswith(SVG_NS) else ""
+            defs = ET.SubElement(root, namespace + "defs")
+        parents[elem].remove(elem)
+        defs.append(elem)
+
+
+def _ancestor_layers(
+    elem: ET.Element, parents: dict[ET.Element, ET.Element]
+) -> list[ET.Element]:
+    return [e for e in _ancestors(elem, parents) if is_layer(e)]
+
+
+def _ancestors(
+    elem: ET.Element, parents: dict[ET.Element, ET.Element]
+) -> list[ET.Element]:
+    ancestors = []
+    parent = parents.get(elem)
+    while parent is not None:
+        ancestors.append(parent)
+        parent = parents.get(parent)
+    return ancestors
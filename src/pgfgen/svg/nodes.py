@@ -5,9 +5,12 @@ from abc import abstractmethod
 
 from math import sqrt
 
+from typing import Any
+from typing import BinaryIO
 from typing import Dict
 from typing import Literal
 from typing import Optional
+from typing import TYPE_CHECKING
 from typing import TextIO
 from typing import TypedDict
 from typing import final
@@ -42,17 +45,27 @@ from svgelements.svgelements import _Polyshape
 from ..types import SupportsAppend
 from ..types import BboxTuple
 
+from .geometry import PathGeometry
+from .sources import open_source
 from .visitor import NodeVisitor
 from .visitor import NodeVisitee
 
 import re
+import weakref
+
+if TYPE_CHECKING:
+    from .optimizer import OptimizationReport
+    from .simplifier import SimplificationReport
 
 
 # only for typing
 SVGElementAttributes = Dict[str, str]
 
 # only for typing
-SVGSource = str | TextIO
+SVGSource = str | TextIO | BinaryIO
+
+# slots holding lists of children built by container nodes
+_CHILDREN_SLOTS = ("_children_element_nodes", "_children_path_segment_nodes")
 
 
 NotRequiredSVGElementValues = TypedDict(
@@ -129,19 +142,96 @@ class SVGElementValues(NotRequiredSVGElementValues):
 
 
 class SVGElementChildNode(ABC):
+    """Base class for nodes of the tree. Parents are referenced weakly, so
+    the tree has no reference cycles and gets freed as soon as its root is
+    no longer referenced. Keep a reference to the root while using nodes,
+    the parent of a node whose parent has been freed raises ReferenceError
+    (a detached subtree would map coordinates differently). Roots are found
+    once and remembered (weakly too)."""
+
+    __slots__ = ("__weakref__", "_parent_ref", "_root_ref")
+
     @property
     @abstractmethod
     def parent(self) -> Optional[SVGElementNode]:
         pass  # pragma: no cover
 
+    def _get_parent_ref(self) -> Optional[SVGElementNode]:
+        ref: Optional[weakref.ref[SVGElementNode]] = self._parent_ref
+        if ref is None:
+            return None
+        parent = ref()
+        if parent is None:
+            raise ReferenceError(
+                "parent node no longer exists, keep a reference to the root "
+                "of the tree while using its nodes"
+            )
+        return parent
+
+    def _set_parent_ref(self, node: Optional[SVGElementNode]) -> None:
+        self._parent_ref = None if node is None else weakref.ref(node)
+        self._root_ref: Optional[weakref.ref[SVGElementChildNode]] = None
+
+    def _get_root_ref(self) -> Optional[SVGElementChildNode]:
+        # wrappers don't initialize the slot
+        ref: Optional[weakref.ref[SVGElementChildNode]] = getattr(
+            self, "_root_ref", None
+        )
+        return None if ref is None else ref()
+
+    # Weak references can't be pickled. Nodes are pickled without them and
+    # parents restore references of their (already built) children.
+    def __getstate__(self) -> dict[str, Any]:
+        return {
+            name: getattr(self, name)
+            for cls in type(self).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if name not in ("__weakref__", "_parent_ref", "_root_ref")
+            and hasattr(self, name)
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self._parent_ref = None
+        self._root_ref = None
+        for name, value in state.items():
+            setattr(self, name, value)
+        for name in _CHILDREN_SLOTS:
+            for child in state.get(name) or ():
+                child._parent_ref = weakref.ref(self)
+
     @property
     def root(self) -> SVGElementChildNode:
-        if self.parent is None:
-            return self
-        return self.parent.root
+        """The nearest SVG document node up the tree (or the topmost node).
+        The tree is walked up iteratively, only as far as the first node
+        which knows its root, and the root is remembered by the nodes on the
+        way, so that it's found in constant time."""
+        root = self._get_root_ref()
+        if root is not None:
+            return root
+        path = []
+        node: SVGElementChildNode = self
+        while True:
+            if isinstance(node, SVGNode):
+                root = node
+                break
+            root = node._get_root_ref()
+            if root is not None:
+                break
+            path.append(node)
+            parent = node.parent
+            if parent is None:
+                root = node
+                break
+            node = parent
+        ref = weakref.ref(root)
+        for node in path:
+            node._root_ref = ref
+        return root
 
 
 class SVGElementContainerNode(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def children(self) -> list[SVGElementNode]:
@@ -149,6 +239,16 @@ class SVGElementContainerNode(ABC):
 
 
 class SVGElementNode(NodeVisitee, SVGElementChildNode):
+    __slots__ = ()
+
+    @property
+    def parent_element_node(self) -> Optional[SVGElementNode]:
+        return self._get_parent_ref()
+
+    @parent_element_node.setter
+    def parent_element_node(self, node: Optional[SVGElementNode]) -> None:
+        self._set_parent_ref(node)
+
     @property
     @abstractmethod
     def element(self) -> SVGElement:
@@ -250,6 +350,8 @@ class SVGElementNode(NodeVisitee, SVGElementChildNode):
 
 @final
 class UnsupportedSVGElementNode(SVGElementNode):
+    __slots__ = ("_element",)
+
     def __init__(
         self, element: SVGElement, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
@@ -269,6 +371,8 @@ class UnsupportedSVGElementNode(SVGElementNode):
 
 
 class SVGElementNodeWrapper(SVGElementNode):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def wrapped(self) -> SVGElementNode:
@@ -300,6 +404,8 @@ class SVGElementNodeWrapper(SVGElementNode):
 
 @final
 class SVGElementNodeFactory:
+    __slots__ = ("parent_element_node", "shape_node_factory")
+
     def __init__(
         self,
         parent_element_node: Optional[SVGElementNode] = None,
@@ -327,6 +433,8 @@ class SVGElementNodeFactory:
 
 @final
 class ShapeNodeFactory:
+    __slots__ = ("parent_element_node",)
+
     def __init__(self, parent_element_node: Optional[SVGElementNode] = None):
         self.parent_element_node = parent_element_node
 
@@ -350,14 +458,25 @@ class ShapeNodeFactory:
 
 
 class SVGBboxProvider:
+    __slots__ = ()
+
     @abstractmethod
     def svg_bbox(self) -> BboxTuple:
         pass
 
 
+# transforms of roots other than SVGNode (e.g. a group used as a tree on its
+# own), computed once per node, SVGNode keeps its own
+_svg2pgf_transforms: weakref.WeakKeyDictionary[SVG2PGFTransform, Matrix] = (
+    weakref.WeakKeyDictionary()
+)
+
+
 class SVG2PGFTransform(SVGBboxProvider):
-    def __init__(self) -> None:
-        self._svg2pgf_transform: Optional[Matrix] = None
+    """Maps SVG coordinates onto the PGF coordinate system. Only the root
+    node's transform is ever used, so it is not stored here, see SVGNode."""
+
+    __slots__ = ()
 
     def _determine_pgf_bbox(self, bbox: BboxTuple) -> BboxTuple:
         (xmin, ymin, xmax, ymax) = bbox
@@ -393,7 +512,9 @@ class SVG2PGFTransform(SVGBboxProvider):
 
     def _determine_svg2pgf_transform(self) -> Matrix:
         """A matrix that transforms from SVG to PGF coordinate system"""
-        bbox = self.svg_bbox()
+        return self._svg2pgf_transform_for_bbox(self.svg_bbox())
+
+    def _svg2pgf_transform_for_bbox(self, bbox: BboxTuple) -> Matrix:
         svg_c = self._bbox_center(bbox)
         pgf_c = self._bbox_center(self._determine_pgf_bbox(bbox))
         s = self._determine_pgf_scale(bbox)
@@ -404,9 +525,17 @@ class SVG2PGFTransform(SVGBboxProvider):
 
     @property
     def svg2pgf_transform(self) -> Matrix:
-        if self._svg2pgf_transform is None:
-            self._svg2pgf_transform = self._determine_svg2pgf_transform()
-        return self._svg2pgf_transform
+        matrix = _svg2pgf_transforms.get(self)
+        if matrix is None:
+            matrix = self._determine_svg2pgf_transform()
+            _svg2pgf_transforms[self] = matrix
+        return matrix
+
+    @property
+    def svg2pgf_vector_transform(self) -> Matrix:
+        """The svg2pgf transform without translation, for vectors."""
+        vector: Matrix = self.svg2pgf_transform.vector()
+        return vector
 
     def svg2pgf_point(self, point: Point) -> Point:
         svg2pgf = self.svg2pgf_transform
@@ -414,7 +543,7 @@ class SVG2PGFTransform(SVGBboxProvider):
         return point
 
     def svg2pgf_vector(self, vector: Point) -> Point:
-        svg2pgf = self.svg2pgf_transform.vector()
+        svg2pgf = self.svg2pgf_vector_transform
         vector = svg2pgf.point_in_matrix_space(vector)
         return vector
 
@@ -435,6 +564,8 @@ class SVG2PGFTransform(SVGBboxProvider):
 
 
 class GraphicObjectNode:
+    __slots__ = ()
+
     @property
     @abstractmethod
     def graphic_object(self) -> GraphicObject:
@@ -481,20 +612,22 @@ class GraphicObjectNode:
             return None
         return float(string)
 
+    @property
+    def reified(self) -> bool:
+        """Whether transforms have been applied to coordinates of the graphic
+        object, see SVGNode.reified."""
+        root = self.root if isinstance(self, SVGElementChildNode) else None
+        return not isinstance(root, SVGNode) or root.reified
+
     @property
     def implicit_stroke_dasharray(self) -> Optional[list[float] | Literal["none"]]:
         # svgelements does not implement `implicit_stroke_dasharray' property
         dasharray = self.stroke_dasharray
         if dasharray is None or isinstance(dasharray, str):
             return dasharray
-        if isinstance(self.graphic_object, SVGElement):
-            # reified Paths have reset transform, so we obtain it from values
-            # again
-            transform: Optional[str] = self.graphic_object.values.get("transform")
-            if transform is not None:
-                matrix = Matrix(transform)
-                scale = sqrt(abs(matrix.determinant))
-                dasharray = list([scale * x for x in dasharray])
+        scale = self._transform_scale()
+        if scale is not None:
+            dasharray = list([scale * x for x in dasharray])
         return dasharray
 
     @property
@@ -503,18 +636,29 @@ class GraphicObjectNode:
         dashoffset = self.stroke_dashoffset
         if dashoffset is None:
             return None
-        if isinstance(self.graphic_object, SVGElement):
-            # reified Paths have reset transform matrix, so we obtain it from
-            # values again
-            transform: Optional[str] = self.graphic_object.values.get("transform")
-            if transform is not None:
-                matrix = Matrix(transform)
-                scale = sqrt(abs(matrix.determinant))
-                dashoffset = scale * dashoffset
+        scale = self._transform_scale()
+        if scale is not None:
+            dashoffset = scale * dashoffset
         return dashoffset
 
+    def _transform_scale(self) -> Optional[float]:
+        """Scale of the cumulative transform of the graphic object."""
+        if not isinstance(self.graphic_object, SVGElement):
+            return None
+        if not self.reified:
+            # the transform is the cumulative one, as nothing has reset it
+            return sqrt(abs(self.graphic_object.transform.determinant))
+        # reified Paths have reset transform, so we obtain it from values
+        # again
+        transform: Optional[str] = self.graphic_object.values.get("transform")
+        if transform is None:
+            return None
+        return sqrt(abs(Matrix(transform).determinant))
+
 
 class GraphicObjectNodeWrapper(GraphicObjectNode):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def wrapped(self) -> GraphicObjectNode:
@@ -556,10 +700,14 @@ class GraphicObjectNodeWrapper(GraphicObjectNode):
     def implicit_stroke_dashoffset(self) -> Optional[float]:
         return self.wrapped.implicit_stroke_dashoffset
 
+    @property
+    def reified(self) -> bool:
+        return self.wrapped.reified
+
 
 class ShapeNode(SVGElementNode, GraphicObjectNode, SVG2PGFTransform):
-    def __init__(self) -> None:
-        SVG2PGFTransform.__init__(self)
+    # the local2pgf transform, with the svg2pgf transform it was composed of
+    __slots__ = ("_local2pgf_transform",)
 
     @property
     @abstractmethod
@@ -578,19 +726,87 @@ class ShapeNode(SVGElementNode, GraphicObjectNode, SVG2PGFTransform):
         bb: BboxTuple = self.shape.bbox()
         return bb
 
+    @property
+    def local2pgf_transform(self) -> Optional[Matrix]:
+        """Maps coordinates of the shape, as stored, onto the PGF coordinate
+        system. The transform of the shape (identity, unless the tree was
+        parsed with ``reify=False``) is composed with the root's svg2pgf
+        transform here, once, so that each coordinate gets transformed once.
+        ``None`` means no transform at all. The transform is computed once per
+        shape (and again if the root's svg2pgf transform gets replaced)."""
+        root = self.root
+        svg2pgf = root.svg2pgf_transform if isinstance(root, SVG2PGFTransform) else None
+        # subclasses don't initialize the slot
+        cached: Optional[tuple[Optional[Matrix], Optional[Matrix]]] = getattr(
+            self, "_local2pgf_transform", None
+        )
+        if cached is not None and cached[0] is svg2pgf:
+            return cached[1]
+        local2pgf = self._determine_local2pgf_transform(svg2pgf)
+        self._local2pgf_transform = (svg2pgf, local2pgf)
+        return local2pgf
+
+    def _determine_local2pgf_transform(
+        self, svg2pgf: Optional[Matrix]
+    ) -> Optional[Matrix]:
+        transform: Matrix = self.shape.transform
+        if transform.is_identity():
+            return svg2pgf
+        if svg2pgf is None:
+            return Matrix(transform)
+        return transform * svg2pgf
+
 
 @final
 class PathNode(ShapeNode):
+    __slots__ = ("path", "_geometry", "_children_path_segment_nodes")
+
     def __init__(
         self, path: Path, parent_element_node: Optional[SVGElementNode] = None
     ):
-        ShapeNode.__init__(self)
         self.path = path
         self.parent_element_node = parent_element_node
-        factory = PathSegmentNodeFactory(self)
-        self.children_path_segment_nodes = list(
-            [factory.create_node(e) for e in self.path]
-        )
+        self._geometry: Optional[PathGeometry] = None
+        self._children_path_segment_nodes: Optional[list[PathSegmentNode]] = None
+
+    @property
+    def geometry(self) -> PathGeometry:
+        """Path segments packed into arrays, parsed out of the path data on
+        first access. The svgelements path is left as it is, segments are
+        only released by detached trees (see svg.binary.detach())."""
+        if self._geometry is None:
+            self._geometry = self._parse_geometry()
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry: PathGeometry) -> None:
+        self._geometry = geometry
+        self._children_path_segment_nodes = None
+
+    def _parse_geometry(self) -> PathGeometry:
+        d = self.path.values.get("d")
+        if d is None:
+            # path not parsed from a document
+            return PathGeometry.from_path(self.path)
+        # the transform (cumulative) has been applied to segments of a reified
+        # path, not to its path data
+        transform = self.path.values.get("transform") if self.reified else None
+        try:
+            return PathGeometry.from_d(d, Matrix(transform) if transform else None)
+        except ValueError:
+            # svgelements is more forgiving with malformed path data
+            return PathGeometry.from_path(self.path)
+
+    @property
+    def children_path_segment_nodes(self) -> list[PathSegmentNode]:
+        """Nodes wrapping path segments, derived from the packed geometry on
+        first access."""
+        if self._children_path_segment_nodes is None:
+            factory = PathSegmentNodeFactory(self)
+            self._children_path_segment_nodes = list(
+                [factory.create_node(e) for e in self.geometry.segments()]
+            )
+        return self._children_path_segment_nodes
 
     @property
     def shape(self) -> Path:
@@ -606,6 +822,8 @@ class PathNode(ShapeNode):
 
 @final
 class PathSegmentNodeFactory:
+    __slots__ = ("parent_path_node",)
+
     def __init__(self, parent_path_node: Optional[PathNode] = None) -> None:
         self.parent_path_node = parent_path_node
 
@@ -627,10 +845,21 @@ class PathSegmentNodeFactory:
 
 
 class PathSegmentNode(NodeVisitee, SVGElementChildNode, SVG2PGFTransform):
+    __slots__ = ()
+
     def __init__(self, parent_path_node: Optional[PathNode] = None) -> None:
-        SVG2PGFTransform.__init__(self)
         self.parent_path_node = parent_path_node
 
+    @property
+    def parent_path_node(self) -> Optional[PathNode]:
+        node = self._get_parent_ref()
+        assert node is None or isinstance(node, PathNode)
+        return node
+
+    @parent_path_node.setter
+    def parent_path_node(self, node: Optional[PathNode]) -> None:
+        self._set_parent_ref(node)
+
     @property
     @abstractmethod
     def segment(self) -> PathSegment:
@@ -644,8 +873,20 @@ class PathSegmentNode(NodeVisitee, SVGElementChildNode, SVG2PGFTransform):
         bb: BboxTuple = self.segment.bbox()
         return bb
 
+    @property
+    def local2pgf_transform(self) -> Optional[Matrix]:
+        """Maps coordinates of the segment onto the PGF coordinate system, see
+        ShapeNode.local2pgf_transform."""
+        path = self.parent
+        if path is not None:
+            return path.local2pgf_transform
+        root = self.root
+        return root.svg2pgf_transform if isinstance(root, SVG2PGFTransform) else None
+
 
 class PathSegmentNodeWrapper(PathSegmentNode):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def wrapped(self) -> PathSegmentNode:
@@ -669,10 +910,11 @@ class PathSegmentNodeWrapper(PathSegmentNode):
 
 @final
 class UnsupportedShapeNode(ShapeNode):
+    __slots__ = ("_shape",)
+
     def __init__(
         self, shape: Shape, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
-        ShapeNode.__init__(self)
         self._shape = shape
         self.parent_element_node = parent_element_node
 
@@ -690,6 +932,8 @@ class UnsupportedShapeNode(ShapeNode):
 
 @final
 class UnsupportedPathSegmentNode(PathSegmentNode):
+    __slots__ = ("path_segment",)
+
     def __init__(
         self, path_segment: PathSegment, parent_path_node: Optional[PathNode] = None
     ) -> None:
@@ -706,6 +950,8 @@ class UnsupportedPathSegmentNode(PathSegmentNode):
 
 @final
 class CloseNode(PathSegmentNode):
+    __slots__ = ("close",)
+
     def __init__(
         self, close: Close, parent_path_node: Optional[PathNode] = None
     ) -> None:
@@ -722,6 +968,8 @@ class CloseNode(PathSegmentNode):
 
 @final
 class MoveNode(PathSegmentNode):
+    __slots__ = ("move",)
+
     def __init__(self, move: Move, parent_path_node: Optional[PathNode] = None) -> None:
         super().__init__(parent_path_node)
         self.move = move
@@ -736,6 +984,8 @@ class MoveNode(PathSegmentNode):
 
 @final
 class LineNode(PathSegmentNode):
+    __slots__ = ("line",)
+
     def __init__(self, line: Line, parent_path_node: Optional[PathNode] = None) -> None:
         super().__init__(parent_path_node)
         self.line = line
@@ -750,6 +1000,8 @@ class LineNode(PathSegmentNode):
 
 @final
 class CubicBezierNode(PathSegmentNode):
+    __slots__ = ("cubic_bezier",)
+
     def __init__(
         self, cubic_bezier: CubicBezier, parent_path_node: Optional[PathNode] = None
     ) -> None:
@@ -766,6 +1018,8 @@ class CubicBezierNode(PathSegmentNode):
 
 @final
 class QuadraticBezierNode(PathSegmentNode):
+    __slots__ = ("quadratic_bezier",)
+
     def __init__(
         self,
         quadratic_bezier: QuadraticBezier,
@@ -784,6 +1038,8 @@ class QuadraticBezierNode(PathSegmentNode):
 
 @final
 class ArcNode(PathSegmentNode):
+    __slots__ = ("arc",)
+
     def __init__(self, arc: Arc, parent_path_node: Optional[PathNode] = None) -> None:
         super().__init__(parent_path_node)
         self.arc = arc
@@ -798,10 +1054,11 @@ class ArcNode(PathSegmentNode):
 
 @final
 class CircleNode(ShapeNode):
+    __slots__ = ("circle",)
+
     def __init__(
         self, circle: Circle, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
-        ShapeNode.__init__(self)
         self.circle = circle
         self.parent_element_node = parent_element_node
 
@@ -823,10 +1080,11 @@ class CircleNode(ShapeNode):
 
 @final
 class EllipseNode(ShapeNode):
+    __slots__ = ("ellipse",)
+
     def __init__(
         self, ellipse: Ellipse, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
-        ShapeNode.__init__(self)
         self.ellipse = ellipse
         self.parent_element_node = parent_element_node
 
@@ -848,10 +1106,11 @@ class EllipseNode(ShapeNode):
 
 @final
 class RectNode(ShapeNode):
+    __slots__ = ("rect",)
+
     def __init__(
         self, rect: Rect, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
-        ShapeNode.__init__(self)
         self.rect = rect
         self.parent_element_node = parent_element_node
 
@@ -880,12 +1139,13 @@ class RectNode(ShapeNode):
 
 @final
 class SimpleLineNode(ShapeNode):
+    __slots__ = ("simple_line",)
+
     def __init__(
         self,
         simple_line: SimpleLine,
         parent_element_node: Optional[SVGElementNode] = None,
     ) -> None:
-        ShapeNode.__init__(self)
         self.simple_line = simple_line
         self.parent_element_node = parent_element_node
 
@@ -902,12 +1162,13 @@ class SimpleLineNode(ShapeNode):
 
 
 class _PolyshapeNode(ShapeNode):
+    __slots__ = ("polyshape",)
+
     def __init__(
         self,
         polyshape: _Polyshape,
         parent_element_node: Optional[SVGElementNode] = None,
     ) -> None:
-        ShapeNode.__init__(self)
         self.polyshape = polyshape
         self.parent_element_node = parent_element_node
 
@@ -927,6 +1188,8 @@ class _PolyshapeNode(ShapeNode):
 
 @final
 class PolylineNode(_PolyshapeNode):
+    __slots__ = ()
+
     @property
     def is_closed(self) -> bool:
         return False
@@ -937,6 +1200,8 @@ class PolylineNode(_PolyshapeNode):
 
 @final
 class PolygonNode(_PolyshapeNode):
+    __slots__ = ()
+
     @property
     def is_closed(self) -> bool:
         return True
@@ -946,16 +1211,24 @@ class PolygonNode(_PolyshapeNode):
 
 
 class GroupNode(SVGElementNode, SVGElementContainerNode, SVG2PGFTransform):
+    __slots__ = ("group", "_children_element_nodes")
+
     def __init__(
         self, group: Group, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
-        SVG2PGFTransform.__init__(self)
         self.group = group
         self.parent_element_node = parent_element_node
-        factory = SVGElementNodeFactory(self)
-        self.children_element_nodes = list(
-            [factory.create_node(e) for e in self.element]
-        )
+        self._children_element_nodes: Optional[list[SVGElementNode]] = None
+
+    @property
+    def children_element_nodes(self) -> list[SVGElementNode]:
+        """Nodes wrapping child elements, created on first access."""
+        if self._children_element_nodes is None:
+            factory = SVGElementNodeFactory(self)
+            self._children_element_nodes = list(
+                [factory.create_node(e) for e in self.element]
+            )
+        return self._children_element_nodes
 
     @property
     def element(self) -> Group:
@@ -978,16 +1251,24 @@ class GroupNode(SVGElementNode, SVGElementContainerNode, SVG2PGFTransform):
 
 
 class UseNode(SVGElementNode, SVGElementContainerNode, SVG2PGFTransform):
+    __slots__ = ("use", "_children_element_nodes")
+
     def __init__(
         self, use: Use, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
-        SVG2PGFTransform.__init__(self)
         self.use = use
         self.parent_element_node = parent_element_node
-        factory = SVGElementNodeFactory(self)
-        self.children_element_nodes = list(
-            [factory.create_node(e) for e in self.element]
-        )
+        self._children_element_nodes: Optional[list[SVGElementNode]] = None
+
+    @property
+    def children_element_nodes(self) -> list[SVGElementNode]:
+        """Nodes wrapping child elements, created on first access."""
+        if self._children_element_nodes is None:
+            factory = SVGElementNodeFactory(self)
+            self._children_element_nodes = list(
+                [factory.create_node(e) for e in self.element]
+            )
+        return self._children_element_nodes
 
     @property
     def element(self) -> Use:
@@ -1019,6 +1300,8 @@ class UseNode(SVGElementNode, SVGElementContainerNode, SVG2PGFTransform):
 
 
 class SymbolNode(SVGElementNode):
+    __slots__ = ("symbol",)
+
     def __init__(
         self, symbol: SVGElement, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
@@ -1039,10 +1322,34 @@ class SymbolNode(SVGElementNode):
 
 @final
 class SVGNode(GroupNode):
+    __slots__ = (
+        "source_digest",
+        "document_bbox",
+        "optimization",
+        "simplification",
+        "reified",
+        "_svg2pgf_transform",
+        "_svg2pgf_vector_transform",
+    )
+
     def __init__(
         self, svg: SVG, parent_element_node: Optional[SVGElementNode] = None
     ) -> None:
         super().__init__(svg, parent_element_node)
+        # hash of the source document and parser arguments, if known
+        self.source_digest: Optional[str] = None
+        # bounding box of the whole document, when only a part was loaded
+        self.document_bbox: Optional[BboxTuple] = None
+        # what the optimizer has removed from the document, if it was run
+        self.optimization: Optional[OptimizationReport] = None
+        # vertices removed by the simplifier, if it was run
+        self.simplification: Optional[SimplificationReport] = None
+        # whether transforms have been applied to coordinates of shapes (see
+        # the reify argument of parse()), nested documents inherit it
+        root = None if parent_element_node is None else parent_element_node.root
+        self.reified: bool = not isinstance(root, SVGNode) or root.reified
+        self._svg2pgf_transform: Optional[Matrix] = None
+        self._svg2pgf_vector_transform: Optional[Matrix] = None
 
     @classmethod
     def parse(
@@ -1057,6 +1364,23 @@ class SVGNode(GroupNode):
         context: Optional[SupportsAppend] = None,
         parse_display_none: bool = False,
     ) -> SVGNode:
+        """Parses an SVG document. With ``reify=False`` svgelements leaves
+        coordinates of shapes as they are, transforms get applied by the
+        generators, together with the svg2pgf transform."""
+        if isinstance(source, str):
+            # compressed files and archive members are opened here
+            with open_source(source) as fp:
+                return cls.parse(
+                    fp,
+                    reify=reify,
+                    ppi=ppi,
+                    width=width,
+                    height=height,
+                    color=color,
+                    transform=transform,
+                    context=context,
+                    parse_display_none=parse_display_none,
+                )
         svg = SVG.parse(
             source=source,
             reify=reify,
@@ -1068,7 +1392,9 @@ class SVGNode(GroupNode):
             context=context,
             parse_display_none=parse_display_none,
         )
-        return cls(svg)
+        node = cls(svg)
+        node.reified = reify
+        return node
 
     @property
     def presentation_attributes(self) -> list[str | tuple[str, str]]:
@@ -1083,5 +1409,27 @@ class SVGNode(GroupNode):
     def root(self) -> SVGNode:
         return self
 
+    def svg_bbox(self) -> BboxTuple:
+        if self.document_bbox is not None:
+            return self.document_bbox
+        return super().svg_bbox()
+
+    @property
+    def svg2pgf_transform(self) -> Matrix:
+        if self._svg2pgf_transform is None:
+            self._svg2pgf_transform = self._determine_svg2pgf_transform()
+        return self._svg2pgf_transform
+
+    @svg2pgf_transform.setter
+    def svg2pgf_transform(self, matrix: Matrix) -> None:
+        self._svg2pgf_transform = matrix
+        self._svg2pgf_vector_transform = None
+
+    @property
+    def svg2pgf_vector_transform(self) -> Matrix:
+        if self._svg2pgf_vector_transform is None:
+            self._svg2pgf_vector_transform = self.svg2pgf_transform.vector()
+        return self._svg2pgf_vector_transform
+
     def accept_visitor(self, visitor: NodeVisitor) -> None:
         visitor.visit_svg(self)
@@ -0,0 +1,132 @@
+"""Optimization of SVG documents before they get parsed.
+
+Documents saved by editors carry data which has no effect on rendering:
+comments, metadata, elements and attributes of editor namespaces (e.g.
+``sodipodi:namedview``, ``inkscape:label``), empty ``<defs>`` and groups.
+The optimizer strips them from the raw XML tree, so that svgelements and
+the node factory have less to process. Ids referenced within the document
+or by templates are preserved."""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+
+from dataclasses import dataclass
+
+from typing import Collection
+from typing import Optional
+
+from .streaming import element_references
+from .streaming import local_tag
+
+SVG_URI = "http://www.w3.org/2000/svg"
+
+# namespaces of attributes, which svgelements understands
+KEPT_ATTRIBUTE_NAMESPACES = (
+    "{http://www.w3.org/1999/xlink}",
+    "{http://www.w3.org/XML/1998/namespace}",
+)
+
+# elements, which have no effect on rendering
+DROPPED_TAGS = ("metadata",)
+
+# elements, which may be removed when empty
+EMPTY_DROPPED_TAGS = ("defs", "g")
+
+
+@dataclass
+class OptimizationReport:
+    """What has been removed from a document."""
+
+    bytes_removed: int = 0
+    elements_removed: int = 0
+    attributes_removed: int = 0
+    groups_merged: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"removed {self.bytes_removed} bytes, {self.elements_removed} "
+            f"elements, {self.attributes_removed} attributes, "
+            f"merged {self.groups_merged} groups"
+        )
+
+
+def _is_foreign(tag: str) -> bool:
+    return tag.startswith("{") and not tag.startswith("{" + SVG_URI + "}")
+
+
+def optimize_tree(
+    root: ET.Element, keep_ids: Optional[Collection[str]] = None
+) -> OptimizationReport:
+    """Optimizes, in place, the document with given root element. Elements
+    with ids in ``keep_ids`` or referenced within the document are never
+    removed nor merged, with ``keep_ids=None`` no element with an id is.
+    Comments and processing instructions are expected to be skipped by the
+    parser."""
+    optimizer = _Optimizer(root, keep_ids)
+    optimizer.strip_attributes(root)
+    optimizer.optimize(root)
+    return optimizer.report
+
+
+class _Optimizer:
+    def __init__(self, root: ET.Element, keep_ids: Optional[Collection[str]]):
+        self.report = OptimizationReport()
+        self.keep_all = keep_ids is None
+        self.referenced = {i for e in root.iter() for i in element_references(e)}
+        if keep_ids is not None:
+            self.referenced.update(keep_ids)
+
+    def needed(self, elem: ET.Element) -> bool:
+        id = elem.get("id")
+        if id is None:
+            return False
+        return self.keep_all or id in self.referenced
+
+    def strip_attributes(self, elem: ET.Element) -> None:
+        for key in [k for k in elem.attrib if _is_foreign(k)]:
+            if not key.startswith(KEPT_ATTRIBUTE_NAMESPACES):
+                del elem.attrib[key]
+                self.report.attributes_removed += 1
+
+    def optimize(self, parent: ET.Element) -> None:
+        children: list[ET.Element] = []
+        for elem in list(parent):
+            if _is_foreign(elem.tag) or local_tag(elem.tag) in DROPPED_TAGS:
+                self.remove(parent, children, elem, sum(1 for _ in elem.iter()))
+                continue
+            self.strip_attributes(elem)
+            self.optimize(elem)
+            tag = local_tag(elem.tag)
+            if tag in EMPTY_DROPPED_TAGS and len(elem) == 0 and not self.needed(elem):
+                self.remove(parent, children, elem, 1)
+                continue
+            children.append(self.merged(elem) if tag == "g" else elem)
+        parent[:] = children
+
+    def remove(
+        self,
+        parent: ET.Element,
+        children: list[ET.Element],
+        elem: ET.Element,
+        count: int,
+    ) -> None:
+        # text following the element is retained
+        if elem.tail:
+            if children:
+                children[-1].tail = (children[-1].tail or "") + elem.tail
+            else:
+                parent.text = (parent.text or "") + elem.tail
+        self.report.elements_removed += count
+
+    def merged(self, group: ET.Element) -> ET.Element:
+        """Returns the only child of a group which has no effect, which
+        replaces the group, or the group itself."""
+        if len(group) != 1 or self.needed(group):
+            return group
+        if any(k != "id" for k in group.attrib):
+            return group
+        (child,) = list(group)
+        child.tail = group.tail
+        self.report.groups_merged += 1
+        return child
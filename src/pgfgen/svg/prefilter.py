@@ -0,0 +1,97 @@
+"""Parsing of SVG documents filtered at the XML level.
+
+The raw XML tree gets pruned of layers which are not needed (see layers),
+of elements which are not selected (see selection) and of data which has
+no effect on rendering (see optimizer), in this order, before svgelements
+parses what is left."""
+
+from __future__ import annotations
+
+import io
+
+import xml.etree.ElementTree as ET
+
+from typing import Any
+from typing import BinaryIO
+from typing import Collection
+from typing import Optional
+from typing import cast
+
+from ..types import BboxTuple
+
+from .layers import filter_layers
+from .nodes import SVGNode
+from .optimizer import SVG_URI
+from .optimizer import optimize_tree
+from .selection import select_elements
+from .selection import viewport_bbox
+from .sources import open_source
+from .streaming import StreamingSVG
+
+# size of chunks of documents fed to the parser
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_filtered(
+    source: str | BinaryIO,
+    ids: Optional[Collection[str]] = None,
+    layers: Optional[Collection[str]] = None,
+    exclude_layers: Optional[Collection[str]] = None,
+    optimize: bool = False,
+    document_bbox: Optional[BboxTuple] = None,
+    viewport: bool = False,
+    **parse_args: Any,
+) -> SVGNode:
+    """Parses an SVG document filtered as requested.
+
+    With ``ids`` only the selected parts of the document get parsed, the
+    ``document_bbox`` is then the bounding box of the (layer filtered)
+    document, determined as by parse_selection() if not given. With layers
+    filtered, the drawing consists of the remaining layers only.
+
+    With ``optimize=True`` the report of the optimizer is stored in the
+    ``optimization`` attribute of the node. Elements with selected ids are
+    preserved, without a selection all elements with ids are."""
+    with open_source(source) as fp:
+        root = _parse_tree(fp)
+    if layers is not None or exclude_layers is not None:
+        filter_layers(root, layers, exclude_layers)
+    if ids is not None:
+        if document_bbox is None and viewport:
+            document_bbox = viewport_bbox(root, **parse_args)
+        if document_bbox is None:
+            document = io.BytesIO(_tostring(root))
+            document_bbox = StreamingSVG(document, **parse_args).svg_bbox
+        select_elements(root, ids)
+    report = None
+    if optimize:
+        # sizes are compared in the same serialization
+        size = len(_tostring(root))
+        report = optimize_tree(root, ids)
+    text = _tostring(root)
+    node = SVGNode.parse(io.BytesIO(text), **parse_args)
+    node.document_bbox = document_bbox
+    if report is not None:
+        report.bytes_removed = size - len(text)
+        node.optimization = report
+    return node
+
+
+def _parse_tree(fp: BinaryIO) -> ET.Element:
+    """Parses the document fed to the parser in chunks, so that its text
+    isn't held in memory."""
+    # comments and processing instructions are skipped by the parser
+    parser = ET.XMLParser()
+    for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+        parser.feed(chunk)
+    return parser.close()
+
+
+def _tostring(root: ET.Element) -> bytes:
+    if root.tag == f"{{{SVG_URI}}}svg":
+        try:
+            text = ET.tostring(root, encoding="utf-8", default_namespace=SVG_URI)
+            return cast(bytes, text)
+        except ValueError:
+            pass  # there are elements without namespace
+    return cast(bytes, ET.tostring(root, encoding="utf-8"))
@@ -0,0 +1,152 @@
+"""Loading of selected parts of SVG documents.
+
+Only subtrees of the elements with requested ids are handed to svgelements,
+together with their ancestors (stripped of other children) and whatever
+they may refer to (``<defs>``, ``<style>``, referenced elements). The
+bounding box of the whole document (which determines the svg2pgf transform)
+is the bounding box of the drawing, as of a full load, determined with a
+streaming pass over the document, so coordinates of a selective load are
+the same as of a full one.
+
+With ``viewport=True`` it is the viewport declared by the root element
+instead, found without parsing the document. Coordinates are then the same
+as of a full load only if the drawing fills its viewport. Without a
+declared viewport the streaming pass is made anyway."""
+
+from __future__ import annotations
+
+import io
+
+import xml.etree.ElementTree as ET
+
+from typing import Any
+from typing import BinaryIO
+from typing import Iterable
+from typing import Optional
+
+from ..types import BboxTuple
+
+from .nodes import SVGNode
+from .optimizer import SVG_URI
+from .sources import open_source
+from .streaming import RETAINED_TAGS
+from .streaming import StreamingSVG
+from .streaming import element_references
+from .streaming import local_tag
+
+
+def select_elements(root: ET.Element, ids: Iterable[str]) -> None:
+    """Removes, in place, all elements which are not needed to render the
+    elements with given ids."""
+    ids = set(ids)
+    parents = {child: parent for parent in root.iter() for child in parent}
+    by_id = {e.get("id"): e for e in root.iter() if e.get("id") is not None}
+
+    # subtrees, which are kept entirely
+    subtrees = [by_id[i] for i in ids if i in by_id]
+    subtrees.extend(
+        e for e in root.iter() if e is not root and local_tag(e.tag) in RETAINED_TAGS
+    )
+    kept: set[ET.Element] = set()
+    while subtrees:
+        subtree = subtrees.pop()
+        if subtree in kept:
+            continue
+        for elem in subtree.iter():
+            kept.add(elem)
+            subtrees.extend(
+                by_id[i] for i in element_references(elem) if i in by_id
+            )
+
+    # ancestors of kept subtrees, which are kept without other children
+    chains: set[ET.Element] = {root}
+    for elem in kept:
+        parent = parents.get(elem)
+        while parent is not None and parent not in chains:
+            chains.add(parent)
+            parent = parents.get(parent)
+
+    for elem in chains:
+        for child in list(elem):
+            if child not in kept and child not in chains:
+                elem.remove(child)
+
+
+def root_element(source: str | BinaryIO) -> ET.Element:
+    """The root element of an SVG document, without its children. Only the
+    beginning of the document is read."""
+    with open_source(source) as fp:
+        for (_, elem) in ET.iterparse(fp, events=("start",)):
+            root: ET.Element = elem
+            return root
+    raise ET.ParseError("no element found")  # pragma: no cover
+
+
+def viewport_bbox(root: ET.Element, **parse_args: Any) -> Optional[BboxTuple]:
+    """Bounding box of the viewport declared by the root element (its
+    ``viewBox``, or else its ``width`` and ``height``), in coordinates of
+    the parsed shapes. None, if the root declares neither."""
+    attrib = {
+        name: value
+        for (name, value) in root.attrib.items()
+        if name in ("viewBox", "width", "height", "preserveAspectRatio")
+    }
+    viewbox = attrib.get("viewBox", "").replace(",", " ").split()
+    if len(viewbox) == 4:
+        (x, y, width, height) = viewbox
+    elif "width" in attrib and "height" in attrib:
+        (x, y, width, height) = ("0", "0", attrib["width"], attrib["height"])
+    else:
+        return None
+    # a rectangle covering the viewport, mapped as any other shape would be
+    svg = ET.Element(f"{{{SVG_URI}}}svg", attrib)
+    rect = {"x": x, "y": y, "width": width, "height": height}
+    ET.SubElement(svg, f"{{{SVG_URI}}}rect", rect)
+    text = ET.tostring(svg, encoding="unicode")
+    bbox: Optional[BboxTuple] = SVGNode.parse(
+        io.StringIO(text), **dict(parse_args, context=None)
+    ).svg_bbox()
+    return bbox
+
+
+def find_document_bbox(
+    source: str | BinaryIO,
+    root: Optional[ET.Element] = None,
+    viewport: bool = False,
+    **parse_args: Any,
+) -> Optional[BboxTuple]:
+    """Bounding box of the whole document, see the module's docstring. The
+    ``root`` element is read from the source, unless given."""
+    bbox = None
+    if viewport:
+        if root is None:
+            root = root_element(source)
+        bbox = viewport_bbox(root, **parse_args)
+    if bbox is None:
+        # context collects parsed elements, it has no effect on geometry
+        bbox = StreamingSVG(source, **dict(parse_args, context=None)).svg_bbox
+    return bbox
+
+
+def parse_selection(
+    source: str | BinaryIO,
+    ids: Iterable[str],
+    document_bbox: Optional[BboxTuple] = None,
+    viewport: bool = False,
+    **parse_args: Any,
+) -> SVGNode:
+    """Parses the elements with given ids (and their subtrees) out of an SVG
+    document. The ``document_bbox`` is the bounding box of the whole
+    document, if known, otherwise it gets determined (see the module's
+    docstring)."""
+    with open_source(source) as fp:
+        tree = ET.parse(fp)
+    if document_bbox is None:
+        document_bbox = find_document_bbox(
+            source, tree.getroot(), viewport, **parse_args
+        )
+    select_elements(tree.getroot(), ids)
+    text = ET.tostring(tree.getroot(), encoding="unicode")
+    node = SVGNode.parse(io.StringIO(text), **parse_args)
+    node.document_bbox = document_bbox
+    return node
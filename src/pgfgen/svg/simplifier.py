@@ -0,0 +1,273 @@
+"""Simplification of the geometry of paths, polylines and polygons.
+
+Drawings exported by GIS or plotter software often have polylines with far
+more vertices than a printed figure can resolve. The simplifier removes
+vertices of straight runs with the Ramer-Douglas-Peucker algorithm: no
+vertex removed is farther than the ``tolerance`` from the simplified line.
+Distances are measured in PGF units, after the svg2pgf transform, so the
+tolerance doesn't depend on the size of the document.
+
+Curves and arcs are kept as they are, they bound the runs of lines. With a
+``curve_tolerance``, quadratic and cubic curves with all control points
+within it of their chord are flattened into lines, and simplified with
+them. A curve lies within the convex hull of its points, so it moves by at
+most ``curve_tolerance + tolerance``.
+
+The svg2pgf transform depends on the bounding box of the document, which
+gets pinned before vertices are removed."""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+
+from typing import Optional
+from typing import Sequence
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+from .geometry import ARC
+from .geometry import CLOSE
+from .geometry import COORDS
+from .geometry import CUBIC
+from .geometry import LINE
+from .geometry import MOVE
+from .geometry import QUAD
+from .geometry import PathGeometry
+from .geometry import transform_coords
+from .nodes import PathNode
+from .nodes import SVGElementContainerNode
+from .nodes import SVGElementNode
+from .nodes import SVGNode
+from .nodes import _PolyshapeNode
+
+# spans of vertices searched with NumPy, when available
+NUMPY_MIN_VERTICES = 64
+
+# offsets of end points within coordinates of segments, by opcode
+_END_OFFSETS = {MOVE: 0, LINE: 0, QUAD: 2, CUBIC: 4, ARC: 2}
+
+Point = tuple[float, float]
+
+
+@dataclass
+class SimplificationReport:
+    """Vertices of paths, polylines and polygons before and after."""
+
+    vertices_before: int = 0
+    vertices_after: int = 0
+    curves_flattened: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"simplified {self.vertices_before} vertices to "
+            f"{self.vertices_after}, flattened {self.curves_flattened} curves"
+        )
+
+
+def simplify_tree(
+    node: SVGNode, tolerance: float, curve_tolerance: Optional[float] = None
+) -> SimplificationReport:
+    """Simplifies, in place, paths, polylines and polygons of the tree. With
+    ``curve_tolerance=None`` curves are never flattened."""
+    if tolerance < 0 or (curve_tolerance is not None and curve_tolerance < 0):
+        raise ValueError("tolerances must not be negative")
+    if node.document_bbox is None:
+        node.document_bbox = node.svg_bbox()
+    simplifier = _Simplifier(tolerance, curve_tolerance)
+    stack: list[SVGElementNode] = [node]
+    while stack:
+        child = stack.pop()
+        if isinstance(child, PathNode):
+            simplifier.path(child)
+        elif isinstance(child, _PolyshapeNode):
+            simplifier.polyshape(child)
+        if isinstance(child, SVGElementContainerNode):
+            stack.extend(child.children)
+    return simplifier.report
+
+
+class _Simplifier:
+    def __init__(self, tolerance: float, curve_tolerance: Optional[float]):
+        self.report = SimplificationReport()
+        self.tolerance = tolerance
+        self.curve_tolerance = curve_tolerance
+
+    def polyshape(self, node: _PolyshapeNode) -> None:
+        points = node.shape.points
+        coords: Sequence[float] = [u for p in points for u in (p.x, p.y)]
+        m = node.local2pgf_transform
+        if m is not None:
+            coords = transform_coords(coords, m)
+        keep = douglas_peucker(coords[0::2], coords[1::2], self.tolerance)
+        points[:] = [p for (p, kept) in zip(points, keep) if kept]
+        self.report.vertices_before += len(keep)
+        self.report.vertices_after += len(points)
+
+    def path(self, node: PathNode) -> None:
+        geometry = node.geometry
+        (ends, controls) = _pgf_points(node)
+        simplified = PathGeometry(others=geometry.others)
+        # lines not written yet, with their end points in PGF space, and
+        # the point they start from
+        run: list[tuple[Sequence[float], Point]] = []
+        run_start: Point = (0.0, 0.0)
+        # the current point and the start of the subpath, unknown after
+        # unsupported segments
+        current: Optional[Point] = None
+        subpath: Optional[Point] = None
+        (i, j, k) = (0, 0, 0)
+        for opcode in geometry.opcodes:
+            c: Sequence[float] = geometry.coords[i : i + COORDS[opcode]]
+            i += COORDS[opcode]
+            end: Optional[Point] = subpath if opcode == CLOSE else None
+            if opcode in _END_OFFSETS:
+                end = (ends[j], ends[j + 1])
+                j += 2
+            if opcode in (QUAD, CUBIC):
+                n = COORDS[opcode] - 2
+                if self.flattened(current, end, controls[k : k + n]):
+                    (opcode, c) = (LINE, c[n:])
+                    self.report.curves_flattened += 1
+                k += n
+            if opcode == LINE and current is not None and end is not None:
+                if not run:
+                    run_start = current
+                run.append((c, end))
+            else:
+                if run:
+                    self.flush(simplified, run_start, run)
+                    run = []
+                simplified.append(opcode, *c)
+            if opcode == MOVE:
+                subpath = end
+            current = end
+        if run:
+            self.flush(simplified, run_start, run)
+        self.count(geometry, simplified)
+        node.geometry = simplified
+
+    def flattened(
+        self, start: Optional[Point], end: Optional[Point], controls: Sequence[float]
+    ) -> bool:
+        if self.curve_tolerance is None or start is None or end is None:
+            return False
+        limit = self.curve_tolerance * self.curve_tolerance
+        return all(
+            _distance2(controls[m], controls[m + 1], *start, *end) <= limit
+            for m in range(0, len(controls), 2)
+        )
+
+    def flush(
+        self,
+        geometry: PathGeometry,
+        start: Point,
+        run: list[tuple[Sequence[float], Point]],
+    ) -> None:
+        xs = [start[0]] + [end[0] for (_, end) in run]
+        ys = [start[1]] + [end[1] for (_, end) in run]
+        keep = douglas_peucker(xs, ys, self.tolerance)
+        for ((c, _), kept) in zip(run, keep[1:]):
+            if kept:
+                geometry.append(LINE, *c)
+
+    def count(self, before: PathGeometry, after: PathGeometry) -> None:
+        # every segment but closing lines ends in a vertex
+        self.report.vertices_before += len(before) - before.opcodes.count(CLOSE)
+        self.report.vertices_after += len(after) - after.opcodes.count(CLOSE)
+
+
+def _pgf_points(node: PathNode) -> tuple[Sequence[float], Sequence[float]]:
+    """End points of the segments of the path, and control points of its
+    curves, in PGF space."""
+    geometry = node.geometry
+    (ends, controls) = (array("d"), array("d"))
+    i = 0
+    for opcode in geometry.opcodes:
+        offset = _END_OFFSETS.get(opcode)
+        if offset is not None:
+            ends.extend(geometry.coords[i + offset : i + offset + 2])
+        if opcode in (QUAD, CUBIC):
+            controls.extend(geometry.coords[i : i + COORDS[opcode] - 2])
+        i += COORDS[opcode]
+    m = node.local2pgf_transform
+    if m is None:
+        return (ends, controls)
+    return (transform_coords(ends, m), transform_coords(controls, m))
+
+
+def douglas_peucker(
+    xs: Sequence[float], ys: Sequence[float], tolerance: float
+) -> list[bool]:
+    """Which vertices of the polyline to keep, so that none removed is
+    farther than the tolerance from the simplified polyline. The first and
+    the last vertices are always kept."""
+    n = len(xs)
+    keep = [True] * n
+    if n < 3:
+        return keep
+    keep[1:-1] = [False] * (n - 2)
+    arrays = None
+    if numpy is not None and n >= NUMPY_MIN_VERTICES:
+        arrays = (numpy.asarray(xs, dtype=float), numpy.asarray(ys, dtype=float))
+    limit = tolerance * tolerance
+    stack = [(0, n - 1)]
+    while stack:
+        (first, last) = stack.pop()
+        if last - first < 2:
+            continue
+        if arrays is not None and last - first > NUMPY_MIN_VERTICES:
+            (k, d) = _batch_farthest(*arrays, first, last)
+        else:
+            (k, d) = _farthest(xs, ys, first, last)
+        if d > limit:
+            keep[k] = True
+            stack.append((k, last))
+            stack.append((first, k))
+    return keep
+
+
+def _farthest(
+    xs: Sequence[float], ys: Sequence[float], first: int, last: int
+) -> tuple[int, float]:
+    """The vertex between first and last farthest from the line joining
+    them, with its squared distance."""
+    (ax, ay, bx, by) = (xs[first], ys[first], xs[last], ys[last])
+    (farthest, d_max) = (first + 1, -1.0)
+    for k in range(first + 1, last):
+        d = _distance2(xs[k], ys[k], ax, ay, bx, by)
+        if d > d_max:
+            (farthest, d_max) = (k, d)
+    return (farthest, d_max)
+
+
+def _batch_farthest(
+    xs: numpy.ndarray, ys: numpy.ndarray, first: int, last: int
+) -> tuple[int, float]:
+    # the same operations as of _distance2(), so are the results
+    (ax, ay) = (xs[first], ys[first])
+    (dx, dy) = (xs[last] - ax, ys[last] - ay)
+    length = dx * dx + dy * dy
+    (px, py) = (xs[first + 1 : last] - ax, ys[first + 1 : last] - ay)
+    if length > 0:
+        t = numpy.clip((px * dx + py * dy) / length, 0.0, 1.0)
+        (px, py) = (px - t * dx, py - t * dy)
+    d = px * px + py * py
+    k = int(numpy.argmax(d))
+    return (first + 1 + k, float(d[k]))
+
+
+def _distance2(
+    px: float, py: float, ax: float, ay: float, bx: float, by: float
+) -> float:
+    """Squared distance of the point from the segment."""
+    (dx, dy) = (bx - ax, by - ay)
+    (px, py) = (px - ax, py - ay)
+    length = dx * dx + dy * dy
+    if length > 0:
+        t = min(max((px * dx + py * dy) / length, 0.0), 1.0)
+        (px, py) = (px - t * dx, py - t * dy)
+    return px * px + py * py
@@ -0,0 +1,88 @@
+"""Sinks receiving generated PGF code, line by line.
+
+Generators write lines to a sink, which prefixes them with indentation of
+the current depth. Containers write code of their children one level
+deeper, so each line is produced once, whatever the nesting of groups it
+belongs to, and goes straight to its destination."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+from ..types import SupportsWrite
+
+from .formatting import EXACT
+from .formatting import NumberFormat
+from .styles import StyleTable
+
+
+class LineSink:
+    """Passes lines, indented by the current depth, to a callback. Numbers
+    in the lines are to be formatted with ``fmt``. With ``styles``, graphic
+    objects are styled with the bundles interned there. ``scaled`` tells if
+    the scale factor of stroke widths has been computed by an enclosing
+    scope, otherwise the outermost scope written computes it."""
+
+    __slots__ = ("emit", "indent", "fmt", "styles", "scaled", "depth", "_prefix")
+
+    def __init__(
+        self,
+        emit: Callable[[str], object],
+        indent: str = "  ",
+        fmt: NumberFormat = EXACT,
+        styles: Optional[StyleTable] = None,
+    ):
+        self.emit = emit
+        self.indent = indent
+        self.fmt = fmt
+        self.styles = styles
+        self.scaled = False
+        self.depth = 0
+        self._prefix = ""
+
+    def line(self, line: str) -> None:
+        self.emit(self._prefix + line)
+
+    def lines(self, lines: Iterable[str]) -> None:
+        (emit, prefix) = (self.emit, self._prefix)
+        for line in lines:
+            emit(prefix + line)
+
+    @contextmanager
+    def nested(self) -> Iterator[None]:
+        """Lines written within the context are indented one level deeper."""
+        self.depth += 1
+        self._prefix = self.indent * self.depth
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            self._prefix = self.indent * self.depth
+
+
+class TextSink(LineSink):
+    """Writes lines to a text stream (a file, ``io.StringIO``), separated by
+    newlines. As with ``"\\n".join(lines)``, no newline follows the last
+    line."""
+
+    __slots__ = ("stream", "_separator")
+
+    def __init__(
+        self,
+        stream: SupportsWrite,
+        indent: str = "  ",
+        fmt: NumberFormat = EXACT,
+        styles: Optional[StyleTable] = None,
+    ):
+        super().__init__(self._write, indent, fmt, styles)
+        self.stream = stream
+        self._separator = ""
+
+    def _write(self, line: str) -> None:
+        self.stream.write(self._separator + line)
+        self._separator = "\n"
@@ -0,0 +1,88 @@
+"""Opens SVG sources, plain or compressed with gzip (``.svgz``), stored
+in the filesystem or in archives (see archives).
+
+Compressed documents are recognized by their contents, not by the file
+name, and get decompressed incrementally while the parser reads them, so
+the whole decompressed text is never held in memory."""
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import os
+import os.path
+
+from typing import BinaryIO
+from typing import Iterator
+from typing import cast
+
+from .archives import split_member
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def source_exists(file: str) -> bool:
+    """Whether the file exists, in the filesystem or in an archive."""
+    member = split_member(file)
+    if member is not None:
+        return member[1] in member[0]
+    return os.path.isfile(file)
+
+
+def source_stat(file: str) -> tuple[int, int]:
+    """Returns ``(mtime_ns, size)`` of the file, raises OSError if it does
+    not exist."""
+    member = split_member(file)
+    if member is not None:
+        try:
+            return member[0].stat(member[1])
+        except KeyError:
+            raise FileNotFoundError(file) from None
+    stat = os.stat(file)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def open_file(file: str) -> BinaryIO:
+    """Opens the file (from the filesystem or an archive) for reading raw
+    contents, raises OSError if it does not exist."""
+    member = split_member(file)
+    if member is not None:
+        try:
+            return member[0].open(member[1])
+        except KeyError:
+            raise FileNotFoundError(file) from None
+    return open(file, "rb")
+
+
+def is_compressed(fp: BinaryIO) -> bool:
+    """Whether the (seekable) stream is compressed with gzip. The position
+    of the stream is restored."""
+    position = fp.tell()
+    try:
+        return fp.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    finally:
+        fp.seek(position)
+
+
+def is_compressed_file(file: str) -> bool:
+    with open_file(file) as fp:
+        return is_compressed(fp)
+
+
+@contextlib.contextmanager
+def open_source(source: str | BinaryIO) -> Iterator[BinaryIO]:
+    """Opens a file (or rewinds a stream) for reading, decompressing it on
+    the fly if needed. Streams given by the caller are left open."""
+    with contextlib.ExitStack() as stack:
+        fp: BinaryIO
+        if isinstance(source, str):
+            fp = stack.enter_context(open_file(source))
+        else:
+            source.seek(0)
+            fp = source
+        if is_compressed(fp):
+            # GzipFile doesn't close the underlying stream
+            gz = stack.enter_context(gzip.GzipFile(fileobj=fp, mode="rb"))
+            yield cast(BinaryIO, gz)
+        else:
+            yield fp
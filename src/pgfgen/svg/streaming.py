@@ -0,0 +1,473 @@
+"""Streaming conversion of SVG documents to PGF code.
+
+Documents are read with an incremental XML parser. Elements of the root
+``<svg>`` and of nested ``<g>`` groups are handed to svgelements in small
+batches, turned into PGF code and discarded, so the peak memory depends on
+the nesting depth and batch size, not on the size of the document."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import re
+
+import xml.etree.ElementTree as ET
+
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+from typing import Sequence
+
+from svgelements import Matrix
+
+from ..defaults import STREAMING_BATCH_SIZE
+from ..types import BboxTuple
+
+from .formatting import EXACT
+from .formatting import NumberFormat
+from .generator import GeneratorNodeVisitor
+from .generator import GroupGenerator
+from .generator import SVGGenerator
+from .nodes import GroupNode
+from .nodes import SVGNode
+from .sources import open_source
+
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+# elements, which svgelements does not render
+NON_RENDERED_TAGS = ("defs", "clipPath", "pattern", "style")
+
+# elements kept in memory during the whole conversion, others may refer them
+RETAINED_TAGS = NON_RENDERED_TAGS + ("symbol",)
+
+_URL_REFERENCE = re.compile(r"url\(\s*#([^)\s]+)\s*\)")
+
+
+def local_tag(tag: str) -> str:
+    if tag.startswith(SVG_NS):
+        return tag[len(SVG_NS) :]
+    return tag
+
+
+def element_references(element: ET.Element) -> Iterator[str]:
+    """Yields ids referenced by attributes of the element."""
+    for key, value in element.attrib.items():
+        if key in (XLINK_HREF, "href"):
+            if value.startswith("#"):
+                yield value[1:]
+        elif "url(" in value:
+            yield from _URL_REFERENCE.findall(value)
+
+
+class StreamingSVG:
+    """An SVG document converted to PGF incrementally, without building
+    the whole document tree.
+
+    The document is read twice. The first read collects elements which may
+    be referenced from elsewhere (``<style>``, ``<defs>``, ``<symbol>``
+    and the like) and computes the bounding box that determines the SVG to
+    PGF transform, the second one generates the code. Style sheets are
+    passed to every batch of elements, other collected elements only to
+    the batches referring them, directly or through other collected
+    elements. Batches referring ids which have not been collected yet are
+    not measured by the first read. If there are some, the document is
+    read once more to collect the referenced elements (for example a
+    rendered group used by ``<use>``), and once more to measure them."""
+
+    def __init__(
+        self,
+        source: str | BinaryIO,
+        batch_size: int = STREAMING_BATCH_SIZE,
+        **parse_args: Any,
+    ):
+        if parse_args.get("context") is not None:
+            raise ValueError("context is not supported when streaming")
+        self.source = source
+        self.batch_size = max(1, batch_size)
+        self.parse_args = parse_args
+        self._styles: Optional[list[ET.Element]] = None
+        self._retained: list[ET.Element] = []
+        # elements with ids within retained subtrees, with the retained
+        # elements containing them, and the number of subtrees indexed
+        self._index: dict[str, tuple[ET.Element, tuple[ET.Element, ...]]] = {}
+        self._indexed = 0
+        self._bbox: Optional[BboxTuple] = None
+        self._svg2pgf_transform: Optional[Matrix] = None
+        self._root_node: Optional[SVGNode] = None
+
+    def open(self) -> contextlib.AbstractContextManager[BinaryIO]:
+        return open_source(self.source)
+
+    def iterparse(self) -> Iterator[tuple[str, ET.Element]]:
+        with self.open() as fp:
+            yield from ET.iterparse(fp, events=("start", "end"))
+
+    @property
+    def svg_bbox(self) -> Optional[BboxTuple]:
+        """Bounding box of the whole document, in SVG coordinates."""
+        self._determine_svg2pgf_transform()
+        return self._bbox
+
+    @property
+    def svg2pgf_transform(self) -> Matrix:
+        return self._determine_svg2pgf_transform()
+
+    def svg2pgf_bbox(self, bbox: BboxTuple) -> BboxTuple:
+        self._determine_svg2pgf_transform()
+        if self._root_node is None:
+            return bbox
+        return self._root_node.svg2pgf_bbox(bbox)
+
+    def lines(
+        self, indent: str = "  ", fmt: NumberFormat = EXACT
+    ) -> Iterator[str]:
+        """Yields lines of PGF code, one by one."""
+        self._determine_svg2pgf_transform()
+        root: Optional[ET.Element] = None
+        # generators of open groups (with documents they belong to, which
+        # have to be kept), None for groups that are not rendered
+        groups: list[Optional[tuple[GroupGenerator, SVGNode]]] = []
+        for event, ancestors, elements in self._batches():
+            prefix = indent * (len(ancestors) + 1)
+            if event == "root":
+                root = elements[0]
+                node = self._parse(root, [], [])
+                svg = SVGGenerator(node)
+                groups.append((svg, node))
+                yield from svg.generate_begin_pgfscope(indent, fmt, scale=True)
+            elif event in ("end", "close"):
+                group = groups.pop()
+                if group is not None:
+                    lines = group[0].generate_end_pgfscope()
+                    if event == "end":
+                        lines = GroupGenerator.indent(lines, prefix)
+                    yield from lines
+            elif None in groups:
+                # contents of a group that is not rendered
+                if event == "begin":
+                    groups.append(None)
+            elif event == "begin":
+                assert root is not None
+                group = self._group_generator(root, ancestors, elements[0])
+                groups.append(group)
+                if group is not None:
+                    lines = group[0].generate_begin_pgfscope(indent, fmt)
+                    yield from GroupGenerator.indent(lines, prefix)
+            else:  # event == "leaves"
+                assert root is not None
+                lines = self._leaves_lines(root, ancestors, elements, indent, fmt)
+                yield from GroupGenerator.indent(lines, prefix)
+
+    def _group_generator(
+        self, root: ET.Element, ancestors: list[ET.Element], element: ET.Element
+    ) -> Optional[tuple[GroupGenerator, SVGNode]]:
+        """Generator of the group's scope and the document it belongs to,
+        None if the group is not rendered."""
+        empty = ET.Element(element.tag, element.attrib)
+        node = self._parse(root, ancestors, [empty])
+        group = self._innermost_group(node, len(ancestors) + 1)
+        return None if group is None else (GroupGenerator(group), node)
+
+    def _leaves_lines(
+        self,
+        root: ET.Element,
+        ancestors: list[ET.Element],
+        elements: list[ET.Element],
+        indent: str,
+        fmt: NumberFormat,
+    ) -> list[str]:
+        node = self._parse(root, ancestors, elements)
+        group = self._innermost_group(node, len(ancestors))
+        if group is None:
+            return []
+        visitor = GeneratorNodeVisitor(indent, fmt=fmt)
+        # the scale factor is computed by the scope of the document
+        visitor.sink.scaled = True
+        for child in group.children:
+            child.accept_visitor(visitor)
+        return visitor.lines
+
+    # ------------------------------------------------------------------------
+    def _determine_svg2pgf_transform(self) -> Matrix:
+        if self._svg2pgf_transform is not None:
+            return self._svg2pgf_transform
+        (root, bbox) = self._prepare()
+        self._bbox = bbox
+        if root is None or bbox is None:
+            self._svg2pgf_transform = Matrix()
+        else:
+            # keep a childless document, it knows how to map SVG to PGF
+            self._root_node = self._parse(root, [], [])
+            matrix = self._root_node._svg2pgf_transform_for_bbox(bbox)
+            self._root_node.svg2pgf_transform = matrix
+            self._svg2pgf_transform = matrix
+        return self._svg2pgf_transform
+
+    @staticmethod
+    def _bbox_union(
+        a: Optional[BboxTuple], b: Optional[BboxTuple]
+    ) -> Optional[BboxTuple]:
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+    def _prepare(self) -> tuple[Optional[ET.Element], Optional[BboxTuple]]:
+        """Collects retained elements and computes the bounding box of the
+        document, in a single read unless there are batches referring
+        elements not collected yet. Returns the root element and the bbox."""
+        collector = _RetainedCollector()
+        self._styles = collector.styles
+        self._retained = collector.retained
+        bbox: Optional[BboxTuple] = None
+        root: Optional[ET.Element] = None
+        # numbers of batches of leaves referring elements which have not
+        # been collected yet
+        deferred: set[int] = set()
+        for k, (root, ancestors, elements) in enumerate(self._leaves(collector)):
+            if _references(elements, [root, *ancestors]) <= collector.ids:
+                node = self._parse(root, ancestors, elements)
+                bbox = self._bbox_union(bbox, node.svg_bbox())
+            else:
+                deferred.add(k)
+        missing = collector.references - collector.ids
+        if missing:
+            self._retained.extend(self._collect_referenced(missing))
+        if deferred:
+            for k, (root, ancestors, elements) in enumerate(self._leaves()):
+                if k in deferred:
+                    node = self._parse(root, ancestors, elements)
+                    bbox = self._bbox_union(bbox, node.svg_bbox())
+        return (root, bbox)
+
+    def _leaves(
+        self, observer: Optional[Callable[[str, ET.Element], None]] = None
+    ) -> Iterator[tuple[ET.Element, list[ET.Element], list[ET.Element]]]:
+        """Yields batches of leaves, with the root element."""
+        root: Optional[ET.Element] = None
+        for event, ancestors, elements in self._batches(observer):
+            if event == "root":
+                root = elements[0]
+            elif event == "leaves":
+                assert root is not None
+                yield (root, ancestors, elements)
+
+    def _collect_referenced(self, ids: set[str]) -> list[ET.Element]:
+        """Reads the document once more, returns elements with given ids
+        (outside of already retained subtrees)."""
+        retained = []
+        # for each open element, whether it belongs to a retained subtree
+        kept: list[bool] = []
+        stack: list[ET.Element] = []
+        for event, elem in self.iterparse():
+            if event == "start":
+                inside = bool(kept) and kept[-1]
+                is_retained = bool(stack) and elem.get("id") in ids
+                if is_retained and not inside:
+                    retained.append(elem)
+                kept.append(inside or is_retained)
+                stack.append(elem)
+            else:
+                stack.pop()
+                kept.pop()
+                if stack and not kept[-1]:
+                    stack[-1].remove(elem)
+        return retained
+
+    def _batches(
+        self, observer: Optional[Callable[[str, ET.Element], None]] = None
+    ) -> Iterator[_Batch]:
+        """Yields tuples ``(event, ancestors, elements)``, where event is one
+        of "root", "begin", "leaves", "end" and "close", ancestors is the
+        list of open groups and elements are subject of the event. Elements
+        get detached from the tree once they're processed. The observer is
+        called with each event of the XML parser, before it is handled."""
+        batcher = _Batcher(self.batch_size)
+        for event, elem in self.iterparse():
+            if observer is not None:
+                observer(event, elem)
+            if event == "start":
+                yield from batcher.start(elem)
+            else:
+                yield from batcher.end(elem)
+
+    def _parse(
+        self, root: ET.Element, ancestors: list[ET.Element], elements: list[ET.Element]
+    ) -> SVGNode:
+        """Parses a document made of the root, the chain of ancestors and
+        the elements, with retained elements referenced by them."""
+        document = ET.Element(root.tag, root.attrib)
+        retained = list(self._styles or [])
+        references = _references(elements, [root, *ancestors])
+        if references:
+            retained.extend(self._referenced(references))
+        if retained:
+            ET.SubElement(document, SVG_NS + "defs").extend(retained)
+        parent = document
+        for ancestor in ancestors:
+            parent = ET.SubElement(parent, ancestor.tag, ancestor.attrib)
+        parent.extend(elements)
+        text = ET.tostring(document, encoding="unicode")
+        node = SVGNode.parse(io.StringIO(text), **self.parse_args)
+        if self._svg2pgf_transform is not None:
+            node.svg2pgf_transform = self._svg2pgf_transform
+        return node
+
+    def _referenced(self, ids: set[str]) -> list[ET.Element]:
+        """Retained elements with the ids, and the ones they refer to,
+        transitively. Elements within others of the list are left out."""
+        self._index_retained()
+        found: dict[ET.Element, tuple[ET.Element, ...]] = {}
+        pending = list(ids)
+        seen = set(ids)
+        while pending:
+            entry = self._index.get(pending.pop())
+            if entry is None or entry[0] in found:
+                continue
+            (elem, containers) = entry
+            found[elem] = containers
+            for id in _references([elem]) - seen:
+                seen.add(id)
+                pending.append(id)
+        return [
+            elem
+            for (elem, containers) in found.items()
+            if not any(c in found for c in containers)
+        ]
+
+    def _index_retained(self) -> None:
+        """Indexes retained subtrees collected since the last call."""
+        for retained in self._retained[self._indexed :]:
+            stack: list[tuple[ET.Element, tuple[ET.Element, ...]]] = [(retained, ())]
+            while stack:
+                (elem, containers) = stack.pop()
+                id = elem.get("id")
+                if id is not None and id not in self._index:
+                    self._index[id] = (elem, containers)
+                stack.extend((child, containers + (elem,)) for child in elem)
+        self._indexed = len(self._retained)
+
+    @staticmethod
+    def _innermost_group(node: GroupNode, depth: int) -> Optional[GroupNode]:
+        """Walks down a chain of nested groups, returns None if the chain is
+        broken (for example due to display:none)."""
+        for _ in range(depth):
+            groups = [c for c in node.children if isinstance(c, GroupNode)]
+            if len(groups) != 1:
+                return None
+            node = groups[0]
+        return node
+
+
+def _references(
+    elements: Sequence[ET.Element], containers: Sequence[ET.Element] = ()
+) -> set[str]:
+    """Ids referenced by the elements and their descendants, and by the
+    containers, not by their children."""
+    ids = {id for e in elements for x in e.iter() for id in element_references(x)}
+    ids.update(id for e in containers for id in element_references(e))
+    return ids
+
+
+# (event, ancestors, elements), see StreamingSVG._batches()
+_Batch = tuple[str, list[ET.Element], list[ET.Element]]
+
+
+class _Batcher:
+    """Splits the document into batches (see StreamingSVG._batches), while
+    it's being parsed. Fed with start and end events of the parser."""
+
+    def __init__(self, batch_size: int) -> None:
+        self.batch_size = batch_size
+        # open elements, with their kinds
+        self.stack: list[tuple[ET.Element, str]] = []
+        self.ancestors: list[ET.Element] = []
+        self.pending: list[ET.Element] = []
+
+    def start(self, elem: ET.Element) -> Iterator[_Batch]:
+        kind = self._kind(elem)
+        if kind == "root":
+            yield ("root", [], [elem])
+        elif kind == "group":
+            yield from self._flush(self.stack[-1][0])
+            yield ("begin", list(self.ancestors), [elem])
+            self.ancestors.append(elem)
+        self.stack.append((elem, kind))
+
+    def end(self, elem: ET.Element) -> Iterator[_Batch]:
+        (_, kind) = self.stack.pop()
+        if kind == "leaf":
+            self.pending.append(elem)
+            if len(self.pending) >= self.batch_size:
+                yield from self._flush(self.stack[-1][0])
+        elif kind == "group":
+            yield from self._flush(elem)
+            self.ancestors.pop()
+            yield ("end", list(self.ancestors), [elem])
+            self.stack[-1][0].remove(elem)
+        elif kind == "skip":
+            self.stack[-1][0].remove(elem)
+        elif kind == "root":
+            yield from self._flush(elem)
+            yield ("close", [], [elem])
+
+    def _kind(self, elem: ET.Element) -> str:
+        if not self.stack:
+            return "root"
+        if self.stack[-1][1] not in ("root", "group"):
+            return "inner"
+        tag = local_tag(elem.tag)
+        if tag == "g":
+            return "group"
+        if tag in NON_RENDERED_TAGS:
+            return "skip"
+        return "leaf"
+
+    def _flush(self, parent: ET.Element) -> Iterator[_Batch]:
+        if self.pending:
+            yield ("leaves", list(self.ancestors), list(self.pending))
+            for elem in self.pending:
+                parent.remove(elem)
+            self.pending.clear()
+
+
+class _RetainedCollector:
+    """Observes parser events (see StreamingSVG._batches), collects style
+    sheets, subtrees of retained elements, ids found in these subtrees and
+    all the referenced ids."""
+
+    def __init__(self) -> None:
+        self.styles: list[ET.Element] = []
+        self.retained: list[ET.Element] = []
+        self.ids: set[str] = set()
+        self.references: set[str] = set()
+        # for each open element, whether it belongs to a retained subtree
+        self._kept: list[bool] = []
+        self._stack: list[ET.Element] = []
+
+    def __call__(self, event: str, elem: ET.Element) -> None:
+        if event == "start":
+            self.references.update(element_references(elem))
+            tag = local_tag(elem.tag)
+            inside = bool(self._kept) and self._kept[-1]
+            is_retained = bool(self._stack) and tag in RETAINED_TAGS
+            if tag == "style" and is_retained:
+                # also the ones in <defs>, style sheets apply everywhere
+                self.styles.append(elem)
+            elif is_retained and not inside:
+                self.retained.append(elem)
+            self._kept.append(inside or is_retained)
+            self._stack.append(elem)
+        else:
+            self._stack.pop()
+            kept = self._kept.pop()
+            if kept and elem.get("id"):
+                self.ids.add(elem.get("id", ""))
+            if local_tag(elem.tag) == "style" and self._kept and self._kept[-1]:
+                # it's in styles, not to be passed twice
+                self._stack[-1].remove(elem)
@@ -0,0 +1,157 @@
+"""Interning of style bundles.
+
+A style bundle is the code setting colors, opacity and stroke options of a
+graphic object, as generated at the beginning of its scope. Drawings often
+have many elements styled the same way, so a figure may define each bundle
+shared by several elements once, as a macro, and the elements call it
+instead of repeating the code.
+
+Macros are named ``\\pgfgen@style@<letters>``, digits would end the name of
+a control sequence. The names, as names of internal PGF macros used by the
+generated code, require ``@`` to be a letter.
+
+A StyleRegistry shares bundles and colors across figures of a document.
+They are defined once, in the preamble, and figures using the registry
+only refer to them."""
+
+from __future__ import annotations
+
+from typing import Iterable
+from typing import Optional
+from typing import Sequence
+
+from .nodes import GraphicObjectNode
+
+STYLE_MACRO_PREFIX = r"\pgfgen@style@"
+SHARED_STYLE_MACRO_PREFIX = r"\pgfgen@docstyle@"
+SHARED_COLOR_PREFIX = "pgfgen@color@"
+
+Bundle = tuple[str, ...]
+
+
+class StyleTable:
+    """Style bundles of graphic objects of a figure. Bundles are added in
+    the order the objects get generated, the ones added more than once are
+    defined as macros, numbered in the order of their first use. With a
+    ``registry``, all bundles are named and defined there instead."""
+
+    __slots__ = ("registry", "_bundles", "_counts", "_names")
+
+    def __init__(self, registry: Optional[StyleRegistry] = None) -> None:
+        self.registry = registry
+        self._bundles: dict[GraphicObjectNode, Bundle] = {}
+        self._counts: dict[Bundle, int] = {}
+        self._names: Optional[dict[Bundle, str]] = None
+
+    def add(self, node: GraphicObjectNode, lines: Sequence[str]) -> None:
+        bundle = tuple(lines)
+        self._bundles[node] = bundle
+        self._counts[bundle] = self._counts.get(bundle, 0) + 1
+        self._names = None
+
+    def bundle(self, node: GraphicObjectNode) -> Optional[Bundle]:
+        return self._bundles.get(node)
+
+    @property
+    def names(self) -> dict[Bundle, str]:
+        """Names of bundles defined as macros."""
+        if self._names is None and self.registry is not None:
+            self._names = {b: self.registry.name(b) for b in self._counts}
+        if self._names is None:
+            shared = (b for (b, n) in self._counts.items() if n > 1)
+            self._names = {
+                bundle: STYLE_MACRO_PREFIX + _letters(k)
+                for (k, bundle) in enumerate(shared)
+            }
+        return self._names
+
+    def lines(self, node: GraphicObjectNode) -> Optional[list[str]]:
+        """Code styling the node, a macro call if its bundle is shared, or
+        None if the node has not been added."""
+        bundle = self._bundles.get(node)
+        if bundle is None:
+            return None
+        name = self.names.get(bundle)
+        return [name] if name is not None else list(bundle)
+
+    def definitions(self, indent: str = "  ") -> list[str]:
+        if self.registry is not None:
+            return []
+        return _definitions(self.names, indent)
+
+
+class StyleRegistry:
+    """Style bundles and colors shared by figures of a rendered document,
+    exposed to templates as ``pgfgen_preamble``. The template places the
+    preamble by printing the registry, for which the environment writes the
+    placeholder returned by place(). Figures rendered after that use the
+    registry, expand() replaces the placeholder with definitions of
+    everything they registered."""
+
+    __slots__ = ("indent", "placed", "_names", "_colors")
+
+    def __init__(self, indent: str = "  ") -> None:
+        self.indent = indent
+        # whether the template has printed the preamble placeholder
+        self.placed = False
+        self._names: dict[Bundle, str] = {}
+        self._colors: dict[str, str] = {}
+
+    @property
+    def placeholder(self) -> str:
+        return "%% pgfgen preamble %x" % id(self)
+
+    def place(self) -> str:
+        """Records that the preamble is placed, returns its placeholder."""
+        self.placed = True
+        return self.placeholder
+
+    def name(self, bundle: Bundle) -> str:
+        """Macro name of the bundle, registered if it's new."""
+        name = self._names.get(bundle)
+        if name is None:
+            name = SHARED_STYLE_MACRO_PREFIX + _letters(len(self._names))
+            self._names[bundle] = name
+        return name
+
+    def color(self, hexrgb: str) -> str:
+        """Name of the color given as ``RRGGBB``, registered if it's new."""
+        name = self._colors.get(hexrgb)
+        if name is None:
+            name = self._colors[hexrgb] = SHARED_COLOR_PREFIX + hexrgb
+        return name
+
+    def definitions(self) -> list[str]:
+        lines = [
+            r"\definecolor{%s}{HTML}{%s}" % (name, hexrgb)
+            for (hexrgb, name) in self._colors.items()
+        ]
+        lines.extend(_definitions(self._names, self.indent))
+        return lines
+
+    def expand(self, text: str) -> str:
+        """Replaces the placeholder in the rendered text with definitions."""
+        return text.replace(self.placeholder, "\n".join(self.definitions()))
+
+
+def _definitions(names: dict[Bundle, str], indent: str) -> list[str]:
+    lines = []
+    for (bundle, name) in names.items():
+        lines.append(r"\def%s{%%" % name)
+        lines.extend(_indented(bundle, indent))
+        lines.append("}")
+    return lines
+
+
+def _letters(k: int) -> str:
+    """Spells k with letters: a, b, ..., z, aa, ab, ..."""
+    letters = ""
+    k += 1
+    while k:
+        (k, r) = divmod(k - 1, 26)
+        letters = chr(ord("a") + r) + letters
+    return letters
+
+
+def _indented(lines: Iterable[str], indent: str) -> list[str]:
+    return [indent + line for line in lines]
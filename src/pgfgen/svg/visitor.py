@@ -7,6 +7,8 @@ import pgfgen.svg.nodes as nodes
 
 
 class NodeVisitor(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def visit_arc(self, node: nodes.ArcNode) -> None:
         pass
@@ -93,6 +95,8 @@ class NodeVisitor(ABC):
 
 
 class NodeVisitee(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def accept_visitor(self, visitor: NodeVisitor) -> None:
         pass
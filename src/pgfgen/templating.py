@@ -4,21 +4,56 @@ from __future__ import annotations
 
 from jinja2 import Environment
 from jinja2 import FileSystemLoader
+from jinja2 import Template
+
+import io
+import warnings
 
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
 from argparse import Namespace
 
+from typing import Any
+from typing import Callable
+from typing import Hashable
+from typing import Iterable
 from typing import Iterator
 from typing import Optional
 from typing import final
 
+from .svg.binary import detach
+from .svg.formatting import EXACT
+from .svg.formatting import NumberFormat
+from .svg.formatting import parse_length
 from .svg.nodes import SVG2PGFTransform
 from .svg.nodes import SVGBboxProvider
 from .svg.nodes import SVGElementContainerNode
 from .svg.nodes import SVGElementNode
 from .svg.nodes import SVGNode
 
+from .svg.optimizer import OptimizationReport
+from .svg.simplifier import SimplificationReport
+from .svg.simplifier import simplify_tree
+from .svg.prefilter import parse_filtered
+from .svg.selection import find_document_bbox
+from .svg.selection import parse_selection
+from .svg.sources import source_exists
+from .svg.streaming import StreamingSVG
+
 from .svg.generator import GeneratorNodeVisitor as SvgToPgfGenerator
+from .svg.generator import collect_styles
+from .svg.sink import TextSink
+from .svg.styles import StyleRegistry
+
+from .cache import PgfCodeCache
+from .cache import SvgParseCache
+from .cache import SvgTreeCache
+from .cache import default_parse_cache
+from .cache import source_digest
+
+from .planning import TemplatePlan
+from .planning import TemplatePlanner
 
 from svgelements import Color
 from svgelements import Matrix
@@ -34,15 +69,19 @@ from .defaults import TRIM_BLOCKS
 from .defaults import AUTOESCAPE
 from .defaults import TEMPLATE_PATH
 from .defaults import SVG_PATH
+from .defaults import CODE_CACHE_MAX_BYTES
 
 from .exceptions import SvgFileNotFound
 
+from .types import BboxTuple
 from .types import SearchPath
 from .types import PGFGenOptions
 from .types import PGFGenOptionKey
 from .types import SupportsAppend
+from .types import SupportsWrite
 
 from .util import find_in_search_path
+from .util import svg_variants
 
 
 @final
@@ -57,7 +96,59 @@ class EnvironmentFactory:
         svg_path = EnvironmentFactory._compose_search_paths(
             arguments.svg_path, options, "svg_path", SVG_PATH
         )
-        return EnvironmentFactory(template_path=template_path, svg_path=svg_path)
+        parse_cache = EnvironmentFactory._configure_parse_cache(
+            default_parse_cache, options
+        )
+        code_cache = EnvironmentFactory._create_code_cache(
+            getattr(arguments, "cache_dir", None), options
+        )
+        tree_cache = None
+        if code_cache is not None:
+            tree_cache = SvgTreeCache(code_cache.directory, code_cache.max_bytes)
+        plan = bool(getattr(arguments, "plan", False))
+        jobs = getattr(arguments, "jobs", None)
+        optimize = bool(getattr(arguments, "optimize", False))
+        detach = bool(getattr(arguments, "detach", False))
+        simplify = getattr(arguments, "simplify", None)
+        curve_tolerance = getattr(arguments, "curve_tolerance", None)
+        number_format = EnvironmentFactory._create_number_format(
+            getattr(arguments, "unit", None), options
+        )
+        intern_styles = False
+        if options is not None:
+            intern_styles = options.get("intern_styles", False)
+        return EnvironmentFactory(
+            template_path=template_path,
+            svg_path=svg_path,
+            parse_cache=parse_cache,
+            code_cache=code_cache,
+            tree_cache=tree_cache,
+            plan=plan,
+            jobs=jobs,
+            optimize=optimize,
+            detach=detach,
+            simplify=simplify,
+            curve_tolerance=curve_tolerance,
+            number_format=number_format,
+            intern_styles=intern_styles,
+        )
+
+    @staticmethod
+    def _create_number_format(
+        unit: Optional[str], options: Optional[PGFGenOptions]
+    ) -> NumberFormat:
+        """The unit given on the command line overrides the configured
+        one."""
+        number_format = EXACT
+        if options is not None:
+            number_format = NumberFormat(
+                options.get("precision"), options.get("decimals")
+            )
+            if unit is None:
+                unit = options.get("unit")
+        if unit is not None:
+            number_format = replace(number_format, unit=parse_length(unit))
+        return number_format
 
     @staticmethod
     def _compose_search_paths(
@@ -75,14 +166,83 @@ class EnvironmentFactory:
             searchpath = default
         return searchpath
 
-    def __init__(self, template_path: SearchPath, svg_path: SearchPath):
+    @staticmethod
+    def _configure_parse_cache(
+        cache: SvgParseCache, options: Optional[PGFGenOptions]
+    ) -> SvgParseCache:
+        if options is not None and (
+            "parse_cache_entries" in options or "parse_cache_source_bytes" in options
+        ):
+            cache.resize(
+                options.get("parse_cache_entries", cache.max_entries),
+                options.get("parse_cache_source_bytes", cache.max_source_bytes),
+            )
+        return cache
+
+    @staticmethod
+    def _create_code_cache(
+        directory: Optional[str], options: Optional[PGFGenOptions]
+    ) -> Optional[PgfCodeCache]:
+        max_bytes = CODE_CACHE_MAX_BYTES
+        if options is not None:
+            if directory is None:
+                directory = options.get("cache_dir")
+            max_bytes = options.get("cache_size", max_bytes)
+        if directory is None:
+            return None
+        return PgfCodeCache(directory, max_bytes)
+
+    def __init__(
+        self,
+        template_path: SearchPath,
+        svg_path: SearchPath,
+        parse_cache: Optional[SvgParseCache] = None,
+        code_cache: Optional[PgfCodeCache] = None,
+        tree_cache: Optional[SvgTreeCache] = None,
+        plan: bool = False,
+        jobs: Optional[int] = None,
+        optimize: bool = False,
+        detach: bool = False,
+        simplify: Optional[float] = None,
+        curve_tolerance: Optional[float] = None,
+        number_format: NumberFormat = EXACT,
+        intern_styles: bool = False,
+    ):
         self.template_path = template_path
         self.svg_path = svg_path
+        self.parse_cache = parse_cache
+        self.code_cache = code_cache
+        self.tree_cache = tree_cache
+        # whether to run the planning pass before rendering
+        self.plan = plan
+        # number of processes parsing SVG files in advance, None to parse
+        # files when loaded, 0 for as many processes as CPUs
+        self.jobs = jobs
+        # whether to optimize SVG documents before parsing them
+        self.optimize = optimize
+        # whether to detach parsed trees from svgelements objects
+        self.detach = detach
+        # tolerances of the simplification of geometry, None for none
+        self.simplify = simplify
+        self.curve_tolerance = curve_tolerance
+        # default format of numbers in generated code
+        self.number_format = number_format
+        # whether figures define shared style bundles as macros by default
+        self.intern_styles = intern_styles
 
     def get_environment(self) -> Environment:
+        loader = SvgFileLoader(self.svg_path, self.parse_cache)
+        loader.compute_digests = self.code_cache is not None
+        loader.tree_cache = self.tree_cache
+        loader.optimize = self.optimize
+        loader.detach = self.detach
+        loader.simplify = self.simplify
+        loader.curve_tolerance = self.curve_tolerance
         variables = {
-            "loadsvg": SvgFileLoader(self.svg_path),
-            "svgtopgf": SvgToPgf,
+            "loadsvg": loader,
+            "svgtopgf": SvgToPgfFactory(
+                self.code_cache, self.number_format, self.intern_styles
+            ),
         }
         env = Environment(
             block_start_string=BLOCK_START_STRING,
@@ -94,16 +254,152 @@ class EnvironmentFactory:
             trim_blocks=TRIM_BLOCKS,
             autoescape=AUTOESCAPE,
             loader=FileSystemLoader(self.template_path),
+            finalize=_finalize,
         )
+        env.template_class = PgfTemplate
         env.globals.update(variables)
         return env
 
+    def get_template(self, env: Environment, name: str) -> Template:
+        """Loads the template. If planning is enabled, analyzes it first and
+        configures the ``loadsvg`` loader of the environment accordingly.
+        With ``jobs``, SVG files known to be loaded are parsed in advance,
+        concurrently."""
+        template = env.get_template(name)
+        loader = env.globals.get("loadsvg")
+        if (self.plan or self.jobs is not None) and isinstance(loader, SvgFileLoader):
+            plan = TemplatePlanner(env).plan(name)
+            if self.plan:
+                loader.apply_plan(plan)
+            if self.jobs is not None:
+                loader.prefetch(plan.svg_files, self.jobs or None)
+        return template
+
+
+class PgfTemplate(Template):
+    """Template of environments created by EnvironmentFactory. Each render
+    has its own StyleRegistry, exposed as ``pgfgen_preamble`` and used by
+    figures of ``svgtopgf``, and its definitions replace the placeholder of
+    the preamble in the rendered text. Only render() does so, output of
+    generate() and stream() is written before all figures are known."""
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        registry = StyleRegistry()
+        variables = dict(*args, **kwargs)
+        variables["pgfgen_preamble"] = registry
+        svgtopgf = variables.get("svgtopgf", self.globals.get("svgtopgf"))
+        if isinstance(svgtopgf, SvgToPgfFactory):
+            variables["svgtopgf"] = svgtopgf.with_registry(registry)
+        return registry.expand(super().render(variables))
+
+
+def _finalize(value: Any) -> Any:
+    """Places the preamble of shared styles where the template prints it."""
+    if isinstance(value, StyleRegistry):
+        return value.place()
+    return value
+
 
 class SvgFileLoader:
-    def __init__(self, searchpath: Optional[SearchPath] = None):
+    """Loads SVG files found in search path. Parsed files are memoized in
+    a cache shared by all loaders, unless a dedicated one is provided.
+    Memoized trees are shared too, the same node is returned each time the
+    file is loaded with the same arguments (see SvgParseCache).
+
+    Files compressed with gzip are recognized and decompressed while being
+    parsed. A ``.svg`` file missing in a directory is looked for there as
+    ``.svgz``. Search path may contain zip archives in place of directories.
+
+    With ``streaming=True`` the file is not parsed up-front, instead a
+    StreamingSVG is returned, which converts the document piece by piece
+    when its code is requested.
+
+    With ``ids`` (a list of ids, or a single id) only the elements with
+    these ids, their subtrees and ancestors are loaded. Coordinates are
+    the same as of the full document, its bounding box is memoized. With
+    ``viewport=True`` the bounding box is the viewport declared by the
+    document instead, which doesn't need a pass over the document, but
+    keeps coordinates only of drawings filling their viewports (see
+    svg.selection).
+
+    A TemplatePlan may be applied with apply_plan(), then the planned files
+    are resolved in advance and loaded selectively, unless ids are given
+    explicitly.
+
+    With ``layers`` or ``exclude_layers`` (labels or ids of Inkscape layers)
+    layers which are not needed are pruned before the document is parsed
+    (see svg.layers).
+
+    With ``optimize=True`` (per loader or per call) documents are stripped of
+    data that has no effect on rendering before they are parsed (see
+    svg.optimizer), reports of the optimizer are kept in ``optimizations``.
+
+    With ``simplify`` (a tolerance in PGF units, per loader or per call)
+    vertices of paths, polylines and polygons which don't change the drawing
+    by more than the tolerance are removed after parsing, curves are
+    flattened only within ``curve_tolerance`` (see svg.simplifier). Reports
+    of the simplifier are kept in ``simplifications``.
+
+    With ``reify=False`` svgelements doesn't rewrite coordinates of shapes,
+    transforms of groups are applied by generators instead, together with
+    the svg2pgf transform, so each coordinate is transformed once.
+
+    With ``detach=True`` parsed trees are replaced with copies holding only
+    data used by generators (see svg.binary.detach), the svgelements
+    objects get released. Trees with elements that can't be detached (e.g.
+    unsupported shapes) are kept as they are, with a warning.
+
+    With a ``tree_cache``, parsed trees are stored on disk in a compact
+    binary format and restored from there, when the source is unchanged."""
+
+    def __init__(
+        self,
+        searchpath: Optional[SearchPath] = None,
+        cache: Optional[SvgParseCache] = None,
+    ):
         if searchpath is None:
             searchpath = SVG_PATH
+        if cache is None:
+            cache = default_parse_cache
         self.searchpath = searchpath
+        self.cache = cache
+        # whether to compute source digests, required by PgfCodeCache
+        self.compute_digests = False
+        # persistent cache of parsed trees, keyed by source digests
+        self.tree_cache: Optional[SvgTreeCache] = None
+        # bounding boxes of whole documents, used by selective loads, keyed
+        # by cache keys of the documents and the viewport argument
+        self.document_bboxes: dict[Hashable, Optional[BboxTuple]] = {}
+        # files resolved in advance and ids planned for selective loads
+        self.resolved: dict[str, str] = {}
+        self.planned_ids: dict[str, tuple[str, ...]] = {}
+        # trees parsed by prefetch(), not yet loaded
+        self.prefetched: dict[Hashable, SVGNode] = {}
+        # whether to optimize documents by default, and the reports
+        self.optimize = False
+        self.optimizations: dict[str, OptimizationReport] = {}
+        # whether to detach parsed trees from svgelements objects
+        self.detach = False
+        # tolerances of the simplifier by default, and the reports
+        self.simplify: Optional[float] = None
+        self.curve_tolerance: Optional[float] = None
+        self.simplifications: dict[str, SimplificationReport] = {}
+
+    def find(self, name: str) -> Optional[str]:
+        """Finds the file in search path, ``.svg`` files may be compressed
+        (``.svgz``)."""
+        return find_in_search_path(
+            self.searchpath, name, source_exists, variants=svg_variants
+        )
+
+    def apply_plan(self, plan: TemplatePlan) -> None:
+        for name in plan.svg_files:
+            file = self.find(name)
+            # files which can't be found are reported if the template loads
+            # them, they may be in branches which never run
+            if file is not None:
+                self.resolved[name] = file
+        self.planned_ids.update(plan.selections())
 
     def __call__(
         self,
@@ -116,12 +412,23 @@ class SvgFileLoader:
         transform: Optional[str | Matrix] = None,
         context: Optional[SupportsAppend] = None,
         parse_display_none: bool = False,
-    ) -> SVGNode:
-        file = find_in_search_path(self.searchpath, name)
+        streaming: bool = False,
+        ids: Optional[str | Iterable[str]] = None,
+        optimize: Optional[bool] = None,
+        layers: Optional[str | Iterable[str]] = None,
+        exclude_layers: Optional[str | Iterable[str]] = None,
+        simplify: Optional[float] = None,
+        curve_tolerance: Optional[float] = None,
+        viewport: bool = False,
+    ) -> SVGNode | StreamingSVG:
+        file = self.resolved.get(name) or self.find(name)
         if file is None:
             raise SvgFileNotFound(name)
-        return SVGNode.parse(
-            file,
+        if ids is None and not streaming:
+            # planned selections keep coordinates of full loads
+            ids = self.planned_ids.get(name)
+            viewport = False
+        parse_args = _parse_args(
             reify=reify,
             ppi=ppi,
             width=width,
@@ -131,17 +438,392 @@ class SvgFileLoader:
             context=context,
             parse_display_none=parse_display_none,
         )
+        selection = _names(ids)
+        if optimize is None:
+            optimize = self.optimize and not streaming
+        filters = _filters(
+            optimize,
+            _names(layers),
+            _names(exclude_layers),
+            self._tolerances(streaming, simplify, curve_tolerance),
+        )
+        if streaming:
+            return _streaming_svg(file, selection, filters, parse_args)
+        # parser arguments distinguishing cache entries and digests
+        cache_args = _cache_args(parse_args, selection, filters, viewport)
+        node = self._cached_tree(file, selection, filters, parse_args, cache_args)
+        if node.optimization is not None:
+            self.optimizations[name] = node.optimization
+        if node.simplification is not None:
+            self.simplifications[name] = node.simplification
+        if self.compute_digests and node.source_digest is None and context is None:
+            node.source_digest = source_digest(file, **cache_args)
+        return node
+
+    def _tolerances(
+        self,
+        streaming: bool,
+        simplify: Optional[float],
+        curve_tolerance: Optional[float],
+    ) -> Optional[tuple[float, Optional[float]]]:
+        """Tolerances of the simplifier, None if it's not run."""
+        if simplify is None and not streaming:
+            simplify = self.simplify
+        if curve_tolerance is None:
+            curve_tolerance = self.curve_tolerance
+        if simplify is None:
+            return None
+        return (simplify, curve_tolerance)
+
+    def _cached_tree(
+        self,
+        file: str,
+        selection: Optional[tuple[str, ...]],
+        filters: dict[str, Any],
+        parse_args: dict[str, Any],
+        cache_args: dict[str, Any],
+    ) -> SVGNode:
+        entry = self.cache.key(file, **cache_args)
+        (node, prefetched) = (None, None)
+        if entry is not None:
+            (key, size) = entry
+            # consumed even if the (possibly shared) cache has got the tree
+            prefetched = self.prefetched.pop(key, None)
+            node = self.cache.get(key)
+        if node is None:
+            node = prefetched
+            if node is None:
+                node = self._load_tree(
+                    file, selection, filters, parse_args, cache_args
+                )
+            if self.detach:
+                node = _detached(node, file)
+            if entry is not None:
+                self.cache.put(key, node, size)
+        return node
+
+    def _load_tree(
+        self,
+        file: str,
+        selection: Optional[tuple[str, ...]],
+        filters: dict[str, Any],
+        parse_args: dict[str, Any],
+        cache_args: dict[str, Any],
+    ) -> SVGNode:
+        digest = None
+        if self.tree_cache is not None and parse_args["context"] is None:
+            digest = source_digest(file, **cache_args)
+            key = self.tree_cache.key(digest)
+            node = self.tree_cache.get(key)
+            if node is not None:
+                node.source_digest = digest
+                return node
+        bbox = None
+        viewport = cache_args.get("viewport", False)
+        if selection is not None and not _filters_layers(filters):
+            bbox = self._document_bbox(file, parse_args, viewport)
+        node = _parse_file(file, selection, bbox, parse_args, filters, viewport)
+        if self.tree_cache is not None and digest is not None:
+            self.tree_cache.put(key, node)
+            node.source_digest = digest
+        return node
+
+    def _document_bbox(
+        self, file: str, parse_args: dict[str, Any], viewport: bool = False
+    ) -> Optional[BboxTuple]:
+        entry = self.cache.key(file, **parse_args)
+        if entry is not None and (entry[0], viewport) in self.document_bboxes:
+            return self.document_bboxes[(entry[0], viewport)]
+        bbox = find_document_bbox(file, None, viewport, **parse_args)
+        if entry is not None:
+            self.document_bboxes[(entry[0], viewport)] = bbox
+        return bbox
+
+    def prefetch(self, names: Iterable[str], jobs: Optional[int] = None) -> None:
+        """Parses files with given names concurrently, in a pool of (at most
+        ``jobs``) processes. Parsed trees are kept until the files are loaded
+        (with default arguments), planned ids are taken into account."""
+        # (file, selection, cache key, key of the document bbox)
+        requests: list[
+            tuple[str, Optional[tuple[str, ...]], Hashable, Hashable]
+        ] = []
+        parse_args = _parse_args()
+        tolerances = self._tolerances(False, None, None)
+        filters = _filters(self.optimize, simplify=tolerances)
+        for name in names:
+            file = self.resolved.get(name) or self.find(name)
+            if file is None:
+                continue  # reported when the template loads the file
+            selection = self.planned_ids.get(name)
+            cache_args = _cache_args(parse_args, selection, filters)
+            entry = self.cache.key(file, **cache_args)
+            bbox_entry = self.cache.key(file, **parse_args)
+            if entry is None or bbox_entry is None:
+                continue
+            if entry[0] in self.prefetched or entry[0] in self.cache:
+                continue
+            requests.append((file, selection, entry[0], bbox_entry[0]))
+        if len(requests) < 2 or jobs == 1:
+            return  # nothing to gain, files get parsed when loaded
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(
+                    _parse_file,
+                    file,
+                    selection,
+                    self.document_bboxes.get((bbox_key, False)),
+                    parse_args,
+                    filters,
+                    False,
+                )
+                for (file, selection, _, bbox_key) in requests
+            ]
+            for (file, selection, key, bbox_key), future in zip(requests, futures):
+                try:
+                    node = future.result()
+                except Exception:
+                    # leave it to the template, errors are reported there
+                    continue
+                self.prefetched[key] = node
+                if selection is not None:
+                    self.document_bboxes[(bbox_key, False)] = node.document_bbox
+
+
+def _parse_args(
+    reify: bool = True,
+    ppi: Optional[int] = DEFAULT_PPI,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    color: str | Color = "black",
+    transform: Optional[str | Matrix] = None,
+    context: Optional[SupportsAppend] = None,
+    parse_display_none: bool = False,
+) -> dict[str, Any]:
+    """Collects arguments of SVGNode.parse(), defaults are the same as of
+    SvgFileLoader.__call__()."""
+    return dict(
+        reify=reify,
+        ppi=ppi,
+        width=width,
+        height=height,
+        color=color,
+        transform=transform,
+        context=context,
+        parse_display_none=parse_display_none,
+    )
+
+
+def _names(names: Optional[str | Iterable[str]]) -> Optional[tuple[str, ...]]:
+    if names is None:
+        return None
+    return tuple(sorted({names} if isinstance(names, str) else set(names)))
+
+
+def _filters(
+    optimize: bool = False,
+    layers: Optional[tuple[str, ...]] = None,
+    exclude_layers: Optional[tuple[str, ...]] = None,
+    simplify: Optional[tuple[float, Optional[float]]] = None,
+) -> dict[str, Any]:
+    """Collects arguments of parse_filtered(), and the tolerances of the
+    simplifier, run on the parsed tree, only these which are not defaults,
+    so that no filters mean an empty dict."""
+    filters: dict[str, Any] = {}
+    if optimize:
+        filters["optimize"] = True
+    if layers is not None:
+        filters["layers"] = layers
+    if exclude_layers is not None:
+        filters["exclude_layers"] = exclude_layers
+    if simplify is not None:
+        filters["simplify"] = simplify
+    return filters
+
+
+def _filters_layers(filters: dict[str, Any]) -> bool:
+    return "layers" in filters or "exclude_layers" in filters
+
+
+def _cache_args(
+    parse_args: dict[str, Any],
+    selection: Optional[tuple[str, ...]],
+    filters: dict[str, Any],
+    viewport: bool = False,
+) -> dict[str, Any]:
+    """Parser arguments distinguishing cache entries and digests. The
+    ``viewport`` is the argument of parse_selection(), stored only if it's
+    not the default."""
+    cache_args = dict(parse_args)
+    if selection is not None:
+        cache_args["ids"] = selection
+        if viewport:
+            cache_args["viewport"] = True
+    cache_args.update(filters)
+    return cache_args
+
+
+def _parse_file(
+    file: str,
+    selection: Optional[tuple[str, ...]],
+    document_bbox: Optional[BboxTuple],
+    parse_args: dict[str, Any],
+    filters: Optional[dict[str, Any]] = None,
+    viewport: bool = False,
+) -> SVGNode:
+    # runs in worker processes too, the result gets pickled
+    filters = dict(filters or {})
+    tolerances = filters.pop("simplify", None)
+    node = _parse_filtered_file(
+        file, selection, document_bbox, parse_args, filters, viewport
+    )
+    if tolerances is not None:
+        node.simplification = simplify_tree(node, *tolerances)
+    return node
+
+
+def _parse_filtered_file(
+    file: str,
+    selection: Optional[tuple[str, ...]],
+    document_bbox: Optional[BboxTuple],
+    parse_args: dict[str, Any],
+    filters: dict[str, Any],
+    viewport: bool,
+) -> SVGNode:
+    if filters:
+        return parse_filtered(
+            file,
+            selection,
+            document_bbox=document_bbox,
+            viewport=viewport,
+            **filters,
+            **parse_args,
+        )
+    if selection is None:
+        return SVGNode.parse(file, **parse_args)
+    return parse_selection(file, selection, document_bbox, viewport, **parse_args)
+
+
+def _streaming_svg(
+    file: str,
+    selection: Optional[tuple[str, ...]],
+    filters: dict[str, Any],
+    parse_args: dict[str, Any],
+) -> StreamingSVG:
+    if selection is not None:
+        raise ValueError("ids are not supported when streaming")
+    if filters:
+        raise ValueError("filters are not supported when streaming")
+    return StreamingSVG(file, **parse_args)
+
+
+def _detached(node: SVGNode, file: str) -> SVGNode:
+    try:
+        return detach(node)
+    except ValueError as e:
+        # there are elements which can't be detached
+        warnings.warn(f"{file}: {e}, the parsed tree is kept", stacklevel=2)
+        return node
+
+
+def _cached_code(
+    cache: Optional[PgfCodeCache],
+    node: SVGElementNode,
+    indent: str,
+    fmt: NumberFormat,
+    intern_styles: bool,
+    fragment: Optional[str],
+    generate: Callable[[], str],
+) -> str:
+    if cache is None or not isinstance(node, SVGNode) or node.source_digest is None:
+        return generate()
+    key = cache.key(node.source_digest, indent, fragment, fmt, intern_styles)
+    code = cache.get(key)
+    if code is None:
+        code = generate()
+        cache.put(key, code)
+    return code
+
+
+def _code_cache(
+    cache: Optional[PgfCodeCache], registry: Optional[StyleRegistry]
+) -> Optional[PgfCodeCache]:
+    # code using the registry refers to names given during the render
+    return None if registry is not None and registry.placed else cache
 
 
 class SvgNamedFragments:
-    def __init__(self, node: SVGElementNode, indent: str = "  "):
-        self._nodes = {n.id: n for n in _svg_select_named_nodes(node)}
+    def __init__(
+        self,
+        node: SVGElementNode,
+        indent: str = "  ",
+        cache: Optional[PgfCodeCache] = None,
+        fmt: NumberFormat = EXACT,
+        intern_styles: bool = False,
+        registry: Optional[StyleRegistry] = None,
+    ):
+        self.node = node
         self.indent = indent
+        self.cache = cache
+        self.fmt = fmt
+        self.intern_styles = intern_styles
+        self.registry = registry
+        # named nodes, collected on first lookup (not needed when the code
+        # is cached), the last one of nodes sharing an id wins
+        self._nodes: Optional[dict[Optional[str], SVGElementNode]] = None
 
     def __getitem__(self, key: str) -> str:
-        generator = SvgToPgfGenerator(self.indent)
-        self._nodes[key].accept_visitor(generator)
-        return "\n".join(generator.lines)
+        return _cached_code(
+            _code_cache(self.cache, self.registry),
+            self.node,
+            self.indent,
+            self.fmt,
+            self.intern_styles,
+            key,
+            lambda: self._generate(key),
+        )
+
+    def _find(self, key: str) -> SVGElementNode:
+        if self._nodes is None:
+            self._nodes = {n.id: n for n in _svg_select_named_nodes(self.node)}
+        return self._nodes[key]
+
+    def _generate(self, key: str) -> str:
+        return _generated(
+            self._find(key), self.indent, self.fmt, self.intern_styles, self.registry
+        )
+
+
+def _write(
+    node: SVGElementNode,
+    stream: SupportsWrite,
+    indent: str,
+    fmt: NumberFormat,
+    intern_styles: bool = False,
+    registry: Optional[StyleRegistry] = None,
+) -> None:
+    """With ``intern_styles``, style bundles shared by graphic objects are
+    defined as macros in the outermost scope of the figure, after the scale
+    factor of stroke widths. Once the template has placed
+    the preamble of the ``registry``, all of them are defined there instead
+    (see svg.styles)."""
+    if registry is not None and not registry.placed:
+        registry = None
+    sink = TextSink(stream, indent, fmt)
+    if intern_styles or registry is not None:
+        sink.styles = collect_styles(node, fmt, registry)
+    node.accept_visitor(SvgToPgfGenerator(sink=sink))
+
+
+def _generated(
+    node: SVGElementNode,
+    indent: str,
+    fmt: NumberFormat,
+    intern_styles: bool = False,
+    registry: Optional[StyleRegistry] = None,
+) -> str:
+    buffer = io.StringIO()
+    _write(node, buffer, indent, fmt, intern_styles, registry)
+    return buffer.getvalue()
 
 
 def _svg_select_named_nodes(node: SVGElementNode) -> Iterator[SVGElementNode]:
@@ -160,23 +842,68 @@ class SvgToPgf:
     """Provides access to LaTeX/PGF drawing code and metadata generated out of
     a parsed SVG file. Attributes, that may be costly, get lazy-evaluated."""
 
-    def __init__(self, node: SVGElementNode, indent: str = "  "):
+    def __init__(
+        self,
+        node: SVGElementNode,
+        indent: str = "  ",
+        cache: Optional[PgfCodeCache] = None,
+        fmt: NumberFormat = EXACT,
+        intern_styles: bool = False,
+        registry: Optional[StyleRegistry] = None,
+    ):
         self.node = node
         self.indent = indent
+        self.cache = cache
+        self.fmt = fmt
+        self.intern_styles = intern_styles
+        self.registry = registry
         self.named_fragments: Optional[SvgNamedFragments] = None
 
     @property
     def code(self) -> str:
         """Whole drawing as LaTeX/PGF code."""
-        generator = SvgToPgfGenerator(self.indent)
-        self.node.accept_visitor(generator)
-        return "\n".join(generator.lines)
+        return _cached_code(
+            _code_cache(self.cache, self.registry),
+            self.node,
+            self.indent,
+            self.fmt,
+            self.intern_styles,
+            None,
+            self._generate,
+        )
+
+    def write(self, stream: SupportsWrite) -> None:
+        """Writes the whole drawing to a text stream, line by line, without
+        building the code in memory, unless it gets cached."""
+        if _code_cache(self.cache, self.registry) is None:
+            _write(
+                self.node,
+                stream,
+                self.indent,
+                self.fmt,
+                self.intern_styles,
+                self.registry,
+            )
+        else:
+            stream.write(self.code)
+
+    def _generate(self) -> str:
+        return _generated(
+            self.node, self.indent, self.fmt, self.intern_styles, self.registry
+        )
 
     @property
     def frags(self) -> SvgNamedFragments:
         """Parts of drawing resulted from named fragments fo SVG tree."""
         if self.named_fragments is None:
-            self.named_fragments = SvgNamedFragments(self.node, self.indent)
+            self.named_fragments = SvgNamedFragments(
+                self.node,
+                self.indent,
+                self.cache,
+                self.fmt,
+                self.intern_styles,
+                self.registry,
+            )
         return self.named_fragments
 
     @property
@@ -192,3 +919,90 @@ class SvgToPgf:
                 bbox = self.node.svg2pgf_bbox(bbox)
             bbox = NamedBbox(*bbox)
         return bbox
+
+
+class StreamingSvgToPgf:
+    """Counterpart of SvgToPgf for documents converted in streaming mode.
+    Named fragments are not available, as they would require the whole
+    document tree."""
+
+    def __init__(
+        self, source: StreamingSVG, indent: str = "  ", fmt: NumberFormat = EXACT
+    ):
+        self.source = source
+        self.indent = indent
+        self.fmt = fmt
+
+    @property
+    def code(self) -> str:
+        """Whole drawing as LaTeX/PGF code."""
+        return "\n".join(self.source.lines(self.indent, self.fmt))
+
+    def write(self, stream: SupportsWrite) -> None:
+        """Writes the whole drawing to a text stream, line by line."""
+        TextSink(stream).lines(self.source.lines(self.indent, self.fmt))
+
+    @property
+    def frags(self) -> SvgNamedFragments:
+        raise TypeError("named fragments are not available in streaming mode")
+
+    @property
+    def bbox(self) -> Optional[NamedBbox]:
+        """Bounding box for the whole drawing."""
+        bbox = self.source.svg_bbox
+        if bbox is None:
+            return None
+        return NamedBbox(*self.source.svg2pgf_bbox(bbox))
+
+
+class SvgToPgfFactory:
+    """Creates SvgToPgf objects sharing common settings. Exposed to
+    templates as ``svgtopgf``. Once the template has placed the preamble of
+    the ``registry``, figures generated afterwards use styles and colors
+    registered there."""
+
+    def __init__(
+        self,
+        cache: Optional[PgfCodeCache] = None,
+        fmt: NumberFormat = EXACT,
+        intern_styles: bool = False,
+        registry: Optional[StyleRegistry] = None,
+    ):
+        self.cache = cache
+        self.fmt = fmt
+        self.intern_styles = intern_styles
+        self.registry = registry
+
+    def __call__(
+        self,
+        node: SVGElementNode | StreamingSVG,
+        indent: str = "  ",
+        precision: Optional[int] = None,
+        decimals: Optional[int] = None,
+        intern_styles: Optional[bool] = None,
+        unit: Optional[str] = None,
+    ) -> SvgToPgf | StreamingSvgToPgf:
+        """Numbers are rounded to ``precision`` significant digits or to
+        ``decimals`` decimal places, by default as configured. With
+        ``intern_styles``, style bundles shared by elements are defined once
+        per figure, as macros. Streamed documents are written before they
+        are read entirely, so styles can't be interned there. With a
+        ``unit``, such as ``"1cm"``, coordinates are written as absolute
+        dimensions, the figure is then not affected by transformations of
+        the enclosing picture."""
+        fmt = self.fmt
+        if precision is not None or decimals is not None:
+            fmt = NumberFormat(precision, decimals, fmt.unit)
+        if unit is not None:
+            fmt = replace(fmt, unit=parse_length(unit))
+        if isinstance(node, StreamingSVG):
+            if intern_styles:
+                raise ValueError("styles can't be interned when streaming")
+            return StreamingSvgToPgf(node, indent, fmt)
+        if intern_styles is None:
+            intern_styles = self.intern_styles
+        return SvgToPgf(node, indent, self.cache, fmt, intern_styles, self.registry)
+
+    def with_registry(self, registry: Optional[StyleRegistry]) -> SvgToPgfFactory:
+        """A factory with the same settings, using the registry."""
+        return SvgToPgfFactory(self.cache, self.fmt, self.intern_styles, registry)
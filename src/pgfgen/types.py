@@ -20,8 +20,21 @@ BboxTuple = tuple[float, float, float, float]
 class PGFGenOptions(TypedDict, total=False):
     svg_path: SearchPath
     template_path: SearchPath
+    parse_cache_entries: int
+    parse_cache_source_bytes: int
+    cache_dir: str
+    cache_size: int
+    precision: int
+    decimals: int
+    intern_styles: bool
+    unit: str
 
 
 class SupportsAppend(Protocol):
     def append(self, value: Any) -> None:
         ...
+
+
+class SupportsWrite(Protocol):
+    def write(self, s: str) -> Any:
+        ...
@@ -8,6 +8,7 @@ from .exceptions import InvalidPath
 from .types import SearchPath
 
 from typing import Callable
+from typing import Iterable
 from typing import Optional
 
 
@@ -31,12 +32,27 @@ def find_in_search_path(
     search_path: SearchPath,
     path: str,
     predicate: Callable[[str], bool] = os.path.isfile,
+    variants: Callable[[str], Iterable[str]] = lambda name: (name,),
 ) -> Optional[str]:
+    """Finds the first file with given path in search path. Several variants
+    of the file name may be tried in each directory, see svg_variants()."""
     pieces = split_sanitize_path(path)
+    candidates = [pieces]
+    if pieces:
+        candidates = [pieces[:-1] + [name] for name in variants(pieces[-1])]
 
     for base in search_path:
-        filename = posixpath.join(base, *pieces)
+        for candidate in candidates:
+            filename = posixpath.join(base, *candidate)
 
-        if predicate(filename):
-            return filename
+            if predicate(filename):
+                return filename
     return None
+
+
+def svg_variants(name: str) -> tuple[str, ...]:
+    """Names an SVG file may be stored under, ``.svg`` files may be stored
+    compressed, as ``.svgz``."""
+    if name.endswith(".svg"):
+        return (name, name + "z")
+    return (name,)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import gzip
+import os
+import os.path
+import tempfile
+import zipfile
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.svg.archives import SvgArchive
+from pgfgen.svg.archives import close_archives
+from pgfgen.svg.archives import get_archive
+from pgfgen.svg.archives import split_member
+from pgfgen.svg.sources import open_source
+from pgfgen.svg.sources import source_exists
+from pgfgen.svg.sources import source_stat
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>'
+
+
+class TestSvgArchive(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "lib.zip")
+        with zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("a.svg", SVG)
+            z.writestr("dir/", b"")
+            z.writestr("dir/b.svgz", gzip.compress(SVG))
+            z.writestr("c.svg", SVG, compress_type=zipfile.ZIP_STORED)
+
+    def tearDown(self):
+        close_archives()
+        self.tmp.cleanup()
+
+    def test_index(self):
+        archive = SvgArchive(self.path)
+        self.assertEqual({"a.svg", "dir/b.svgz", "c.svg"}, set(archive.index))
+        self.assertIn("dir/b.svgz", archive)
+        self.assertNotIn("dir/", archive)
+        for member in ("a.svg", "c.svg"):
+            with archive.open(member) as fp:
+                self.assertEqual(SVG, fp.read())
+        self.assertEqual((archive.mtime_ns, len(SVG)), archive.stat("a.svg"))
+
+    def test_get_archive(self):
+        archive = get_archive(self.path)
+        self.assertIsInstance(archive, SvgArchive)
+        self.assertIs(archive, get_archive(self.path))
+        self.assertIsNone(get_archive(os.path.join(self.tmp.name, "none.zip")))
+        self.assertIsNone(get_archive(os.path.join(self.tmp.name, "a.svg")))
+
+    def test_close(self):
+        with SvgArchive(self.path) as archive:
+            with archive.open("c.svg") as fp:
+                self.assertEqual(SVG, fp.read())
+        self.assertTrue(archive.data.closed)
+        with self.assertRaises(ValueError):
+            archive.open("a.svg")
+
+    def test_reopened_when_modified(self):
+        archive = get_archive(self.path)
+        stat = os.stat(self.path)
+        with zipfile.ZipFile(self.path, "w") as z:
+            z.writestr("d.svg", SVG)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        reopened = get_archive(self.path)
+        self.assertIsNot(archive, reopened)
+        self.assertTrue(archive.data.closed)
+        self.assertEqual({"d.svg"}, set(reopened.index))
+        os.remove(self.path)
+        self.assertIsNone(get_archive(self.path))
+        self.assertTrue(reopened.data.closed)
+
+    def test_close_archives(self):
+        archive = get_archive(self.path)
+        close_archives()
+        self.assertTrue(archive.data.closed)
+        self.assertIsNot(archive, get_archive(self.path))
+
+    def test_split_member(self):
+        (archive, member) = split_member(self.path + "/dir/b.svgz")
+        self.assertEqual(self.path, archive.path)
+        self.assertEqual("dir/b.svgz", member)
+        self.assertIsNone(split_member(os.path.join(self.tmp.name, "a.svg")))
+
+    def test_sources(self):
+        self.assertTrue(source_exists(self.path + "/a.svg"))
+        self.assertFalse(source_exists(self.path + "/b.svg"))
+        self.assertEqual(len(SVG), source_stat(self.path + "/a.svg")[1])
+        with self.assertRaises(FileNotFoundError):
+            source_stat(self.path + "/b.svg")
+        for member in ("a.svg", "dir/b.svgz", "c.svg"):
+            with open_source(f"{self.path}/{member}") as fp:
+                self.assertEqual(SVG, fp.read())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import io
+import pickle
+import struct
+
+from unittest import TestCase
+from unittest import main
+from unittest.mock import patch
+
+from svgelements import SVG as SVGDocument
+from svgelements import Shape
+from svgelements import Text
+
+from pgfgen.svg import binary
+from pgfgen.svg.detached import DetachedElement
+from pgfgen.svg.nodes import PathNode
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     width="100" height="80" viewBox="0 0 50 40" id="svg">
+  <style>.r { fill: #ff0000; stroke-width: 2 }</style>
+  <defs><circle id="dot" r="3" style="fill:blue"/></defs>
+  <g id="g1" transform="translate(5,5)" style="stroke:black">
+    <rect id="r1" class="r" x="1" y="1" width="10" height="5"/>
+    <g id="g2" transform="scale(2)">
+      <path id="p1" d="M 0 0 L 5 5 Q 6 7 8 8 C 1 2 3 4 5 6 A 2 2 0 0 1 9 9 Z"/>
+      <use id="u1" xlink:href="#dot" x="3" y="3"/>
+    </g>
+    <ellipse id="e1" cx="20" cy="20" rx="4" ry="2"/>
+  </g>
+  <line id="l1" x1="0" y1="0" x2="40" y2="30" style="stroke:green"/>
+  <polyline id="pl" points="1,1 5,5 9,2"/>
+  <polygon id="pg" points="1,1 5,5 9,2" style="fill:none"/>
+</svg>
+"""
+
+# elements not supported by nodes
+TEXT = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10">
+  <title id="title">drawing</title>
+  <text id="text" x="1" y="1">text</text>
+  <g id="g"><image id="image" x="1" y="1" width="4" height="4" href="a.png"/></g>
+  <rect id="r" x="1" y="1" width="5" height="5"/>
+</svg>
+"""
+
+
+class CustomShape(Shape):
+    def segments(self, transformed=True):
+        return []
+
+
+def parse(svg: str) -> SVGNode:
+    return SVGNode.parse(io.BytesIO(svg.encode("utf-8")))
+
+
+class TestBinary(TestCase):
+    def setUp(self):
+        self.node = parse(SVG)
+        self.data = binary.dumps(self.node)
+
+    def test_header(self):
+        self.assertTrue(self.data.startswith(binary.MAGIC))
+        (_, version, _) = binary._HEADER.unpack_from(self.data)
+        self.assertEqual(binary.FORMAT_VERSION, version)
+
+    def test_round_trip(self):
+        restored = binary.loads(self.data)
+        self.assertIsInstance(restored, SVGNode)
+        (expected, actual) = (SvgToPgf(self.node), SvgToPgf(restored))
+        self.assertEqual(expected.code, actual.code)
+        self.assertEqual(expected.bbox, actual.bbox)
+        for key in ("g1", "r1", "p1", "u1", "e1", "l1", "pl", "pg"):
+            self.assertEqual(expected.frags[key], actual.frags[key])
+
+    def test_round_trip_is_stable(self):
+        self.assertEqual(self.data, binary.dumps(binary.loads(self.data)))
+
+    def test_tree(self):
+        restored = binary.loads(self.data)
+        self.assertEqual(
+            [c.id for c in self.node.children], [c.id for c in restored.children]
+        )
+        g2 = restored.children[0].children[1]
+        self.assertIs(restored.children[0], g2.parent)
+        path = g2.children[0]
+        self.assertIsInstance(path, PathNode)
+        self.assertEqual(
+            list(self.node.children[0].children[1].children[0].geometry.opcodes),
+            list(path.geometry.opcodes),
+        )
+
+    def test_no_parsing(self):
+        with patch("svgelements.SVG.parse") as parse:
+            SvgToPgf(binary.loads(self.data)).code
+            parse.assert_not_called()
+
+    def test_unsupported_elements(self):
+        node = parse(TEXT)
+        restored = binary.loads(binary.dumps(node))
+        (expected, actual) = (SvgToPgf(node), SvgToPgf(restored))
+        self.assertEqual(expected.code, actual.code)
+        self.assertEqual(expected.bbox, actual.bbox)
+        for key in ("title", "text", "g", "image"):
+            self.assertEqual(expected.frags[key], actual.frags[key])
+        self.assertIsInstance(restored.children[1].element, Text)
+        self.assertEqual("text", restored.children[1].id)
+
+    def test_unsupported_shape(self):
+        svg = SVGDocument()
+        svg.append(CustomShape())
+        with self.assertRaises(ValueError):
+            binary.dumps(SVGNode(svg))
+
+    def test_unknown_type(self):
+        data = binary.dumps(parse(TEXT)).replace(b"Text", b"Nope")
+        with self.assertRaisesRegex(ValueError, "Nope"):
+            binary.loads(data)
+
+    def test_unsupported_version(self):
+        data = bytearray(self.data)
+        struct.pack_into("<H", data, len(binary.MAGIC), binary.FORMAT_VERSION + 1)
+        with self.assertRaisesRegex(ValueError, "version"):
+            binary.loads(bytes(data))
+
+    def test_not_a_tree(self):
+        with self.assertRaises(ValueError):
+            binary.loads(b"<svg/>")
+
+    def test_truncated(self):
+        for size in (4, len(self.data) // 2, len(self.data) - 1):
+            with self.assertRaises(ValueError):
+                binary.loads(self.data[:size])
+
+
+class TestDetach(TestCase):
+    def setUp(self):
+        self.node = parse(SVG)
+        self.detached = binary.detach(self.node)
+
+    def test_same_code(self):
+        (expected, actual) = (SvgToPgf(self.node), SvgToPgf(self.detached))
+        self.assertEqual(expected.code, actual.code)
+        self.assertEqual(expected.bbox, actual.bbox)
+        for key in ("g1", "r1", "p1", "u1", "e1", "l1", "pl", "pg"):
+            self.assertEqual(expected.frags[key], actual.frags[key])
+
+    def test_values(self):
+        path = self.detached.children[0].children[1].children[0]
+        self.assertEqual("p1", path.id)
+        self.assertLessEqual(set(path.values), binary.DETACHED_VALUES)
+        self.assertNotIn("d", path.attributes)
+        self.assertIn("d", self.node.children[0].children[1].children[0].attributes)
+
+    def test_shared_data(self):
+        (pl, pg) = self.detached.children[2:4]
+        self.assertIs(pl.shape.stroke, pg.shape.stroke)
+        self.assertIs(pl.values["transform"], pg.values["transform"])
+
+    def test_source_data(self):
+        self.node.source_digest = "digest"
+        self.node.svg2pgf_transform
+        detached = binary.detach(self.node)
+        self.assertEqual("digest", detached.source_digest)
+        self.assertEqual(self.node.svg2pgf_transform, detached.svg2pgf_transform)
+
+    def test_unsupported_elements(self):
+        node = parse(TEXT)
+        detached = binary.detach(node)
+        self.assertEqual(SvgToPgf(node).code, SvgToPgf(detached).code)
+        self.assertIsInstance(detached.children[1].element, DetachedElement)
+        copy = pickle.loads(pickle.dumps(detached))
+        self.assertEqual(SvgToPgf(node).code, SvgToPgf(copy).code)
+        self.assertIsInstance(copy.children[1].element, DetachedElement)
+        # detached trees are detached again as they are
+        self.assertEqual(
+            binary.dumps(detached), binary.dumps(binary.detach(detached))
+        )
+
+
+if __name__ == "__main__":
+    main()
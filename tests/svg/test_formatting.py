@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import io
+import re
+
+from unittest import TestCase
+from unittest import main
+from unittest.mock import patch
+
+import numpy
+
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.formatting import EXACT
+from pgfgen.svg.formatting import NUMPY_MIN_NUMBERS
+from pgfgen.svg.formatting import NumberFormat
+from pgfgen.svg.formatting import parse_length
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="30" height="20"
+     viewBox="0 0 90 60">
+  <g transform="rotate(17)">
+    <path stroke="black" stroke-width="0.3" stroke-dasharray="1.1 0.7"
+          d="M 0.1 0.2 L 5.3 5.7 Q 6.1 0.3 8.9 2.2 A 3 2 20 0 1 15 6 Z"/>
+    <polygon points="1 1 4.4 1.1 4.2 3.3"/>
+    <rect x="10" y="10" width="3.3" height="7.1" transform="skewX(3)"/>
+    <circle cx="40" cy="30" r="7.7" stroke-miterlimit="4.5"/>
+  </g>
+</svg>
+"""
+
+NUMBER = re.compile(r"-?\d[-\d.e]*(?=[}*])")
+
+
+def numbers(code: str) -> list[str]:
+    """Numbers in the code, comments (which show transforms) and the unit
+    vector of the scale factor, always exact, are skipped."""
+    return NUMBER.findall(re.sub(r"%.*|\\pgf@process.*", "", code))
+
+
+class TestNumberFormat(TestCase):
+    def test_exact(self):
+        self.assertEqual("0.30000000000000004", EXACT.number(0.1 + 0.2))
+        self.assertEqual("0.5", EXACT.number(numpy.float64(0.5)))
+        self.assertEqual("0", EXACT.number(0))
+        self.assertEqual("-0.0", EXACT.number(-0.0))
+        self.assertEqual("1e-16", EXACT.number(1e-16))
+
+    def test_precision(self):
+        fmt = NumberFormat(precision=4)
+        for (x, expected) in (
+            (0.1 + 0.2, "0.3"),
+            (123.456789, "123.5"),
+            (-0.012345678, "-0.01235"),
+            (12345.678, "12346"),
+            (2.0, "2"),
+            (0, "0"),
+            (-0.0000001, "0"),
+            (1e-16, "0"),
+        ):
+            with self.subTest(x=x):
+                self.assertEqual(expected, fmt.number(x))
+
+    def test_decimals(self):
+        fmt = NumberFormat(decimals=2)
+        for (x, expected) in (
+            (1.25, "1.25"),
+            (-1.5, "-1.5"),
+            (100.0, "100"),
+            (-0.001, "0"),
+        ):
+            with self.subTest(x=x):
+                self.assertEqual(expected, fmt.number(x))
+        self.assertEqual("120", NumberFormat(decimals=0).number(120.4))
+
+    def test_tex_limits(self):
+        for fmt in (NumberFormat(precision=3), NumberFormat(decimals=3)):
+            self.assertEqual("-16383", fmt.number(-16383.4)[:6])
+            for x in (16384.0, -16383.9999999, -1e20, float("nan"), float("inf")):
+                with self.subTest(fmt=fmt, x=x):
+                    with self.assertRaises(ValueError):
+                        fmt.number(x)
+                    with self.assertRaises(ValueError):
+                        fmt.numbers([0.0] * NUMPY_MIN_NUMBERS + [x])
+
+    def test_invalid(self):
+        for kwargs in (
+            {"precision": 0},
+            {"decimals": 6},
+            {"precision": 1, "decimals": 1},
+            {"unit": 0.0},
+            {"unit": -1.0},
+            {"unit": float("inf")},
+        ):
+            with self.subTest(**kwargs):
+                with self.assertRaises(ValueError):
+                    NumberFormat(**kwargs)
+
+    def test_batch(self):
+        values = [(-1) ** i * 7.3 ** (i - 10) for i in range(15)] * NUMPY_MIN_NUMBERS
+        values.append(0.0)
+        for fmt in (NumberFormat(precision=5), NumberFormat(decimals=3)):
+            with self.subTest(fmt=fmt):
+                expected = [fmt.number(x) for x in values]
+                self.assertEqual(expected, fmt.numbers(values))
+                self.assertEqual(expected, fmt.numbers(numpy.array(values)))
+                with patch("pgfgen.svg.formatting.numpy", None):
+                    self.assertEqual(expected, fmt.numbers(values))
+
+    def test_unit(self):
+        fmt = NumberFormat(unit=2.0)
+        self.assertEqual(r"\pgfqpoint{3pt}{-0.5pt}", fmt.point(1.5, -0.25))
+        self.assertEqual(("{0pt}{2pt}", "{4pt}{6pt}"), fmt.pairs((0, 1, 2, 3)))
+        self.assertEqual(["0.2pt", "0pt"], fmt.lengths((0.1, 1e-16)))
+        # plain numbers are rounded, but not scaled
+        self.assertEqual("0.33333", fmt.number(1 / 3))
+        fmt = NumberFormat(decimals=1, unit=2.0)
+        self.assertEqual(r"\pgfqpoint{0.7pt}{0pt}", fmt.point(1 / 3, 0))
+        self.assertEqual(r"\pgfpointxy{1}{2}", NumberFormat(decimals=1).point(1, 2))
+
+    def test_parse_length(self):
+        for (length, expected) in (
+            ("1pt", 1.0),
+            ("72.27pt", 72.27),
+            ("1in", 72.27),
+            (" 2.54 cm ", 72.27),
+            (".5pc", 6.0),
+            ("65536sp", 1.0),
+        ):
+            with self.subTest(length=length):
+                self.assertAlmostEqual(expected, parse_length(length))
+        for length in ("1", "cm", "-1cm", "1em", "1e2pt", "1 c m"):
+            with self.subTest(length=length):
+                with self.assertRaises(ValueError):
+                    parse_length(length)
+
+
+class TestGeneratedNumbers(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.StringIO(SVG))
+        self.exact = numbers(SvgToPgf(self.node).code)
+
+    def test_precision(self):
+        code = SvgToPgf(self.node, fmt=NumberFormat(precision=4)).code
+        rounded = numbers(code)
+        self.assertEqual(len(self.exact), len(rounded))
+        self.assertLess(len(code), len(SvgToPgf(self.node).code))
+        for (x, y) in zip(self.exact, rounded):
+            self.assertNotIn("e", y)
+            self.assertAlmostEqual(float(x), float(y), delta=abs(float(x)) * 1e-3)
+
+    def test_decimals(self):
+        code = SvgToPgf(self.node, fmt=NumberFormat(decimals=3)).code
+        rounded = numbers(code)
+        self.assertEqual(len(self.exact), len(rounded))
+        for (x, y) in zip(self.exact, rounded):
+            self.assertLessEqual(len(y.partition(".")[2]), 3)
+            self.assertAlmostEqual(float(x), float(y), delta=0.0005)
+
+    def test_unit(self):
+        fmt = NumberFormat(unit=parse_length("1cm"))
+        code = SvgToPgf(self.node, fmt=fmt).code
+        self.assertNotIn(r"\pgfpointxy", code)
+        self.assertNotIn(r"\pgfgen@scale", code)
+        self.assertEqual(2, code.count(r"\pgfpathmoveto{\pgfqpoint{"))
+        self.assertEqual(3, code.count(r"\pgfpathlineto{\pgfqpoint{"))
+        self.assertIn(r"\pgfsetdash{{1.3078pt}{0.83224pt}}{0pt}", code)
+        # quick commands would ignore the transformation of the figure
+        self.assertIsNone(re.search(r"\\pgfpathq(moveto|lineto|curveto)", code))
+        self.assertNotIn(r"\pgf@protocolsizes", code)
+        # coordinates are the ones in PGF units, times the unit
+        exact = [
+            float(x)
+            for line in SvgToPgf(self.node).code.splitlines()
+            if r"\pgfpathlineto" in line
+            for x in numbers(line)
+        ]
+        absolute = [
+            float(x)
+            for line in code.splitlines()
+            if r"\pgfpathlineto" in line
+            for x in re.findall(r"\{(-?[\d.]+)pt\}", line)
+        ]
+        self.assertEqual(len(exact), len(absolute))
+        for (x, y) in zip(exact, absolute):
+            self.assertAlmostEqual(x * fmt.unit, y, delta=0.000005)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import io
+import re
+
+from unittest import TestCase
+from unittest import main
+
+from svgelements import Matrix
+
+from pgfgen.svg.binary import dumps
+from pgfgen.svg.binary import loads
+from pgfgen.svg.formatting import NumberFormat
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="40" height="30"
+     viewBox="0 0 80 60">
+  <g transform="translate(10 5) rotate(30)">
+    <g transform="scale(2 1.5) skewX(10)">
+      <path id="p" stroke="black" stroke-dasharray="2 1" stroke-dashoffset="1"
+            d="M 0 0 L 5 5 Q 6 0 8 2 C 9 3 10 1 12 4 A 3 2 20 0 1 15 6 Z"/>
+      <polyline id="pl" points="0 0 3 4 6 1"/>
+      <circle id="c" cx="3" cy="2" r="10"/>
+    </g>
+    <g transform="matrix(1 0 0 -1 4 20)">
+      <polygon id="pg" points="1 1 4 1 4 3"/>
+      <path id="a" d="M 2 2 A 4 3 15 1 0 7 5"/>
+      <ellipse id="e" cx="1" cy="2" rx="3" ry="1"/>
+    </g>
+  </g>
+  <g transform="translate(3 4) scale(2 1.5)">
+    <circle id="c2" cx="3" cy="2" r="10"/>
+    <ellipse id="e2" cx="1" cy="2" rx="3" ry="1"/>
+  </g>
+  <path id="plain" d="M 1 1 L 7 3"/>
+</svg>
+"""
+
+NUMBER = re.compile(r"-?\d+(?:\.\d*)?(?:e-?\d+)?")
+COMMENT = re.compile(r"%.*")
+
+
+def numbers(code: str) -> list[float]:
+    """Numbers in the code, comments (which show transforms) are skipped."""
+    return [float(x) for x in NUMBER.findall(COMMENT.sub("", code))]
+
+
+class TestNonReifiedTransforms(TestCase):
+    def setUp(self):
+        self.reified = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")))
+        self.plain = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")), reify=False)
+
+    def assertSameGeometry(self, first: str, second: str):
+        (x, y) = (numbers(first), numbers(second))
+        self.assertEqual(len(x), len(y))
+        for a, b in zip(x, y):
+            self.assertAlmostEqual(a, b, places=9)
+
+    def test_reified_flag(self):
+        self.assertTrue(self.reified.reified)
+        self.assertFalse(self.plain.reified)
+        path = self.plain.children[0].children[0].children[0]
+        self.assertFalse(path.reified)
+        self.assertFalse(path.shape.transform.is_identity())
+
+    def test_same_code(self):
+        self.assertEqual(self.reified.svg_bbox(), self.plain.svg_bbox())
+        pgf = (SvgToPgf(self.reified), SvgToPgf(self.plain))
+        for id in ("p", "pl", "c", "pg", "a", "e", "c2", "e2", "plain"):
+            with self.subTest(id=id):
+                self.assertSameGeometry(pgf[0].frags[id], pgf[1].frags[id])
+
+    def test_dash_scaled_by_cumulative_transform(self):
+        path = self.plain.children[0].children[0].children[0]
+        self.assertEqual([2.0, 1.0], path.stroke_dasharray)
+        expected = self.reified.children[0].children[0].children[0]
+        for a, b in zip(
+            expected.implicit_stroke_dasharray, path.implicit_stroke_dasharray
+        ):
+            self.assertAlmostEqual(a, b)
+        self.assertAlmostEqual(
+            expected.implicit_stroke_dashoffset, path.implicit_stroke_dashoffset
+        )
+
+    def test_segment_nodes(self):
+        path = self.plain.children[0].children[0].children[0]
+        reified = self.reified.children[0].children[0].children[0]
+        for a, b in zip(
+            reified.children_path_segment_nodes, path.children_path_segment_nodes
+        ):
+            self.assertEqual(
+                reified.local2pgf_transform.point_in_matrix_space(a.segment.end),
+                path.local2pgf_transform.point_in_matrix_space(b.segment.end),
+            )
+
+    def test_transform_computed_once_per_shape(self):
+        path = self.plain.children[0].children[0].children[0]
+        local2pgf = path.local2pgf_transform
+        self.assertIs(local2pgf, path.local2pgf_transform)
+        for segment in path.children_path_segment_nodes:
+            self.assertIs(local2pgf, segment.local2pgf_transform)
+        # recomputed for a replaced svg2pgf transform
+        self.plain.svg2pgf_transform = Matrix.scale(2)
+        self.assertEqual(
+            path.shape.transform * Matrix.scale(2), path.local2pgf_transform
+        )
+
+    def test_binary_roundtrip(self):
+        node = loads(dumps(self.plain))
+        self.assertFalse(node.reified)
+        self.assertEqual(SvgToPgf(self.plain).code, SvgToPgf(node).code)
+
+
+class TestScaleFactor(TestCase):
+    COMPUTE = r"\pgfmathsetlength\pgfgen@scale{\pgfmathresult}"
+    USE = r"*\pgfgen@scale}"
+
+    def setUp(self):
+        self.pgf = SvgToPgf(SVGNode.parse(io.BytesIO(SVG.encode("utf-8"))))
+
+    def assertComputedBeforeUse(self, code: str):
+        self.assertEqual(1, code.count(self.COMPUTE))
+        self.assertIn(self.USE, code)
+        self.assertLess(code.index(self.COMPUTE), code.index(self.USE))
+
+    def test_computed_once_per_figure(self):
+        code = self.pgf.code
+        self.assertComputedBeforeUse(code)
+        # in the scope of the document, before scopes of its children
+        self.assertTrue(code.startswith(r"\begin{pgfscope} % <svg"))
+        self.assertIn("\n  " + self.COMPUTE, code)
+        self.assertLess(code.index(self.COMPUTE), code.index("\n  \\begin{pgfscope}"))
+        self.assertNotIn(r"\pgf@xa", code)
+
+    def test_unit_vector_exact(self):
+        for fmt in (NumberFormat(decimals=0), NumberFormat(precision=1)):
+            with self.subTest(fmt=fmt):
+                code = SvgToPgf(self.pgf.node, fmt=fmt).code
+                self.assertIn(
+                    r"\pgf@process{\pgfpointxy"
+                    "{0.7071067811865475}{0.7071067811865475}}",
+                    code,
+                )
+
+    def test_computed_in_fragment_scope(self):
+        # vectors of the xy-coordinate system may be set anew in the scope
+        # the fragment gets placed in, the factor is computed there
+        for id in ("p", "plain"):
+            with self.subTest(id=id):
+                code = "\n".join(
+                    [
+                        r"\begin{pgfscope}",
+                        r"\pgfsetxvec{\pgfpoint{2cm}{0cm}}",
+                        self.pgf.frags[id],
+                        r"\end{pgfscope}",
+                    ]
+                )
+                self.assertComputedBeforeUse(code)
+                self.assertLess(
+                    code.index(r"\pgfsetxvec"), code.index(self.COMPUTE)
+                )
+
+
+if __name__ == "__main__":
+    main()
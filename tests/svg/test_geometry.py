@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import io
+
+from unittest import TestCase
+from unittest import main
+from unittest.mock import patch
+
+from svgelements import Arc
+from svgelements import Matrix
+from svgelements import Path
+from svgelements import Point
+
+from pgfgen.svg.detached import DetachedPath
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.geometry import ARC
+from pgfgen.svg.geometry import CLOSE
+from pgfgen.svg.geometry import CUBIC
+from pgfgen.svg.geometry import LINE
+from pgfgen.svg.geometry import MOVE
+from pgfgen.svg.geometry import QUAD
+from pgfgen.svg.geometry import NUMPY_MIN_COORDS
+from pgfgen.svg.geometry import PathGeometry
+from pgfgen.svg.geometry import transform_coords
+from pgfgen.svg.generator import GeneratorNodeVisitor
+from pgfgen.svg.generator import PathGenerator
+from pgfgen.svg.binary import detach
+from pgfgen.templating import SvgToPgf
+
+PATHS = [
+    "M 0 0 L 5 5 Q 6 7 8 8 C 1 2 3 4 5 6 A 2 2 0 0 1 9 9 Z",
+    "m1,2 3,4 h5 v-3 H2 V7 z l1 1 s1 2 3 4 t5 6 q1 1 2 2 t3 3 c1,2,3,4,5,6 S7 8 9 10",
+    "M10 10a5 3 30 1 0 10 10a2,2 0 01.5.5 m-3-3l.5.5.5-.5e1Z",
+    "M0,0 Q1,1 2,0 S 3,3 4,0 C 5,5 6,5 7,0 T 8 8",
+]
+
+
+class TestPathGeometry(TestCase):
+    def test_append(self):
+        geometry = PathGeometry()
+        geometry.append(MOVE, 1.0, 2.0)
+        geometry.append(QUAD, 1.0, 2.0, 3.0, 4.0)
+        geometry.append(CLOSE)
+        self.assertEqual(3, len(geometry))
+        self.assertEqual([MOVE, QUAD, CLOSE], list(geometry.opcodes))
+        self.assertEqual([1.0, 2.0, 1.0, 2.0, 3.0, 4.0], list(geometry.coords))
+
+    def test_from_path(self):
+        geometry = PathGeometry.from_path(Path("M 0 0 L 1 2 C 1 2 3 4 5 6 z"))
+        self.assertEqual([MOVE, LINE, CUBIC, CLOSE], list(geometry.opcodes))
+        self.assertEqual(
+            [0.0, 0.0, 1.0, 2.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0], list(geometry.coords)
+        )
+
+    def test_arc(self):
+        geometry = PathGeometry.from_path(Path("M 0 0 A 2 2 0 0 1 4 0"))
+        self.assertEqual([MOVE, ARC], list(geometry.opcodes))
+        self.assertEqual(13, len(geometry.coords))
+
+    def test_segments_roundtrip(self):
+        for d in PATHS:
+            with self.subTest(d=d):
+                path = Path(d)
+                segments = list(PathGeometry.from_path(path).segments())
+                self.assertEqual(list(path), segments)
+                self.assertEqual(
+                    [type(s) for s in path], [type(s) for s in segments]
+                )
+
+    def test_from_d_matches_svgelements(self):
+        matrix = Matrix("translate(3,4) scale(2,-1.5) rotate(17)")
+        for d in PATHS:
+            for m in (None, matrix):
+                with self.subTest(d=d, matrix=m):
+                    path = Path(d)
+                    if m is not None:
+                        path *= m
+                        path.reify()
+                    self.assertEqual(
+                        PathGeometry.from_path(path), PathGeometry.from_d(d, m)
+                    )
+
+    def test_from_d_arc_segment(self):
+        geometry = PathGeometry.from_d("M 0 0 A 2 2 0 0 1 4 0")
+        self.assertIsInstance(list(geometry.segments())[1], Arc)
+
+    def test_from_d_errors(self):
+        for d in ("L 1 1", "M 1", "M 0 0 A 1 1 0 2 0 1 1", "M 0 0 X"):
+            with self.subTest(d=d):
+                with self.assertRaises(ValueError):
+                    PathGeometry.from_d(d)
+
+
+class TestPathNodeGeometry(TestCase):
+    SVG = (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="40" height="20"'
+        ' viewBox="0 0 20 10"><g transform="rotate(30) translate(1,2)">%s</g></svg>'
+    )
+
+    def parse(self, **kwargs) -> SVGNode:
+        paths = "".join(f'<path d="{d}"/>' for d in PATHS)
+        return SVGNode.parse(io.StringIO(self.SVG % paths), **kwargs)
+
+    def test_parsed_from_path_data(self):
+        for reify in (True, False):
+            with self.subTest(reify=reify):
+                args = {"reify": reify, "transform": "scale(2)"}
+                expected = [
+                    PathGeometry.from_path(path.path)
+                    for path in self.parse(**args).children[0].children
+                ]
+                node = self.parse(**args)
+                with patch.object(PathGeometry, "from_path") as from_path:
+                    geometries = [p.geometry for p in node.children[0].children]
+                from_path.assert_not_called()
+                self.assertEqual(expected, geometries)
+
+    def test_path_kept(self):
+        node = self.parse()
+        paths = node.children[0].children
+        expected = [(path.path.d(), len(path.path)) for path in paths]
+        SvgToPgf(node).code
+        for (path, (d, n)) in zip(paths, expected):
+            self.assertIs(Path, type(path.path))
+            self.assertEqual((d, n), (path.path.d(), len(path.path)))
+        # detached trees release segments
+        for path in detach(node).children[0].children:
+            self.assertIsInstance(path.path, DetachedPath)
+            self.assertEqual(0, len(path.path))
+
+    def test_malformed_path_data(self):
+        # svgelements keeps what precedes an error
+        node = SVGNode.parse(io.StringIO(self.SVG % '<path d="M 0 0 L 1 1 X"/>'))
+        path = node.children[0].children[0]
+        self.assertEqual([MOVE, LINE], list(path.geometry.opcodes))
+
+
+class TestPathGenerator(TestCase):
+    def test_segments_match_node_view(self):
+        svg = '<svg xmlns="http://www.w3.org/2000/svg" width="20" height="20">%s</svg>'
+        paths = "".join(f'<path d="{d}"/>' for d in PATHS)
+        node = SVGNode.parse(io.StringIO(svg % paths))
+        for path in node.children:
+            visitor = GeneratorNodeVisitor()
+            for segment in path.children_path_segment_nodes:
+                segment.accept_visitor(visitor)
+            self.assertEqual(visitor.lines, PathGenerator(path).generate_segments())
+
+
+class TestTransformCoords(TestCase):
+    def setUp(self):
+        self.m = Matrix(0.3, -1.7, 2.1, 0.9, 11.5, -3.25)
+        self.coords = [i * 0.37 - 5 for i in range(2 * NUMPY_MIN_COORDS)]
+        self.expected = [
+            u
+            for (x, y) in zip(self.coords[::2], self.coords[1::2])
+            for u in self.m.point_in_matrix_space(Point(x, y))
+        ]
+
+    def test_batched(self):
+        transformed = transform_coords(self.coords, self.m)
+        self.assertEqual(self.expected, transformed)
+        self.assertEqual({float}, {type(u) for u in transformed})
+
+    def test_fallback(self):
+        with patch("pgfgen.svg.geometry.numpy", None):
+            self.assertEqual(self.expected, transform_coords(self.coords, self.m))
+        self.assertEqual(self.expected[:4], transform_coords(self.coords[:4], self.m))
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import io
+import os.path
+import tempfile
+import xml.etree.ElementTree as ET
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.cache import SvgParseCache
+from pgfgen.svg.layers import INKSCAPE_LABEL
+from pgfgen.svg.layers import filter_layers
+from pgfgen.svg.layers import is_layer
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.prefilter import parse_filtered
+from pgfgen.templating import SvgFileLoader
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="40" height="40" id="svg">
+  <rect id="frame" x="0" y="0" width="40" height="40"/>
+  <g id="layer1" inkscape:label="Base" inkscape:groupmode="layer">
+    <rect id="r" x="1" y="1" width="2" height="2"/>
+    <use id="u" xlink:href="#dot"/>
+    <g id="layer3" inkscape:label="Details" inkscape:groupmode="layer">
+      <rect id="d" x="5" y="5" width="2" height="2"/>
+    </g>
+  </g>
+  <g id="layer2" inkscape:label="Annotations" inkscape:groupmode="layer">
+    <defs><style>.a { fill: red }</style></defs>
+    <circle id="dot" cx="20" cy="20" r="1"/>
+    <circle id="c" class="a" cx="30" cy="30" r="1"/>
+  </g>
+</svg>
+"""
+
+
+def layer_labels(root: ET.Element) -> list[str]:
+    return [e.get(INKSCAPE_LABEL) for e in root.iter() if is_layer(e)]
+
+
+def ids(root: ET.Element) -> set[str]:
+    return {e.get("id") for e in root.iter() if e.get("id") is not None}
+
+
+class TestFilterLayers(TestCase):
+    def setUp(self):
+        self.root = ET.fromstring(SVG)
+
+    def test_no_filters(self):
+        self.assertEqual(0, filter_layers(self.root))
+        self.assertEqual(["Base", "Details", "Annotations"], layer_labels(self.root))
+
+    def test_layers(self):
+        self.assertEqual(1, filter_layers(self.root, layers=["Base"]))
+        self.assertEqual(["Base", "Details"], layer_labels(self.root))
+        # referenced by the kept layer, moved to defs with the style
+        self.assertEqual(
+            {"svg", "frame", "layer1", "r", "u", "layer3", "d", "dot"},
+            ids(self.root),
+        )
+        self.assertIsNotNone(self.root.find("{*}defs/{*}defs/{*}style"))
+        self.assertIsNotNone(self.root.find("{*}defs/{*}circle[@id='dot']"))
+
+    def test_sublayer(self):
+        self.assertEqual(1, filter_layers(self.root, layers=["layer3"]))
+        self.assertEqual(["Base", "Details"], layer_labels(self.root))
+
+    def test_exclude_layers(self):
+        self.assertEqual(1, filter_layers(self.root, exclude_layers=["Details"]))
+        self.assertEqual(["Base", "Annotations"], layer_labels(self.root))
+        self.assertNotIn("d", ids(self.root))
+
+    def test_layers_and_exclude_layers(self):
+        filter_layers(self.root, layers=["Base"], exclude_layers=["Details"])
+        self.assertEqual(["Base"], layer_labels(self.root))
+
+
+class TestParseFilteredLayers(TestCase):
+    def setUp(self):
+        self.source = io.BytesIO(SVG.encode("utf-8"))
+        self.expected = SvgToPgf(SVGNode.parse(io.BytesIO(SVG.encode("utf-8"))))
+
+    def test_parse(self):
+        pgf = SvgToPgf(parse_filtered(self.source, exclude_layers=["Annotations"]))
+        for key in ("r", "u", "layer3"):
+            self.assertEqual(self.expected.frags[key], pgf.frags[key])
+        with self.assertRaises(KeyError):
+            pgf.frags["c"]
+
+    def test_parse_selection(self):
+        node = parse_filtered(self.source, ids=["d"], layers=["Details"])
+        self.assertEqual(["layer1"], [c.id for c in node.children])
+        self.assertEqual((0.0, 0.0, 40.0, 40.0), node.svg_bbox())
+
+
+class TestSvgFileLoaderLayers(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as f:
+            f.write(SVG)
+        self.loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_layers(self):
+        node = self.loader("a.svg", layers="Base")
+        self.assertEqual(["frame", "layer1"], [c.id for c in node.children])
+        self.assertIs(node, self.loader("a.svg", layers=["Base"]))
+        self.assertIsNot(node, self.loader("a.svg", exclude_layers=["Base"]))
+        self.assertIsNot(node, self.loader("a.svg"))
+
+    def test_layers_with_ids(self):
+        node = self.loader("a.svg", ids=["r"], exclude_layers=["Annotations"])
+        self.assertEqual(["layer1"], [c.id for c in node.children])
+        # coordinates of the drawing with the remaining layers
+        self.assertEqual((0.0, 0.0, 40.0, 40.0), node.svg_bbox())
+
+    def test_streaming(self):
+        with self.assertRaises(ValueError):
+            self.loader("a.svg", streaming=True, layers=["Base"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import gc
+import io
+import pickle
+import weakref
+
+from unittest import TestCase
+from unittest import main
+from unittest.mock import patch
+
+from svgelements import Group
+from svgelements import Matrix
+from svgelements import Path
+from svgelements import SVG as SVGDocument
+
+from pgfgen.svg.nodes import GroupNode
+from pgfgen.svg.nodes import PathNode
+from pgfgen.svg.nodes import SVGElementNodeFactory
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.nodes import UseNode
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink" width="20" height="20">
+  <defs><circle id="dot" r="1"/></defs>
+  <g id="a"><rect id="r" x="1" y="1" width="2" height="2"/></g>
+  <g id="b"><path id="p" d="M 0 0 L 5 5 L 5 0 Z"/></g>
+  <use id="u" xlink:href="#dot" x="3" y="3"/>
+</svg>
+"""
+
+
+class TestLazyChildren(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")))
+
+    def test_group_children_built_on_first_access(self):
+        self.assertIsNone(self.node._children_element_nodes)
+        children = self.node.children
+        self.assertEqual(["a", "b", "u"], [c.id for c in children])
+        self.assertIs(children, self.node.children_element_nodes)
+        self.assertIsNone(children[0]._children_element_nodes)
+        self.assertIs(self.node, children[0].parent)
+
+    def test_use_children(self):
+        use = self.node.children[2]
+        self.assertIsInstance(use, UseNode)
+        self.assertIsNone(use._children_element_nodes)
+        self.assertEqual(1, len(use.children))
+        self.assertIs(use, use.children[0].parent)
+
+    def test_path_segments(self):
+        path = self.node.children[1].children[0]
+        self.assertIsInstance(path, PathNode)
+        self.assertIsNone(path._children_path_segment_nodes)
+        segments = path.children_path_segment_nodes
+        self.assertEqual(4, len(segments))
+        self.assertIs(segments, path.children_path_segment_nodes)
+        self.assertIs(path, segments[0].parent)
+
+    def test_bbox_does_not_build_children(self):
+        SvgToPgf(self.node).bbox
+        self.assertIsNone(self.node._children_element_nodes)
+
+    def test_fragment_lookup_walks_tree_once(self):
+        pgf = SvgToPgf(self.node)
+        with patch.object(
+            SVGElementNodeFactory,
+            "create_node",
+            autospec=True,
+            side_effect=SVGElementNodeFactory.create_node,
+        ) as create_node:
+            self.assertIn("rect", pgf.frags["r"])
+            count = create_node.call_count
+            self.assertIn("path", pgf.frags["p"])
+            self.assertEqual(count, create_node.call_count)
+        path = self.node.children[1].children[0]
+        self.assertIsNone(path._children_path_segment_nodes)
+        with self.assertRaises(KeyError):
+            pgf.frags["inexistent"]
+
+    def test_duplicate_ids_last_wins(self):
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10">'
+            '<rect id="x" x="1" y="1" width="2" height="2"/>'
+            '<g><circle id="x" cx="5" cy="5" r="2"/></g></svg>'
+        )
+        node = SVGNode.parse(io.BytesIO(svg.encode("utf-8")))
+        code = SvgToPgf(node).frags["x"]
+        self.assertIn("circle", code)
+        self.assertNotIn("rect", code)
+
+
+class TestNodeLayout(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")))
+
+    def nodes(self):
+        yield self.node
+        for group in self.node.children[:2]:
+            yield group
+            yield from group.children
+        yield from self.node.children[1].children[0].children_path_segment_nodes
+        yield self.node.children[2]
+
+    def test_no_instance_dict(self):
+        for node in self.nodes():
+            with self.subTest(node=type(node).__name__):
+                self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_transform_kept_on_root_only(self):
+        self.assertIsNotNone(self.node.svg2pgf_transform)
+        for node in list(self.nodes())[1:]:
+            self.assertFalse(hasattr(node, "_svg2pgf_transform"))
+
+    def test_no_reference_cycles(self):
+        path = self.node.children[1].children[0]
+        self.assertIs(self.node.children[1], path.parent)
+        self.assertIs(self.node, path.root)
+        ref = weakref.ref(self.node)
+        gc.disable()
+        try:
+            del self.node
+            # freed by reference counting alone
+            self.assertIsNone(ref())
+        finally:
+            gc.enable()
+        with self.assertRaises(ReferenceError):
+            path.parent
+        with self.assertRaises(ReferenceError):
+            path.root
+
+    def test_transform_of_other_roots_is_cached(self):
+        group = GroupNode(self.node.children[1].group)
+        self.assertIs(group, group.children[0].root)
+        with patch.object(
+            GroupNode, "svg_bbox", autospec=True, return_value=(0, 0, 1, 1)
+        ) as svg_bbox:
+            self.assertIs(group.svg2pgf_transform, group.svg2pgf_transform)
+            self.assertEqual(1, svg_bbox.call_count)
+
+    def test_pickle(self):
+        list(self.nodes())  # builds children
+        code = SvgToPgf(self.node).code
+        copy = pickle.loads(pickle.dumps(self.node))
+        self.assertEqual(code, SvgToPgf(copy).code)
+        # children built before pickling are linked back to their parents
+        path = copy.children[1].children[0]
+        self.assertIs(copy.children[1], path.parent)
+        self.assertIs(path, path.children_path_segment_nodes[0].parent)
+        self.assertIs(copy, path.root)
+
+    def test_pickle_unbuilt(self):
+        node = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")))
+        copy = pickle.loads(pickle.dumps(node))
+        self.assertEqual(SvgToPgf(node).code, SvgToPgf(copy).code)
+        self.assertIs(copy, copy.children[0].parent)
+
+
+def deep_tree(depth: int) -> SVGNode:
+    """Document with a path nested in ``depth`` groups, built directly (the
+    svgelements parser recurses and wouldn't handle that deep nesting)."""
+    svg = SVGDocument()
+    parent: Group = svg
+    for _ in range(depth):
+        group = Group()
+        parent.append(group)
+        parent = group
+    parent.append(Path("M 0 0 L 1 1"))
+    return SVGNode(svg)
+
+
+def chain(node: SVGNode) -> list:
+    """Nodes on the way from the document down to the segments of its path."""
+    nodes: list = [node]
+    while not isinstance(nodes[-1], PathNode):
+        nodes.append(nodes[-1].children[0])
+    nodes.extend(nodes[-1].children_path_segment_nodes)
+    return nodes
+
+
+def count_parent_calls(nodes: list) -> int:
+    """Number of parent lookups made while finding roots of the nodes."""
+    parent = GroupNode.parent
+    calls = []
+
+    def counted(node):
+        calls.append(node)
+        return parent.fget(node)
+
+    with patch.object(GroupNode, "parent", property(counted)):
+        for node in nodes:
+            node.root
+    return len(calls)
+
+
+class TestRoot(TestCase):
+    # deeper than the recursion limit
+    DEPTH = 3000
+
+    def setUp(self):
+        self.node = deep_tree(self.DEPTH)
+        self.chain = chain(self.node)
+
+    def test_deep_nesting(self):
+        self.assertIs(self.node, self.chain[-1].root)
+        for node in self.chain:
+            self.assertIs(self.node, node.root)
+
+    def test_linear_bottom_up(self):
+        calls = count_parent_calls(list(reversed(self.chain)))
+        self.assertLessEqual(calls, self.DEPTH)
+
+    def test_linear_top_down(self):
+        calls = count_parent_calls(self.chain)
+        self.assertLessEqual(calls, self.DEPTH)
+
+    def test_linear_scaling(self):
+        # resolving roots of all the nodes of twice as deep a tree takes
+        # twice as many steps (it'd be four times as many if it were quadratic)
+        calls = [
+            count_parent_calls(list(reversed(chain(deep_tree(depth)))))
+            for depth in (500, 1000)
+        ]
+        self.assertEqual(2 * calls[0], calls[1])
+
+    def test_nested_document(self):
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg">'
+            '<g><svg id="inner"><g><path d="M 0 0 L 1 1"/></g></svg></g></svg>'
+        )
+        node = SVGNode.parse(io.BytesIO(svg.encode("utf-8")))
+        inner = node.children[0].children[0]
+        self.assertIsInstance(inner, SVGNode)
+        path = inner.children[0].children[0]
+        self.assertIs(inner, path.root)
+        self.assertIs(node, inner.parent.root)
+
+    def test_vector_transform(self):
+        node = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")))
+        svg2pgf = node.svg2pgf_transform
+        self.assertEqual(svg2pgf.vector(), node.svg2pgf_vector_transform)
+        self.assertIs(node.svg2pgf_vector_transform, node.svg2pgf_vector_transform)
+        node.svg2pgf_transform = svg2pgf * Matrix.scale(2)
+        self.assertEqual(
+            (svg2pgf * Matrix.scale(2)).vector(), node.svg2pgf_vector_transform
+        )
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import io
+import xml.etree.ElementTree as ET
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.optimizer import optimize_tree
+from pgfgen.svg.prefilter import parse_filtered
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<!-- Created with an editor -->
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="20" height="20" inkscape:version="1.0" id="svg">
+  <sodipodi:namedview id="namedview" inkscape:zoom="1"/>
+  <metadata id="metadata"><title>drawing</title></metadata>
+  <defs id="defs"/>
+  <defs><circle id="dot" r="1"/></defs>
+  <g id="layer" inkscape:label="Layer" inkscape:groupmode="layer">
+    <g><rect id="r" x="1" y="1" width="2" height="2"/></g>
+    <g id="empty"><!-- nothing --></g>
+    <g id="moved" transform="translate(1,1)"><use xlink:href="#dot"/></g>
+  </g>
+  <text id="t" x="1" y="10">Hello <!-- comment -->world</text>
+</svg>
+"""
+
+
+def tags(root: ET.Element) -> list[str]:
+    return [e.tag.split("}")[-1] for e in root.iter()]
+
+
+class TestOptimizeTree(TestCase):
+    def setUp(self):
+        self.root = ET.fromstring(SVG)
+
+    def test_keep_all_ids(self):
+        report = optimize_tree(self.root)
+        self.assertEqual(
+            ["svg", "defs", "defs", "circle", "g", "rect", "g", "g", "use", "text"],
+            tags(self.root),
+        )
+        self.assertEqual(3, report.elements_removed)
+        self.assertEqual(3, report.attributes_removed)
+        self.assertEqual(1, report.groups_merged)
+        self.assertEqual([], [k for k in self.root.attrib if "inkscape" in k])
+        self.assertEqual("Hello world", self.root.find(".//{*}text").text)
+
+    def test_keep_ids(self):
+        report = optimize_tree(self.root, keep_ids={"r"})
+        self.assertEqual(
+            ["svg", "defs", "circle", "g", "rect", "g", "use", "text"], tags(self.root)
+        )
+        self.assertEqual(5, report.elements_removed)
+        self.assertEqual(1, report.groups_merged)
+        # referenced within the document
+        self.assertIsNotNone(self.root.find(".//*[@id='dot']"))
+
+
+class TestParseFilteredOptimized(TestCase):
+    def setUp(self):
+        self.source = io.BytesIO(SVG.encode("utf-8"))
+        self.expected = SvgToPgf(SVGNode.parse(io.BytesIO(SVG.encode("utf-8"))))
+
+    def test_parse(self):
+        node = parse_filtered(self.source, optimize=True)
+        pgf = SvgToPgf(node)
+        self.assertEqual(self.expected.bbox, pgf.bbox)
+        for key in ("r", "moved", "t"):
+            self.assertEqual(self.expected.frags[key], pgf.frags[key])
+        self.assertNotIn("namedview", pgf.code)
+        report = node.optimization
+        self.assertEqual(3, report.elements_removed)
+        self.assertGreater(report.bytes_removed, 0)
+
+    def test_parse_selection(self):
+        node = parse_filtered(
+            self.source, ids=["moved"], optimize=True, viewport=False
+        )
+        pgf = SvgToPgf(node)
+        self.assertEqual(self.expected.bbox, pgf.bbox)
+        self.assertEqual(self.expected.frags["moved"], pgf.frags["moved"])
+        with self.assertRaises(KeyError):
+            pgf.frags["r"]
+
+
+if __name__ == "__main__":
+    main()
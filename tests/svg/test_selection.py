@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import io
+import os.path
+import tempfile
+
+import xml.etree.ElementTree as ET
+
+from unittest import TestCase
+from unittest import main
+from unittest.mock import PropertyMock
+from unittest.mock import patch
+
+from pgfgen.cache import SvgParseCache
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.selection import find_document_bbox
+from pgfgen.svg.selection import parse_selection
+from pgfgen.svg.selection import root_element
+from pgfgen.svg.selection import select_elements
+from pgfgen.svg.selection import viewport_bbox
+from pgfgen.svg.streaming import StreamingSVG
+from pgfgen.templating import SvgFileLoader
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     width="100" height="80" viewBox="0 0 50 40">
+  <style>.r { fill: #ff0000 }</style>
+  <rect x="0" y="0" width="50" height="40" style="fill:white"/>
+  <defs><circle id="dot" r="3"/></defs>
+  <g id="g1" transform="translate(5,5)" style="stroke:black">
+    <rect id="r1" class="r" x="1" y="1" width="10" height="5"/>
+    <g id="g2" transform="scale(2)">
+      <path id="p1" d="M 0 0 L 5 5 Q 6 7 8 8 Z"/>
+      <use id="u1" xlink:href="#dot" x="3" y="3"/>
+    </g>
+    <ellipse id="e1" cx="20" cy="20" rx="4" ry="2"/>
+  </g>
+  <line id="l1" x1="0" y1="0" x2="40" y2="30" style="stroke:green"/>
+</svg>
+"""
+
+
+def ids(root):
+    return sorted(e.get("id") for e in root.iter() if e.get("id") is not None)
+
+
+class TestSelectElements(TestCase):
+    def test_select_elements(self):
+        root = ET.fromstring(SVG)
+        select_elements(root, ["p1"])
+        self.assertEqual(["dot", "g1", "g2", "p1"], ids(root))
+
+    def test_referenced_elements(self):
+        root = ET.fromstring(SVG)
+        root.find("{http://www.w3.org/2000/svg}line").set("clip-path", "url(#e1)")
+        select_elements(root, ["l1"])
+        self.assertEqual(["dot", "e1", "g1", "l1"], ids(root))
+
+    def test_unknown_ids(self):
+        root = ET.fromstring(SVG)
+        select_elements(root, ["inexistent"])
+        self.assertEqual(["dot"], ids(root))
+
+
+class TestParseSelection(TestCase):
+    def test_same_coordinates_as_full_load(self):
+        full = SVGNode.parse(io.StringIO(SVG))
+        for i in ("r1", "p1", "u1", "e1", "l1"):
+            with self.subTest(id=i):
+                node = parse_selection(io.BytesIO(SVG.encode("utf-8")), [i])
+                self.assertEqual(full.svg2pgf_transform, node.svg2pgf_transform)
+                self.assertEqual(SvgToPgf(full).frags[i], SvgToPgf(node).frags[i])
+                self.assertEqual(SvgToPgf(full).bbox, SvgToPgf(node).bbox)
+
+    def test_drawing_not_filling_viewport(self):
+        svg = SVG.replace('<rect x="0" y="0" width="50" height="40"', "<rect")
+        full = SVGNode.parse(io.StringIO(svg))
+        node = parse_selection(io.BytesIO(svg.encode("utf-8")), ["e1"])
+        self.assertEqual(SvgToPgf(full).frags["e1"], SvgToPgf(node).frags["e1"])
+        node = parse_selection(io.BytesIO(svg.encode("utf-8")), ["e1"], viewport=True)
+        self.assertEqual((0, 0, 100, 80), node.svg_bbox())
+        self.assertNotEqual(SvgToPgf(full).frags["e1"], SvgToPgf(node).frags["e1"])
+
+    def test_document_bbox(self):
+        node = parse_selection(io.BytesIO(SVG.encode("utf-8")), ["l1"], (0, 0, 1, 1))
+        self.assertEqual((0, 0, 1, 1), node.svg_bbox())
+        with self.assertRaises(KeyError):
+            SvgToPgf(node).frags["r1"]
+
+    def test_without_viewport(self):
+        svg = SVG.replace('width="100" height="80" viewBox="0 0 50 40"', "")
+        full = SVGNode.parse(io.StringIO(svg))
+        with patch.object(
+            StreamingSVG, "svg_bbox", new_callable=PropertyMock
+        ) as svg_bbox:
+            svg_bbox.return_value = full.svg_bbox()
+            node = parse_selection(io.BytesIO(svg.encode("utf-8")), ["e1"])
+        self.assertEqual(1, svg_bbox.call_count)
+        self.assertEqual(SvgToPgf(full).frags["e1"], SvgToPgf(node).frags["e1"])
+
+
+class TestDocumentBbox(TestCase):
+    def root(self, attrs: str) -> ET.Element:
+        return ET.fromstring(f'<svg xmlns="http://www.w3.org/2000/svg" {attrs}/>')
+
+    def test_viewbox(self):
+        root = self.root('width="100" height="80" viewBox="10 0 50 40"')
+        self.assertEqual((0, 0, 100, 80), viewport_bbox(root))
+        # svgelements places a viewport of the viewBox's size at the origin
+        root = self.root('viewBox="10,0,50,40"')
+        self.assertEqual((0, 0, 50, 40), viewport_bbox(root))
+
+    def test_width_and_height(self):
+        root = self.root('width="1in" height="2in"')
+        self.assertEqual((0, 0, 72, 144), viewport_bbox(root, ppi=72))
+        bbox = viewport_bbox(root, ppi=72, transform="scale(2)")
+        self.assertEqual((0, 0, 144, 288), bbox)
+
+    def test_no_viewport(self):
+        self.assertIsNone(viewport_bbox(self.root('width="100"')))
+
+    def test_root_element(self):
+        source = io.BytesIO(SVG.encode("utf-8"))
+        self.assertEqual("100", root_element(source).get("width"))
+        full = SVGNode.parse(io.StringIO(SVG))
+        for a, b in zip(full.svg_bbox(), find_document_bbox(source)):
+            self.assertAlmostEqual(a, b)
+        self.assertEqual((0, 0, 100, 80), find_document_bbox(source, viewport=True))
+
+
+class TestSvgFileLoaderSelection(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as fp:
+            fp.write(SVG)
+        self.cache = SvgParseCache()
+        self.loader = SvgFileLoader([self.tmp.name], self.cache)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ids(self):
+        full = self.loader("a.svg")
+        node = self.loader("a.svg", ids=["p1", "e1"])
+        self.assertIsNot(full, node)
+        self.assertIs(node, self.loader("a.svg", ids=("e1", "p1")))
+        self.assertEqual(SvgToPgf(full).frags["e1"], SvgToPgf(node).frags["e1"])
+        self.assertIsNot(node, self.loader("a.svg", ids="p1"))
+
+    def test_document_bbox_memoized(self):
+        with patch(
+            "pgfgen.templating.find_document_bbox", wraps=find_document_bbox
+        ) as document_bbox:
+            self.loader("a.svg", ids=["p1"])
+            self.loader("a.svg", ids=["e1"])
+            self.assertEqual(1, document_bbox.call_count)
+
+    def test_viewport_without_parse(self):
+        with patch.object(
+            StreamingSVG, "svg_bbox", new_callable=PropertyMock
+        ) as svg_bbox:
+            node = self.loader("a.svg", ids=["p1"], viewport=True)
+            svg_bbox.assert_not_called()
+        self.assertEqual((0, 0, 100, 80), node.svg_bbox())
+        self.assertIsNot(node, self.loader("a.svg", ids=["p1"]))
+
+    def test_drawing_bbox(self):
+        svg = SVG.replace('<rect x="0" y="0" width="50" height="40"', "<rect")
+        with open(os.path.join(self.tmp.name, "b.svg"), "w") as fp:
+            fp.write(svg)
+        full = self.loader("b.svg")
+        node = self.loader("b.svg", ids=["e1"])
+        self.assertEqual(full.svg_bbox(), node.svg_bbox())
+        self.assertEqual(SvgToPgf(full).frags["e1"], SvgToPgf(node).frags["e1"])
+        # planned selections are the same as explicit ones
+        self.loader.planned_ids["b.svg"] = ("e1",)
+        self.assertIs(node, self.loader("b.svg"))
+        self.assertIsNot(full, node)
+
+    def test_streaming(self):
+        with self.assertRaises(ValueError):
+            self.loader("a.svg", ids=["p1"], streaming=True)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import io
+import math
+
+from unittest import TestCase
+from unittest import main
+from unittest.mock import patch
+
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.geometry import CLOSE
+from pgfgen.svg.geometry import CUBIC
+from pgfgen.svg.geometry import LINE
+from pgfgen.svg.geometry import MOVE
+from pgfgen.svg.geometry import QUAD
+from pgfgen.svg.simplifier import NUMPY_MIN_VERTICES
+from pgfgen.svg.simplifier import douglas_peucker
+from pgfgen.svg.simplifier import simplify_tree
+from pgfgen.svg.binary import detach
+from pgfgen.templating import SvgToPgf
+
+# the svg2pgf transform scales the drawing by 1/100, its width is 2
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="200" height="100">
+  <polyline id="wave" points="%s" fill="none" stroke="black"/>
+  <path id="p" stroke="black"
+        d="M 0 0 L 10 0.01 L 20 0 C 30 0 40 0.05 50 0 L 60 0 Q 70 50 80 0 Z"/>
+  <polygon id="square" points="0 0 100 0 100 0.01 100 100 0 100"/>
+</svg>
+"""
+
+
+def _wave(n: int) -> str:
+    return " ".join(
+        f"{200 * k / n:.4f},{50 + 40 * math.sin(k / 50):.4f}" for k in range(n + 1)
+    )
+
+
+def _named_nodes(node):
+    if node.id is not None:
+        yield (node.id, node)
+    for child in getattr(node, "children", ()):
+        yield from _named_nodes(child)
+
+
+class TestDouglasPeucker(TestCase):
+    def test_keep(self):
+        xs = [0.0, 1.0, 2.0, 3.0, 4.0]
+        ys = [0.0, 0.1, 0.0, 1.0, 0.0]
+        self.assertEqual([True, False, True, True, True], douglas_peucker(xs, ys, 0.2))
+        self.assertEqual([True] * 5, douglas_peucker(xs, ys, 0.05))
+        self.assertEqual([True, True], douglas_peucker([0.0, 1.0], [0.0, 0.0], 1))
+
+    def test_distances_to_segments(self):
+        # the vertex beyond the end of the segment is kept
+        keep = douglas_peucker([0.0, 3.0, 1.0], [0.0, 0.0, 0.0], 0.5)
+        self.assertEqual([True, True, True], keep)
+
+    def test_batch(self):
+        n = 10 * NUMPY_MIN_VERTICES
+        xs = [k / n for k in range(n)]
+        ys = [math.sin(20 * x) + 0.001 * (k % 7) for (k, x) in enumerate(xs)]
+        keep = douglas_peucker(xs, ys, 0.01)
+        self.assertLess(sum(keep), n / 4)
+        with patch("pgfgen.svg.simplifier.numpy", None):
+            self.assertEqual(keep, douglas_peucker(xs, ys, 0.01))
+
+
+class TestSimplifyTree(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.StringIO(SVG % _wave(1000)))
+        self.nodes = dict(_named_nodes(self.node))
+
+    def test_report(self):
+        report = simplify_tree(self.node, 0.001)
+        self.assertEqual(1001 + 6 + 5, report.vertices_before)
+        self.assertLess(report.vertices_after, 200)
+        self.assertEqual(0, report.curves_flattened)
+        self.assertEqual(
+            f"simplified 1012 vertices to {report.vertices_after}, "
+            "flattened 0 curves",
+            str(report),
+        )
+
+    def test_tolerance(self):
+        wave = self.nodes["wave"]
+        points = list(wave.shape.points)
+        simplify_tree(self.node, 0.002)
+        kept = wave.shape.points
+        self.assertEqual((points[0], points[-1]), (kept[0], kept[-1]))
+        # no vertex is farther than the tolerance, 0.2 in SVG units
+        for p in points:
+            d = min(_distance(p, a, b) for (a, b) in zip(kept[:-1], kept[1:]))
+            self.assertLessEqual(d, 0.2 + 1e-9)
+
+    def test_curves(self):
+        path = self.nodes["p"]
+        simplify_tree(self.node, 0.001)
+        # the curve and the lines it bounds are kept
+        self.assertEqual(
+            [MOVE, LINE, CUBIC, LINE, QUAD, CLOSE], list(path.geometry.opcodes)
+        )
+        self.assertEqual(4, len(self.nodes["square"].shape.points))
+
+    def test_curve_tolerance(self):
+        path = self.nodes["p"]
+        report = simplify_tree(self.node, 0.001, curve_tolerance=0.001)
+        self.assertEqual(1, report.curves_flattened)
+        self.assertEqual([MOVE, LINE, QUAD, CLOSE], list(path.geometry.opcodes))
+        self.assertEqual([0, 0, 60, 0, 70, 50, 80, 0], list(path.geometry.coords))
+
+    def test_svg2pgf(self):
+        svg2pgf = self.node.svg2pgf_transform
+        bbox = self.node.svg_bbox()
+        simplify_tree(self.node, 0.1)
+        self.assertEqual(bbox, self.node.svg_bbox())
+        self.assertEqual(svg2pgf, self.node.svg2pgf_transform)
+
+    def test_code(self):
+        code = SvgToPgf(self.node).code
+        simplify_tree(self.node, 0.0)
+        # only collinear vertices are removed
+        simplified = SvgToPgf(self.node).code
+        self.assertEqual(code.count("curveto"), simplified.count("curveto"))
+        self.assertEqual(code.count("lineto") - 1, simplified.count("lineto"))
+
+    def test_detach(self):
+        report = simplify_tree(self.node, 0.001)
+        node = self.node
+        node.simplification = report
+        detached = detach(node)
+        self.assertIs(report, detached.simplification)
+        self.assertEqual(SvgToPgf(node).code, SvgToPgf(detached).code)
+
+    def test_negative(self):
+        with self.assertRaises(ValueError):
+            simplify_tree(self.node, -1)
+        with self.assertRaises(ValueError):
+            simplify_tree(self.node, 1, curve_tolerance=-1)
+
+
+def _distance(p, a, b) -> float:
+    (dx, dy) = (b.x - a.x, b.y - a.y)
+    length = dx * dx + dy * dy
+    t = 0.0
+    if length > 0:
+        t = min(max(((p.x - a.x) * dx + (p.y - a.y) * dy) / length, 0.0), 1.0)
+    return math.hypot(p.x - a.x - t * dx, p.y - a.y - t * dy)
+
+
+if __name__ == "__main__":
+    main()
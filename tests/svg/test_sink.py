@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import io
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.generator import GeneratorNodeVisitor
+from pgfgen.svg.sink import LineSink
+from pgfgen.svg.sink import TextSink
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="20" height="20">
+  <g id="g1"><g id="g2"><g id="g3">
+    <rect id="r" x="1" y="1" width="2" height="2"/>
+  </g></g></g>
+  <polygon id="p" points="1 1 4 1 4 3"/>
+</svg>
+"""
+
+
+class TestLineSink(TestCase):
+    def test_nested(self):
+        lines: list[str] = []
+        sink = LineSink(lines.append, "\t")
+        sink.line("a")
+        with sink.nested():
+            sink.lines(["b", "c"])
+            with sink.nested():
+                sink.line("d")
+            self.assertEqual(1, sink.depth)
+        sink.line("e")
+        self.assertEqual(["a", "\tb", "\tc", "\t\td", "e"], lines)
+
+    def test_depth_restored_on_error(self):
+        sink = LineSink(lambda line: None)
+        with self.assertRaises(ValueError):
+            with sink.nested():
+                raise ValueError()
+        self.assertEqual(0, sink.depth)
+
+
+class TestTextSink(TestCase):
+    def test_lines_separated(self):
+        for lines in ([], ["a"], ["a", "", "b"]):
+            with self.subTest(lines=lines):
+                stream = io.StringIO()
+                TextSink(stream).lines(lines)
+                self.assertEqual("\n".join(lines), stream.getvalue())
+
+
+class TestGeneratorSink(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.StringIO(SVG))
+
+    def test_same_lines(self):
+        visitor = GeneratorNodeVisitor("  ")
+        self.node.accept_visitor(visitor)
+        stream = io.StringIO()
+        self.node.accept_visitor(GeneratorNodeVisitor(sink=TextSink(stream, "  ")))
+        self.assertEqual("\n".join(visitor.lines), stream.getvalue())
+        # within scopes of the document, three groups and the rectangle
+        self.assertIn("\n          \\pgfpathrectangle", stream.getvalue())
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import gzip
+import io
+import os.path
+import tempfile
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.prefilter import CHUNK_SIZE
+from pgfgen.svg.prefilter import parse_filtered
+from pgfgen.svg.sources import is_compressed
+from pgfgen.svg.sources import is_compressed_file
+from pgfgen.svg.sources import open_source
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>'
+
+
+class TestSources(TestCase):
+    def test_is_compressed(self):
+        fp = io.BytesIO(gzip.compress(SVG))
+        self.assertTrue(is_compressed(fp))
+        self.assertEqual(0, fp.tell())
+        self.assertFalse(is_compressed(io.BytesIO(SVG)))
+        self.assertFalse(is_compressed(io.BytesIO(b"")))
+
+    def test_open_stream(self):
+        for data in (SVG, gzip.compress(SVG)):
+            source = io.BytesIO(data)
+            source.read()
+            with open_source(source) as fp:
+                self.assertEqual(SVG, fp.read())
+            self.assertFalse(source.closed)
+
+    def test_open_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, data in (("a.svg", SVG), ("a.svgz", gzip.compress(SVG))):
+                file = os.path.join(tmp, name)
+                with open(file, "wb") as f:
+                    f.write(data)
+                self.assertEqual(name.endswith("z"), is_compressed_file(file))
+                with open_source(file) as fp:
+                    self.assertEqual(SVG, fp.read())
+
+    def test_decompressed_incrementally(self):
+        data = SVG * 1000
+        with open_source(io.BytesIO(gzip.compress(data))) as fp:
+            self.assertEqual(data[:100], fp.read(100))
+            self.assertEqual(data[100:200], fp.read(100))
+
+
+class RecordedReads(io.BytesIO):
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.sizes: list = []
+
+    def read(self, size=-1):
+        self.sizes.append(size)
+        return super().read(size)
+
+
+class TestFilteredSources(TestCase):
+    def test_read_in_chunks(self):
+        rects = "".join(
+            f'<rect id="r{i}" x="{i}" y="0" width="1" height="1"/>' for i in range(3000)
+        )
+        data = SVG.replace(b"/>", f">{rects}</svg>".encode("utf-8"))
+        self.assertGreater(len(data), 2 * CHUNK_SIZE)
+        filters = (
+            dict(ids=["r5"]),
+            dict(exclude_layers=["Layer"]),
+            dict(optimize=True),
+        )
+        for args in filters:
+            with self.subTest(**args):
+                source = RecordedReads(data)
+                node = parse_filtered(source, **args)
+                self.assertNotIn(-1, source.sizes)
+                self.assertTrue(all(size <= CHUNK_SIZE for size in source.sizes))
+                self.assertIsInstance(node, SVGNode)
+
+
+if __name__ == "__main__":
+    main()
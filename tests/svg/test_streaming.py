@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import io
+import os.path
+import tempfile
+
+import xml.etree.ElementTree as ET
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.streaming import StreamingSVG
+from pgfgen.svg.streaming import element_references
+from pgfgen.svg.streaming import local_tag
+from pgfgen.templating import StreamingSvgToPgf
+from pgfgen.templating import SvgFileLoader
+from pgfgen.templating import SvgToPgf
+from pgfgen.templating import SvgToPgfFactory
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     width="100" height="80" viewBox="0 0 50 40">
+  <style>.r { fill: #ff0000; stroke-width: 2 }</style>
+  <defs><circle id="dot" r="3" style="fill:blue"/></defs>
+  <g id="g1" transform="translate(5,5)" style="stroke:black">
+    <rect id="r1" class="r" x="1" y="1" width="10" height="5"/>
+    <g id="g2" transform="scale(2)">
+      <path id="p1" d="M 0 0 L 5 5 Q 6 7 8 8 C 1 2 3 4 5 6 A 2 2 0 0 1 9 9 Z"/>
+      <use id="u1" xlink:href="#dot" x="3" y="3"/>
+    </g>
+    <g id="hidden" style="display:none"><circle cx="1" cy="1" r="100"/></g>
+    <ellipse id="e1" cx="20" cy="20" rx="4" ry="2"/>
+  </g>
+  <line id="l1" x1="0" y1="0" x2="40" y2="30" style="stroke:green"/>
+  <polyline id="pl" points="1,1 5,5 9,2"/>
+</svg>
+"""
+
+
+class TestHelpers(TestCase):
+    def test_local_tag(self):
+        self.assertEqual("g", local_tag("{http://www.w3.org/2000/svg}g"))
+        self.assertEqual("g", local_tag("g"))
+
+    def test_element_references(self):
+        elem = ET.Element(
+            "use",
+            {
+                "{http://www.w3.org/1999/xlink}href": "#a",
+                "clip-path": "url(#b)",
+                "fill": "url( #c )",
+                "id": "d",
+            },
+        )
+        self.assertEqual(["a", "b", "c"], sorted(element_references(elem)))
+
+
+class TestStreamingSVG(TestCase):
+    def expected(self, **parse_args):
+        node = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")), **parse_args)
+        return SvgToPgf(node).code.split("\n")
+
+    def test_lines_match_full_parse(self):
+        expected = self.expected()
+        for batch_size in (1, 2, 256):
+            with self.subTest(batch_size=batch_size):
+                source = io.BytesIO(SVG.encode("utf-8"))
+                streaming = StreamingSVG(source, batch_size=batch_size)
+                self.assertEqual(expected, list(streaming.lines("  ")))
+
+    def test_parse_args(self):
+        source = io.BytesIO(SVG.encode("utf-8"))
+        streaming = StreamingSVG(source, ppi=72)
+        self.assertEqual(self.expected(ppi=72), list(streaming.lines("  ")))
+
+    def test_svg_bbox(self):
+        node = SVGNode.parse(io.BytesIO(SVG.encode("utf-8")))
+        streaming = StreamingSVG(io.BytesIO(SVG.encode("utf-8")))
+        for a, b in zip(node.svg_bbox(), streaming.svg_bbox):
+            self.assertAlmostEqual(a, b)
+        self.assertEqual(node.svg2pgf_transform, streaming.svg2pgf_transform)
+
+    def test_empty_document(self):
+        svg = '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>'
+        streaming = StreamingSVG(io.BytesIO(svg.encode("utf-8")))
+        self.assertIsNone(streaming.svg_bbox)
+        lines = list(streaming.lines())
+        self.assertTrue(lines[0].startswith(r"\begin{pgfscope}"))
+        self.assertTrue(lines[-1].startswith(r"\end{pgfscope}"))
+
+    def test_context_not_supported(self):
+        with self.assertRaises(ValueError):
+            StreamingSVG(io.BytesIO(), context=[])
+
+    def assertSameCode(self, svg: str):
+        node = SVGNode.parse(io.BytesIO(svg.encode("utf-8")))
+        streaming = StreamingSVG(io.BytesIO(svg.encode("utf-8")), batch_size=1)
+        self.assertEqual(SvgToPgf(node).code.split("\n"), list(streaming.lines()))
+
+    def test_style_in_defs(self):
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10">'
+            "<defs><style>.r { fill: #ff0000 }</style></defs>"
+            '<rect class="r" x="1" y="1" width="5" height="5"/>'
+            '<circle class="r" cx="5" cy="5" r="2"/></svg>'
+        )
+        code = "\n".join(StreamingSVG(io.BytesIO(svg.encode("utf-8"))).lines())
+        self.assertIn("ff0000", code)
+        self.assertSameCode(svg)
+
+    def test_forward_references(self):
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg"'
+            ' xmlns:xlink="http://www.w3.org/1999/xlink" width="10" height="10">'
+            '<use xlink:href="#dot" x="30" y="30"/>'
+            '<use xlink:href="#box" x="-20" y="0"/>'
+            '<g id="box"><rect x="1" y="1" width="2" height="2"/></g>'
+            '<defs><circle id="dot" r="3"/></defs></svg>'
+        )
+        node = SVGNode.parse(io.BytesIO(svg.encode("utf-8")))
+        streaming = StreamingSVG(io.BytesIO(svg.encode("utf-8")))
+        for a, b in zip(node.svg_bbox(), streaming.svg_bbox):
+            self.assertAlmostEqual(a, b)
+        self.assertSameCode(svg)
+
+    def test_forward_references_reads(self):
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg"'
+            ' xmlns:xlink="http://www.w3.org/1999/xlink" width="10" height="10">'
+            '<use xlink:href="#dot" x="3" y="3"/>'
+            '<defs><circle id="dot" r="3"/></defs></svg>'
+        )
+        reads = []
+        streaming = StreamingSVG(io.BytesIO(svg.encode("utf-8")), batch_size=1)
+        iterparse = streaming.iterparse
+
+        def counted():
+            reads.append(None)
+            return iterparse()
+
+        streaming.iterparse = counted
+        # the batch referring the circle is measured by another read
+        self.assertEqual((0.0, 0.0, 6.0, 6.0), streaming.svg_bbox)
+        self.assertEqual(2, len(reads))
+
+    def test_referenced(self):
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg"'
+            ' xmlns:xlink="http://www.w3.org/1999/xlink" width="10" height="10">'
+            '<defs><linearGradient id="a" xlink:href="#b"/>'
+            '<linearGradient id="b"><stop offset="0"/></linearGradient>'
+            '<circle id="c" r="3"/></defs>'
+            '<clipPath id="d"><use xlink:href="#c"/></clipPath>'
+            '<symbol id="e"><rect id="f" width="1" height="1"/></symbol>'
+            '<rect width="5" height="5" fill="url(#a)"/></svg>'
+        )
+        streaming = StreamingSVG(io.BytesIO(svg.encode("utf-8")))
+        streaming.svg_bbox
+        ids = [e.get("id") for e in streaming._referenced({"a"})]
+        self.assertEqual(["a", "b"], sorted(ids))
+        ids = [e.get("id") for e in streaming._referenced({"d", "f", "x"})]
+        self.assertEqual(["c", "d", "f"], sorted(ids))
+        # elements within referenced ones are not repeated
+        ids = [e.get("id") for e in streaming._referenced({"e", "f"})]
+        self.assertEqual(["e"], ids)
+
+    def test_reads(self):
+        reads = []
+        streaming = StreamingSVG(io.BytesIO(SVG.encode("utf-8")))
+        iterparse = streaming.iterparse
+
+        def counted():
+            reads.append(None)
+            return iterparse()
+
+        streaming.iterparse = counted
+        list(streaming.lines())
+        self.assertEqual(2, len(reads))
+
+
+class TestStreamingSvgToPgf(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as fp:
+            fp.write(SVG)
+        self.loader = SvgFileLoader([self.tmp.name])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_loader(self):
+        self.assertIsInstance(self.loader("a.svg", streaming=True), StreamingSVG)
+
+    def test_code(self):
+        factory = SvgToPgfFactory()
+        streaming = factory(self.loader("a.svg", streaming=True))
+        self.assertIsInstance(streaming, StreamingSvgToPgf)
+        self.assertEqual(SvgToPgf(self.loader("a.svg")).code, streaming.code)
+
+    def test_write(self):
+        code = SvgToPgf(self.loader("a.svg")).code
+        for pgf in (
+            SvgToPgf(self.loader("a.svg")),
+            StreamingSvgToPgf(self.loader("a.svg", streaming=True)),
+        ):
+            with self.subTest(pgf=type(pgf).__name__):
+                stream = io.StringIO()
+                pgf.write(stream)
+                self.assertEqual(code, stream.getvalue())
+
+    def test_bbox(self):
+        streaming = StreamingSvgToPgf(self.loader("a.svg", streaming=True))
+        expected = SvgToPgf(self.loader("a.svg")).bbox
+        for a, b in zip(expected, streaming.bbox):
+            self.assertAlmostEqual(a, b)
+
+    def test_frags(self):
+        streaming = StreamingSvgToPgf(self.loader("a.svg", streaming=True))
+        with self.assertRaises(TypeError):
+            streaming.frags
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import io
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.svg.generator import GeneratorNodeVisitor
+from pgfgen.svg.generator import GraphicObjectOptionsGenerator
+from pgfgen.svg.generator import collect_styles
+from pgfgen.svg.sink import LineSink
+from pgfgen.svg.styles import StyleRegistry
+from pgfgen.svg.styles import StyleTable
+from pgfgen.svg.styles import _letters
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="20" height="20">
+  <g id="g">
+    <line id="l1" x1="0" y1="0" x2="5" y2="5" stroke="red" stroke-width="2"/>
+    <circle id="c" cx="5" cy="5" r="2" fill="blue"/>
+    <line id="l2" x1="5" y1="0" x2="0" y2="5" stroke="red" stroke-width="2"/>
+  </g>
+  <rect id="r" x="1" y="1" width="2" height="2" fill="green"/>
+  <rect id="s" x="3" y="3" width="2" height="2" fill="green"/>
+</svg>
+"""
+
+
+def _named_nodes(node):
+    if node.id is not None:
+        yield (node.id, node)
+    for child in getattr(node, "children", ()):
+        yield from _named_nodes(child)
+
+
+class TestStyleTable(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.StringIO(SVG))
+        self.nodes = dict(_named_nodes(self.node))
+
+    def test_collect_styles(self):
+        styles = collect_styles(self.node)
+        self.assertEqual(
+            [r"\pgfgen@style@a", r"\pgfgen@style@b"], list(styles.names.values())
+        )
+        for (id, name) in (("l1", "a"), ("l2", "a"), ("r", "b"), ("s", "b")):
+            self.assertEqual([r"\pgfgen@style@" + name], styles.lines(self.nodes[id]))
+        # bundles used once are not defined as macros
+        circle = self.nodes["c"]
+        expected = GraphicObjectOptionsGenerator(circle).generate()
+        self.assertEqual(expected, styles.lines(circle))
+
+    def test_definitions(self):
+        styles = StyleTable()
+        styles.add(self.nodes["l1"], ["x", "y"])
+        styles.add(self.nodes["l2"], ["x", "y"])
+        styles.add(self.nodes["c"], ["z"])
+        self.assertEqual(
+            [r"\def\pgfgen@style@a{%", "\tx", "\ty", "}"], styles.definitions("\t")
+        )
+        self.assertIsNone(styles.lines(self.nodes["r"]))
+
+    def test_interned_code(self):
+        lines: list[str] = []
+        styles = collect_styles(self.node)
+        self.node.accept_visitor(
+            GeneratorNodeVisitor(sink=LineSink(lines.append, styles=styles))
+        )
+        # definitions are local to the scope of the figure
+        definitions = ["  " + line for line in styles.definitions()]
+        k = lines.index(definitions[0])
+        self.assertEqual(definitions, lines[k : k + len(definitions)])
+        self.assertIn("scale factor", lines[k - 1])
+        del lines[k : k + len(definitions)]
+        # expanding the macros gives the code with no styles interned
+        bundles = {name: bundle for (bundle, name) in styles.names.items()}
+        expanded = []
+        for line in lines:
+            name = line.lstrip()
+            if name in bundles:
+                prefix = line[: len(line) - len(name)]
+                expanded.extend(prefix + s for s in bundles[name])
+            else:
+                expanded.append(line)
+        visitor = GeneratorNodeVisitor()
+        self.node.accept_visitor(visitor)
+        self.assertEqual(visitor.lines, expanded)
+        self.assertEqual(4, sum(line.lstrip() in bundles for line in lines))
+
+    def test_letters(self):
+        for (k, letters) in ((0, "a"), (25, "z"), (26, "aa"), (27, "ab"), (702, "aaa")):
+            self.assertEqual(letters, _letters(k))
+
+
+class TestStyleRegistry(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.StringIO(SVG))
+        self.nodes = dict(_named_nodes(self.node))
+
+    def test_collect_styles(self):
+        registry = StyleRegistry()
+        styles = collect_styles(self.node, registry=registry)
+        self.assertEqual([], styles.definitions())
+        # bundles used once are named too
+        for (id, name) in (("l1", "a"), ("c", "b"), ("l2", "a"), ("r", "c")):
+            self.assertEqual(
+                [r"\pgfgen@docstyle@" + name], styles.lines(self.nodes[id])
+            )
+        # another figure shares the names
+        styles = collect_styles(self.nodes["s"], registry=registry)
+        self.assertEqual([r"\pgfgen@docstyle@c"], styles.lines(self.nodes["s"]))
+        definitions = registry.definitions()
+        self.assertEqual(
+            [
+                r"\definecolor{pgfgen@color@000000}{HTML}{000000}",
+                r"\definecolor{pgfgen@color@ff0000}{HTML}{ff0000}",
+                r"\definecolor{pgfgen@color@0000ff}{HTML}{0000ff}",
+                r"\definecolor{pgfgen@color@008000}{HTML}{008000}",
+                r"\def\pgfgen@docstyle@a{%",
+                r"  \pgfsetfillcolor{pgfgen@color@000000}",
+            ],
+            definitions[:6],
+        )
+        macros = [line for line in definitions if line.startswith(r"\def\pgfgen")]
+        self.assertEqual(3, len(macros))
+        # colors are defined once, outside of bundles
+        self.assertEqual(4, sum(r"\definecolor" in line for line in definitions))
+
+    def test_expand(self):
+        registry = StyleRegistry()
+        self.assertFalse(registry.placed)
+        text = "a\n%s\nb" % registry.place()
+        self.assertTrue(registry.placed)
+        self.assertEqual("a\n\nb", registry.expand(text))
+        registry.name(("x",))
+        registry.color("ffffff")
+        self.assertEqual(
+            "a\n\\definecolor{pgfgen@color@ffffff}{HTML}{ffffff}\n"
+            "\\def\\pgfgen@docstyle@a{%\n  x\n}\nb",
+            registry.expand(text),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import io
+import os
+import os.path
+import tempfile
+import time
+
+from unittest import TestCase
+from unittest import main
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from svgelements import Matrix
+
+from pgfgen.cache import PgfCodeCache
+from pgfgen.cache import SvgParseCache
+from pgfgen.cache import SvgTreeCache
+from pgfgen.cache import source_digest
+from pgfgen.svg.formatting import EXACT
+from pgfgen.svg.formatting import NumberFormat
+from pgfgen.templating import SvgFileLoader
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10" id="svg">
+  <circle id="c" cx="5" cy="5" r="%s" style="fill:#ff0000"/>
+</svg>
+"""
+
+
+class TestSvgParseCache(TestCase):
+    def test_constructor(self):
+        cache = SvgParseCache(3, 100)
+        self.assertEqual(3, cache.max_entries)
+        self.assertEqual(100, cache.max_source_bytes)
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(0, cache.misses)
+        self.assertEqual(0, cache.source_bytes)
+        self.assertEqual(0, len(cache))
+
+    def test_get_put(self):
+        cache = SvgParseCache()
+        node = Mock()
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", node, 10)
+        self.assertIs(node, cache.get("a"))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(10, cache.source_bytes)
+
+    def test_put_replaces_entry(self):
+        cache = SvgParseCache()
+        cache.put("a", Mock(), 10)
+        cache.put("a", Mock(), 4)
+        self.assertEqual(1, len(cache))
+        self.assertEqual(4, cache.source_bytes)
+
+    def test_lru_eviction_by_entries(self):
+        cache = SvgParseCache(max_entries=2, max_source_bytes=None)
+        cache.put("a", Mock(), 1)
+        cache.put("b", Mock(), 1)
+        cache.get("a")
+        cache.put("c", Mock(), 1)
+        self.assertEqual(2, len(cache))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_lru_eviction_by_bytes(self):
+        cache = SvgParseCache(max_entries=None, max_source_bytes=10)
+        cache.put("a", Mock(), 4)
+        cache.put("b", Mock(), 4)
+        cache.put("c", Mock(), 4)
+        self.assertEqual(8, cache.source_bytes)
+        self.assertIsNone(cache.get("a"))
+
+    def test_oversized_entry_is_not_cached(self):
+        cache = SvgParseCache(max_source_bytes=10)
+        cache.put("a", Mock(), 11)
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.source_bytes)
+
+    def test_resize(self):
+        cache = SvgParseCache(max_entries=None, max_source_bytes=None)
+        for key in "abc":
+            cache.put(key, Mock(), 1)
+        cache.resize(1, None)
+        self.assertEqual(1, len(cache))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_clear(self):
+        cache = SvgParseCache()
+        cache.put("a", Mock(), 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.source_bytes)
+        self.assertEqual(0, cache.hits)
+
+    def test_key(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "a.svg")
+            with open(file, "w") as fp:
+                fp.write("12345")
+            (key, size) = SvgParseCache.key(file, reify=True, ppi=96)
+            self.assertEqual(5, size)
+            self.assertEqual(key, SvgParseCache.key(file, ppi=96, reify=True)[0])
+            self.assertNotEqual(key, SvgParseCache.key(file, reify=False, ppi=96)[0])
+
+            stat = os.stat(file)
+            os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            self.assertNotEqual(key, SvgParseCache.key(file, reify=True, ppi=96)[0])
+
+    def test_key_not_cacheable(self):
+        self.assertIsNone(SvgParseCache.key("/inexistent/1ab3b7e0.svg"))
+        with tempfile.NamedTemporaryFile() as fp:
+            self.assertIsNone(SvgParseCache.key(fp.name, context=[]))
+
+
+class TestSvgFileLoaderCaching(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.tmp.name, "a.svg")
+        with open(self.file, "w") as fp:
+            fp.write(SVG % "2")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_hit(self):
+        cache = SvgParseCache()
+        loader = SvgFileLoader([self.tmp.name], cache)
+        first = loader("a.svg")
+        self.assertIs(first, loader("a.svg"))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_dedicated_caches_isolate_trees(self):
+        first = SvgFileLoader([self.tmp.name], SvgParseCache())("a.svg")
+        first.svg2pgf_transform = first.svg2pgf_transform * Matrix.scale(2)
+        second = SvgFileLoader([self.tmp.name], SvgParseCache())("a.svg")
+        self.assertIsNot(first, second)
+        self.assertNotEqual(first.svg2pgf_transform, second.svg2pgf_transform)
+
+    def test_different_arguments(self):
+        cache = SvgParseCache()
+        loader = SvgFileLoader([self.tmp.name], cache)
+        self.assertIsNot(loader("a.svg"), loader("a.svg", ppi=72))
+        self.assertEqual(2, cache.misses)
+
+    def test_modified_file(self):
+        cache = SvgParseCache()
+        loader = SvgFileLoader([self.tmp.name], cache)
+        first = loader("a.svg")
+        with open(self.file, "w") as fp:
+            fp.write(SVG % "3.5")
+        self.assertIsNot(first, loader("a.svg"))
+
+    def test_context_bypasses_cache(self):
+        cache = SvgParseCache()
+        loader = SvgFileLoader([self.tmp.name], cache)
+        with patch("pgfgen.templating.SVGNode.parse") as parse:
+            loader("a.svg", context=[])
+            loader("a.svg", context=[])
+            self.assertEqual(2, parse.call_count)
+        self.assertEqual(0, len(cache))
+
+
+class TestSourceDigest(TestCase):
+    def test_source_digest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "a.svg")
+            with open(file, "w") as fp:
+                fp.write("12345")
+            digest = source_digest(file, reify=True)
+            self.assertEqual(digest, source_digest(file, reify=True))
+            self.assertNotEqual(digest, source_digest(file, reify=False))
+            with open(file, "w") as fp:
+                fp.write("12346")
+            self.assertNotEqual(digest, source_digest(file, reify=True))
+
+
+class TestPgfCodeCache(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key(self):
+        key = PgfCodeCache.key("abc", "  ")
+        self.assertEqual(key, PgfCodeCache.key("abc", "  ", None))
+        self.assertNotEqual(key, PgfCodeCache.key("abd", "  "))
+        self.assertNotEqual(key, PgfCodeCache.key("abc", "    "))
+        self.assertNotEqual(key, PgfCodeCache.key("abc", "  ", "frag"))
+        fmt = NumberFormat(precision=4)
+        self.assertNotEqual(key, PgfCodeCache.key("abc", "  ", None, fmt))
+        self.assertNotEqual(key, PgfCodeCache.key("abc", "  ", None, EXACT, True))
+        with patch("pgfgen.cache.__version__", "0.0.0"):
+            self.assertNotEqual(key, PgfCodeCache.key("abc", "  "))
+
+    def test_get_put(self):
+        cache = PgfCodeCache(self.tmp.name)
+        key = PgfCodeCache.key("abc", "  ")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "\\pgfpathclose")
+        self.assertEqual("\\pgfpathclose", cache.get(key))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertTrue(os.path.isfile(cache.path(key)))
+        self.assertEqual(
+            [],
+            [
+                f
+                for f in os.listdir(os.path.dirname(cache.path(key)))
+                if f.endswith(".tmp")
+            ],
+        )
+
+    def test_shared_directory(self):
+        key = PgfCodeCache.key("abc", "  ")
+        PgfCodeCache(self.tmp.name).put(key, "code")
+        self.assertEqual("code", PgfCodeCache(self.tmp.name).get(key))
+
+    def test_prune_oldest_first(self):
+        cache = PgfCodeCache(self.tmp.name, max_bytes=10)
+        keys = [PgfCodeCache.key(d, "  ") for d in "abc"]
+        now = time.time()
+        for i, key in enumerate(keys):
+            cache.put(key, "1234")
+            os.utime(cache.path(key), (now - 100 + i, now - 100 + i))
+        # the last put has exceeded the limit, oldest entry got removed
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual("1234", cache.get(keys[1]))
+        self.assertEqual("1234", cache.get(keys[2]))
+        cache.prune(4)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual("1234", cache.get(keys[2]))
+
+    def test_overwrite_is_not_counted_twice(self):
+        cache = PgfCodeCache(self.tmp.name, max_bytes=100)
+        keys = [PgfCodeCache.key(d, "  ") for d in "ab"]
+        cache.put(keys[0], "1234")
+        for _ in range(5):
+            cache.put(keys[1], "1234")
+        self.assertEqual(8, cache._bytes)
+        self.assertEqual("1234", cache.get(keys[0]))
+
+    def test_unusable_directory(self):
+        file = os.path.join(self.tmp.name, "file")
+        with open(file, "w"):
+            pass
+        cache = PgfCodeCache(file)
+        key = PgfCodeCache.key("abc", "  ")
+        cache.put(key, "code")
+        self.assertIsNone(cache.get(key))
+
+
+class TestSvgTreeCache(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as fp:
+            fp.write(SVG % "2")
+        self.cache = SvgTreeCache(os.path.join(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def loader(self) -> SvgFileLoader:
+        loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        loader.tree_cache = self.cache
+        return loader
+
+    def test_key(self):
+        key = SvgTreeCache.key("abc")
+        self.assertNotEqual(key, SvgTreeCache.key("abd"))
+        self.assertNotEqual(key, PgfCodeCache.key("abc", "  "))
+        with patch("pgfgen.svg.binary.FORMAT_VERSION", 0):
+            self.assertNotEqual(key, SvgTreeCache.key("abc"))
+
+    def test_restore(self):
+        node = self.loader()("a.svg")
+        self.assertEqual(1, self.cache.misses)
+        self.assertIsNotNone(node.source_digest)
+        with patch("pgfgen.templating.SVGNode.parse") as parse:
+            restored = self.loader()("a.svg")
+            parse.assert_not_called()
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(node.source_digest, restored.source_digest)
+        self.assertEqual(SvgToPgf(node).code, SvgToPgf(restored).code)
+
+    def test_modified_file(self):
+        first = self.loader()("a.svg")
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as fp:
+            fp.write(SVG % "3.5")
+        node = self.loader()("a.svg")
+        self.assertEqual(2, self.cache.misses)
+        self.assertNotEqual(SvgToPgf(first).code, SvgToPgf(node).code)
+
+    def test_corrupted_entry(self):
+        node = self.loader()("a.svg")
+        with open(self.cache.path(SvgTreeCache.key(node.source_digest)), "wb") as fp:
+            fp.write(b"garbage")
+        self.assertEqual(SvgToPgf(node).code, SvgToPgf(self.loader()("a.svg")).code)
+
+    def test_context_bypasses_cache(self):
+        self.loader()("a.svg", context=[])
+        self.assertEqual(0, self.cache.misses)
+
+
+class TestSvgToPgfCaching(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as fp:
+            fp.write(SVG % "2")
+        self.cache = PgfCodeCache(os.path.join(self.tmp.name, "cache"))
+        self.loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        self.loader.compute_digests = True
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_code(self):
+        node = self.loader("a.svg")
+        self.assertIsNotNone(node.source_digest)
+        code = SvgToPgf(node, cache=self.cache).code
+        self.assertEqual(code, SvgToPgf(node).code)
+        self.assertEqual(1, self.cache.misses)
+        with patch.object(SvgToPgf, "_generate") as generate:
+            self.assertEqual(code, SvgToPgf(node, cache=self.cache).code)
+            generate.assert_not_called()
+        self.assertEqual(1, self.cache.hits)
+
+    def test_write(self):
+        node = self.loader("a.svg")
+        code = SvgToPgf(node, cache=self.cache).code
+        stream = io.StringIO()
+        with patch.object(SvgToPgf, "_generate") as generate:
+            SvgToPgf(node, cache=self.cache).write(stream)
+            generate.assert_not_called()
+        self.assertEqual(code, stream.getvalue())
+
+    def test_frags(self):
+        node = self.loader("a.svg")
+        code = SvgToPgf(node, cache=self.cache).frags["c"]
+        self.assertEqual(code, SvgToPgf(node).frags["c"])
+        self.assertEqual(code, SvgToPgf(node, cache=self.cache).frags["c"])
+        self.assertEqual(1, self.cache.hits)
+        with self.assertRaises(KeyError):
+            SvgToPgf(node, cache=self.cache).frags["inexistent"]
+
+    def test_no_digest(self):
+        self.loader.compute_digests = False
+        node = self.loader("a.svg")
+        self.assertIsNone(node.source_digest)
+        SvgToPgf(node, cache=self.cache).code
+        self.assertEqual(0, self.cache.misses)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -193,7 +193,88 @@ class TestPGFGenOptionsValidator(TestCase):
 
     def test_supported_keys(self):
         validator = PGFGenOptionsValidator("options")
-        self.assertEqual(["svg_path", "template_path"], validator.supported_keys)
+        self.assertEqual(
+            [
+                "svg_path",
+                "template_path",
+                "parse_cache_entries",
+                "parse_cache_source_bytes",
+                "cache_dir",
+                "cache_size",
+                "precision",
+                "decimals",
+                "intern_styles",
+                "unit",
+            ],
+            validator.supported_keys,
+        )
+
+    def test_validate_directory(self):
+        validator = PGFGenOptionsValidator("options")
+
+        self.assertTrue(validator.validate_directory({}, "foo_dir"))
+        self.assertTrue(validator.validate_directory({"foo_dir": "foo"}, "foo_dir"))
+        self.assertEqual([], validator.log)
+
+        self.assertFalse(validator.validate_directory({"foo_dir": ["foo"]}, "foo_dir"))
+        self.assertEqual(["error: options.foo_dir is not a string"], validator.log)
+
+    def test_validate_size(self):
+        validator = PGFGenOptionsValidator("options")
+
+        self.assertTrue(validator.validate_size({}, "foo_size"))
+        self.assertEqual([], validator.log)
+
+        self.assertTrue(validator.validate_size({"foo_size": 0}, "foo_size"))
+        self.assertTrue(validator.validate_size({"foo_size": 123}, "foo_size"))
+        self.assertEqual([], validator.log)
+
+        for value in (-1, 1.5, "1", True, None):
+            self.assertFalse(validator.validate_size({"foo_size": value}, "foo_size"))
+            self.assertEqual(
+                ["error: options.foo_size is not a non-negative integer"],
+                validator.log,
+            )
+            validator.log = []
+
+    def test_validate_number_format(self):
+        validator = PGFGenOptionsValidator("options")
+
+        for options in (
+            {},
+            {"precision": 1},
+            {"decimals": 0},
+            {"decimals": 5},
+            {"decimals": 2, "unit": "1cm"},
+            {"unit": " .5 in "},
+        ):
+            self.assertTrue(validator.validate_number_format(options))
+        self.assertEqual([], validator.log)
+
+        for options, message in (
+            ({"precision": 0}, "options.precision is not a positive integer"),
+            ({"decimals": 6}, "options.decimals is not an integer between 0 and 5"),
+            ({"precision": 4, "decimals": 2}, "options may not have both precision"),
+            ({"unit": "1em"}, "options.unit is not a length"),
+            ({"unit": 1}, "options.unit is not a length"),
+            ({"unit": "-1cm"}, "options.unit is not a length"),
+        ):
+            self.assertFalse(validator.validate_number_format(options))
+            self.assertEqual(1, len(validator.log))
+            self.assertIn(message, validator.log[0])
+            validator.log = []
+
+    def test_validate_flag(self):
+        validator = PGFGenOptionsValidator("options")
+
+        for options in ({}, {"intern_styles": True}, {"intern_styles": False}):
+            self.assertTrue(validator.validate_flag(options, "intern_styles"))
+        self.assertEqual([], validator.log)
+
+        self.assertFalse(validator.validate_flag({"intern_styles": 1}, "intern_styles"))
+        self.assertEqual(
+            ["error: options.intern_styles is not a boolean"], validator.log
+        )
 
     def test_validate_no_unsupported_keys(self):
         validator = PGFGenOptionsValidator("options")
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os.path
+import tempfile
+
+from jinja2 import DictLoader
+
+from unittest import TestCase
+from unittest import main
+
+from pgfgen.cache import SvgParseCache
+from pgfgen.exceptions import SvgFileNotFound
+from pgfgen.planning import TemplatePlan
+from pgfgen.planning import TemplatePlanner
+from pgfgen.templating import EnvironmentFactory
+from pgfgen.templating import SvgFileLoader
+from pgfgen.templating import SvgToPgf
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="20" height="10" id="svg">
+  <rect id="a" x="0" y="0" width="5" height="5"/>
+  <rect id="b" x="10" y="5" width="5" height="5"/>
+</svg>
+"""
+
+
+def plan(**templates: str) -> TemplatePlan:
+    factory = EnvironmentFactory([], [])
+    env = factory.get_environment()
+    env.loader = DictLoader(templates)
+    return TemplatePlanner(env).plan("main")
+
+
+class TestTemplatePlanner(TestCase):
+    def test_static_keys(self):
+        p = plan(
+            main="""
+(@ set pgf = svgtopgf(loadsvg("a.svg")) @)
+(( pgf.frags["a"] )) (( pgf.frags.b )) (( pgf.bbox.xmin ))
+"""
+        )
+        self.assertEqual({"a.svg": {"a", "b"}}, p.svg_files)
+        self.assertTrue(p.complete)
+        self.assertEqual({"a.svg": ("a", "b")}, p.selections())
+
+    def test_direct_use(self):
+        p = plan(main='(( svgtopgf(loadsvg("a.svg")).frags["x"] ))')
+        self.assertEqual({"a.svg": {"x"}}, p.svg_files)
+
+    def test_whole_code(self):
+        p = plan(
+            main="""
+(@ set pgf = svgtopgf(loadsvg("a.svg")) @)
+(( pgf.frags["a"] )) (( pgf.code ))
+"""
+        )
+        self.assertEqual({"a.svg": None}, p.svg_files)
+        self.assertEqual({}, p.selections())
+
+    def test_dynamic_key(self):
+        p = plan(
+            main="""
+(@ set pgf = svgtopgf(loadsvg("a.svg")) @)
+(( pgf.frags[key] ))
+"""
+        )
+        self.assertEqual({"a.svg": None}, p.svg_files)
+
+    def test_loader_arguments(self):
+        p = plan(main='(( svgtopgf(loadsvg("a.svg", reify=False)).frags["a"] ))')
+        self.assertEqual({"a.svg": None}, p.svg_files)
+
+    def test_dynamic_file_name(self):
+        p = plan(
+            main="""
+(( svgtopgf(loadsvg("a.svg")).frags["a"] ))
+(( svgtopgf(loadsvg(name)).code ))
+"""
+        )
+        self.assertFalse(p.complete)
+        self.assertEqual({}, p.selections())
+
+    def test_follows_extends_and_include(self):
+        p = plan(
+            main="""
+(@ extends "base" @)
+(@ block body @)(( pgf.frags["a"] ))(@ endblock @)
+""",
+            base="""
+(@ set pgf = svgtopgf(loadsvg("a.svg")) @)
+(@ block body @)(@ endblock @)
+(@ include "other" @)
+""",
+            other='(( svgtopgf(loadsvg("b.svg")).bbox ))',
+        )
+        self.assertEqual(["main", "base", "other"], p.templates)
+        self.assertEqual({"a.svg": {"a"}, "b.svg": set()}, p.svg_files)
+        self.assertTrue(p.complete)
+
+    def test_dynamic_include(self):
+        p = plan(main="(@ include name @)")
+        self.assertFalse(p.complete)
+
+
+class TestSvgFileLoaderPlan(TestCase):
+    def test_apply_plan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "a.svg"), "w") as f:
+                f.write(SVG)
+            loader = SvgFileLoader([tmp], SvgParseCache())
+            full = SvgToPgf(loader("a.svg"))
+            p = TemplatePlan()
+            p.require("a.svg", {"a"})
+            loader.apply_plan(p)
+            self.assertEqual({"a.svg": os.path.join(tmp, "a.svg")}, loader.resolved)
+            node = loader("a.svg")
+            self.assertEqual(["a"], [c.id for c in node.children])
+            planned = SvgToPgf(node)
+            self.assertEqual(full.frags["a"], planned.frags["a"])
+            self.assertEqual(full.bbox, planned.bbox)
+            # explicit ids take precedence over the plan
+            node = loader("a.svg", ids=["b"])
+            self.assertEqual(["b"], [c.id for c in node.children])
+
+    def test_unresolved_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "main.tex"), "w") as f:
+                f.write(
+                    '(@ if false @)(( svgtopgf(loadsvg("missing.svg")).code ))'
+                    "(@ endif @)done"
+                )
+            factory = EnvironmentFactory([tmp], [tmp], SvgParseCache(), plan=True)
+            env = factory.get_environment()
+            self.assertEqual("done", factory.get_template(env, "main.tex").render())
+            self.assertEqual({}, env.globals["loadsvg"].resolved)
+            with self.assertRaises(SvgFileNotFound):
+                env.globals["loadsvg"]("missing.svg")
+
+    def test_get_template(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "a.svg"), "w") as f:
+                f.write(SVG)
+            with open(os.path.join(tmp, "main.tex"), "w") as f:
+                f.write('(( svgtopgf(loadsvg("a.svg")).frags["b"] ))')
+            factory = EnvironmentFactory([tmp], [tmp], SvgParseCache(), plan=True)
+            env = factory.get_environment()
+            planned = factory.get_template(env, "main.tex").render()
+            self.assertEqual({"a.svg": ("b",)}, env.globals["loadsvg"].planned_ids)
+            factory.plan = False
+            env = factory.get_environment()
+            self.assertEqual(planned, factory.get_template(env, "main.tex").render())
+            self.assertEqual({}, env.globals["loadsvg"].planned_ids)
+
+
+if __name__ == "__main__":
+    main()
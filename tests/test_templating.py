@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import gzip
+import io
+import os
+import os.path
+import tempfile
+import zipfile
+
+from argparse import Namespace
+from unittest import TestCase
+from unittest import main
+from unittest.mock import patch
+
+from pgfgen.cache import SvgParseCache
+from pgfgen.svg.detached import DetachedElement
+from pgfgen.svg.formatting import EXACT
+from pgfgen.svg.formatting import NumberFormat
+from pgfgen.svg.nodes import SVGNode
+from pgfgen.templating import EnvironmentFactory
+from pgfgen.templating import SvgFileLoader
+from pgfgen.templating import StreamingSvgToPgf
+from pgfgen.templating import SvgToPgf
+from pgfgen.templating import SvgToPgfFactory
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="20" height="10" id="svg">
+  <rect id="a" x="0" y="0" width="%d" height="5"/>
+  <rect id="b" x="10" y="5" width="5" height="5"/>
+</svg>
+"""
+
+TEMPLATE = """
+(( svgtopgf(loadsvg("a.svg")).code ))
+(( svgtopgf(loadsvg("b.svg")).frags["b"] ))
+(( svgtopgf(loadsvg("c.svg")).bbox ))
+"""
+
+
+class TestSvgFileLoaderCompressed(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as f:
+            f.write(SVG % 5)
+        with gzip.open(os.path.join(self.tmp.name, "b.svgz"), "wt") as f:
+            f.write(SVG % 5)
+        self.loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        self.expected = SvgToPgf(self.loader("a.svg"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_load(self):
+        for name in ("b.svg", "b.svgz"):
+            pgf = SvgToPgf(self.loader(name))
+            self.assertEqual(self.expected.code, pgf.code)
+            self.assertEqual(self.expected.bbox, pgf.bbox)
+
+    def test_load_selection(self):
+        expected = SvgToPgf(self.loader("a.svg", ids=["b"]))
+        pgf = SvgToPgf(self.loader("b.svg", ids=["b"]))
+        self.assertEqual(expected.frags["b"], pgf.frags["b"])
+        self.assertEqual(expected.bbox, pgf.bbox)
+
+    def test_streaming(self):
+        source = self.loader("b.svg", streaming=True)
+        with patch("gzip.decompress") as decompress:
+            code = StreamingSvgToPgf(source).code
+            decompress.assert_not_called()
+        self.assertEqual(self.expected.code, code)
+
+
+class TestSvgFileLoaderArchive(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tmp.name, "lib.zip")
+        with zipfile.ZipFile(self.archive, "w") as z:
+            z.writestr("a.svg", SVG % 5)
+            z.writestr("icons/b.svgz", gzip.compress((SVG % 5).encode("utf-8")))
+        with open(os.path.join(self.tmp.name, "c.svg"), "w") as f:
+            f.write(SVG % 5)
+        self.cache = SvgParseCache()
+        self.loader = SvgFileLoader([self.tmp.name, self.archive], self.cache)
+        self.expected = SvgToPgf(self.loader("c.svg"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find(self):
+        self.assertEqual(self.archive + "/a.svg", self.loader.find("a.svg"))
+        self.assertEqual(
+            self.archive + "/icons/b.svgz", self.loader.find("icons/b.svg")
+        )
+        self.assertIsNone(self.loader.find("d.svg"))
+
+    def test_load(self):
+        for name in ("a.svg", "icons/b.svg"):
+            pgf = SvgToPgf(self.loader(name))
+            self.assertEqual(self.expected.code, pgf.code)
+            self.assertEqual(self.expected.bbox, pgf.bbox)
+        self.assertIs(self.loader("a.svg"), self.loader("a.svg"))
+        self.assertEqual(2, self.cache.hits)
+
+    def test_load_selection(self):
+        expected = SvgToPgf(self.loader("c.svg", ids="b"))
+        pgf = SvgToPgf(self.loader("a.svg", ids="b"))
+        self.assertEqual(expected.frags["b"], pgf.frags["b"])
+        self.assertEqual(expected.bbox, pgf.bbox)
+
+    def test_streaming(self):
+        code = StreamingSvgToPgf(self.loader("a.svg", streaming=True)).code
+        self.assertEqual(self.expected.code, code)
+        factory = SvgToPgfFactory(intern_styles=True)
+        source = self.loader("a.svg", streaming=True)
+        self.assertEqual(self.expected.code, factory(source).code)
+        with self.assertRaises(ValueError):
+            factory(source, intern_styles=True)
+
+    def test_prefetch(self):
+        self.loader.prefetch(["a.svg", "icons/b.svg"], jobs=2)
+        self.assertEqual(2, len(self.loader.prefetched))
+
+
+METADATA = "<defs><metadata><title>a</title></metadata></defs>"
+
+
+class TestSvgFileLoaderOptimize(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as f:
+            f.write((SVG % 5).replace("</svg>", METADATA + "</svg>"))
+        self.loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_optimize(self):
+        node = self.loader("a.svg")
+        self.assertIsNone(node.optimization)
+        self.assertEqual({}, self.loader.optimizations)
+        optimized = self.loader("a.svg", optimize=True)
+        self.assertIsNot(node, optimized)
+        self.assertEqual(SvgToPgf(node).code, SvgToPgf(optimized).code)
+        report = self.loader.optimizations["a.svg"]
+        self.assertIs(optimized.optimization, report)
+        self.assertGreaterEqual(report.bytes_removed, len(METADATA))
+        self.loader.optimize = True
+        self.assertIs(optimized, self.loader("a.svg"))
+        self.assertIs(node, self.loader("a.svg", optimize=False))
+
+    def test_streaming(self):
+        with self.assertRaises(ValueError):
+            self.loader("a.svg", streaming=True, optimize=True)
+
+
+class TestSvgFileLoaderSimplify(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        points = " ".join(f"{k},{k % 2 * 0.01}" for k in range(21))
+        polyline = f'<polyline id="p" points="{points}" stroke="black"/>'
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as f:
+            f.write((SVG % 5).replace("</svg>", polyline + "</svg>"))
+        self.loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_simplify(self):
+        node = self.loader("a.svg")
+        self.assertIsNone(node.simplification)
+        self.assertEqual({}, self.loader.simplifications)
+        simplified = self.loader("a.svg", simplify=0.01)
+        self.assertIsNot(node, simplified)
+        report = self.loader.simplifications["a.svg"]
+        self.assertIs(simplified.simplification, report)
+        self.assertEqual(21, report.vertices_before)
+        self.assertEqual(2, report.vertices_after)
+        self.assertEqual(node.svg2pgf_transform, simplified.svg2pgf_transform)
+        self.loader.simplify = 0.01
+        self.assertIs(simplified, self.loader("a.svg"))
+
+    def test_streaming(self):
+        with self.assertRaises(ValueError):
+            self.loader("a.svg", streaming=True, simplify=0.01)
+        self.loader.simplify = 0.01
+        self.assertIsNotNone(self.loader("a.svg", streaming=True))
+
+
+class TestSvgFileLoaderDetach(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "a.svg"), "w") as f:
+            f.write(SVG % 5)
+        with open(os.path.join(self.tmp.name, "t.svg"), "w") as f:
+            f.write('<svg xmlns="http://www.w3.org/2000/svg"><text>t</text></svg>')
+        self.loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_detach(self):
+        code = SvgToPgf(self.loader("a.svg")).code
+        loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        loader.detach = True
+        node = loader("a.svg")
+        self.assertIsInstance(node.element, DetachedElement)
+        self.assertEqual(code, SvgToPgf(node).code)
+        self.assertIs(node, loader("a.svg"))
+
+    def test_unsupported_elements(self):
+        code = SvgToPgf(self.loader("t.svg")).code
+        loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        loader.detach = True
+        node = loader("t.svg")
+        self.assertIsInstance(node.element, DetachedElement)
+        self.assertEqual(code, SvgToPgf(node).code)
+
+    def test_not_detachable(self):
+        self.loader.detach = True
+        with patch("pgfgen.templating.detach", side_effect=ValueError("shape")):
+            with self.assertWarnsRegex(UserWarning, "t.svg: shape"):
+                node = self.loader("t.svg")
+        self.assertNotIsInstance(node.element, DetachedElement)
+
+
+class TestSvgToPgfFactory(TestCase):
+    def setUp(self):
+        self.node = SVGNode.parse(io.StringIO(SVG % 5))
+
+    def test_number_format(self):
+        factory = SvgToPgfFactory()
+        self.assertIs(EXACT, factory(self.node).fmt)
+        self.assertEqual(NumberFormat(precision=3), factory(self.node, precision=3).fmt)
+        self.assertEqual(NumberFormat(decimals=2), factory(self.node, decimals=2).fmt)
+        with self.assertRaises(ValueError):
+            factory(self.node, precision=3, decimals=2)
+
+    def test_configured_number_format(self):
+        arguments = Namespace(template_path=None, svg_path=None)
+        factory = EnvironmentFactory.create(arguments, {"precision": 5})
+        svgtopgf = factory.get_environment().globals["svgtopgf"]
+        self.assertEqual(NumberFormat(precision=5), svgtopgf(self.node).fmt)
+        self.assertEqual(NumberFormat(decimals=1), svgtopgf(self.node, decimals=1).fmt)
+        code = svgtopgf(self.node).code
+        self.assertEqual(SvgToPgf(self.node, fmt=NumberFormat(precision=5)).code, code)
+        self.assertNotEqual(SvgToPgf(self.node).code, code)
+
+    def test_unit(self):
+        factory = SvgToPgfFactory(fmt=NumberFormat(decimals=2))
+        pgf = factory(self.node, unit="1in")
+        self.assertEqual(NumberFormat(decimals=2, unit=72.27), pgf.fmt)
+        self.assertIn(r"\pgfpathrectangle{\pgfqpoint{", pgf.code)
+        self.assertEqual(
+            NumberFormat(precision=3, unit=72.27),
+            factory(self.node, precision=3, unit="1in").fmt,
+        )
+        with self.assertRaises(ValueError):
+            factory(self.node, unit="1em")
+
+    def test_configured_unit(self):
+        arguments = Namespace(template_path=None, svg_path=None, unit="1pt")
+        factory = EnvironmentFactory.create(arguments, {"unit": "1in"})
+        svgtopgf = factory.get_environment().globals["svgtopgf"]
+        self.assertEqual(NumberFormat(unit=1.0), svgtopgf(self.node).fmt)
+        # the unit is kept when numbers are rounded otherwise
+        fmt = svgtopgf(self.node, decimals=1).fmt
+        self.assertEqual(NumberFormat(decimals=1, unit=1.0), fmt)
+        arguments.unit = None
+        factory = EnvironmentFactory.create(arguments, {"unit": "1in"})
+        svgtopgf = factory.get_environment().globals["svgtopgf"]
+        self.assertEqual(NumberFormat(unit=72.27), svgtopgf(self.node).fmt)
+
+    def test_intern_styles(self):
+        factory = SvgToPgfFactory()
+        self.assertFalse(factory(self.node).intern_styles)
+        pgf = factory(self.node, intern_styles=True)
+        self.assertTrue(pgf.intern_styles)
+        # both rectangles are filled with the default color, the macro is
+        # defined within the scope of the figure, after the scale factor
+        lines = pgf.code.split("\n")
+        self.assertTrue(lines[0].startswith("\\begin{pgfscope}"))
+        definition = lines.index("  \\def\\pgfgen@style@a{%")
+        self.assertIn("scale factor", lines[definition - 1])
+        self.assertEqual(2, pgf.code.count("\n    \\pgfgen@style@a\n"))
+        self.assertNotIn("pgfgen@style", pgf.frags["a"])
+        buffer = io.StringIO()
+        pgf.write(buffer)
+        self.assertEqual(pgf.code, buffer.getvalue())
+
+    def test_configured_intern_styles(self):
+        arguments = Namespace(template_path=None, svg_path=None)
+        factory = EnvironmentFactory.create(arguments, {"intern_styles": True})
+        svgtopgf = factory.get_environment().globals["svgtopgf"]
+        self.assertTrue(svgtopgf(self.node).intern_styles)
+        self.assertFalse(svgtopgf(self.node, intern_styles=False).intern_styles)
+
+
+PREAMBLE_TEMPLATE = """(@ set b = svgtopgf(loadsvg("b.svg")) @)
+(( svgtopgf(loadsvg("a.svg")).code ))
+%%
+(( pgfgen_preamble ))
+%%
+(( svgtopgf(loadsvg("a.svg")).code ))
+(( b.frags["b"] ))
+"""
+
+
+class TestStyleRegistry(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for i, name in enumerate(("a.svg", "b.svg")):
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write(SVG % (i + 1))
+        with open(os.path.join(self.tmp.name, "main.tex"), "w") as f:
+            f.write(PREAMBLE_TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_preamble(self):
+        factory = EnvironmentFactory([self.tmp.name], [self.tmp.name], SvgParseCache())
+        env = factory.get_environment()
+        text = factory.get_template(env, "main.tex").render()
+        self.assertNotIn("pgfgen preamble", text)
+        (before, preamble, after) = text.split("\n%%\n")
+        # the figure rendered before the preamble is self-contained
+        self.assertNotIn("pgfgen@docstyle", before)
+        self.assertIn(r"\definecolor{fillcolor}{HTML}{000000}", before)
+        self.assertEqual(
+            [
+                r"\definecolor{pgfgen@color@000000}{HTML}{000000}",
+                r"\def\pgfgen@docstyle@a{%",
+                r"  \pgfsetfillcolor{pgfgen@color@000000}",
+                r"  \pgfsetfillopacity{1.0}",
+            ],
+            preamble.splitlines()[:4],
+        )
+        self.assertEqual(1, preamble.count(r"\def\pgfgen"))
+        self.assertTrue(preamble.endswith("\n}"))
+        self.assertNotIn("definecolor", after)
+        self.assertEqual(3, after.count("\\pgfgen@docstyle@a\n"))
+        # each render has its own registry
+        self.assertEqual(text, env.get_template("main.tex").render())
+
+    def test_render_without_preamble(self):
+        factory = EnvironmentFactory([self.tmp.name], [self.tmp.name], SvgParseCache())
+        env = factory.get_environment()
+        factory.get_template(env, "main.tex").render()
+        template = env.from_string('(( svgtopgf(loadsvg("a.svg")).code ))')
+        text = template.render()
+        self.assertNotIn("pgfgen@docstyle", text)
+        self.assertIn(r"\definecolor{fillcolor}{HTML}{000000}", text)
+
+
+class TestSvgFileLoaderPrefetch(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for i, name in enumerate(("a.svg", "b.svg", "c.svg")):
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write(SVG % (i + 1))
+        with open(os.path.join(self.tmp.name, "main.tex"), "w") as f:
+            f.write(TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prefetch(self):
+        loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        loader.prefetch(["a.svg", "b.svg", "missing.svg"], 2)
+        self.assertEqual(2, len(loader.prefetched))
+        with patch("pgfgen.svg.nodes.SVGNode.parse") as parse:
+            node = loader("a.svg")
+        parse.assert_not_called()
+        self.assertEqual(1, len(loader.prefetched))
+        expected = SvgToPgf(SvgFileLoader([self.tmp.name], SvgParseCache())("a.svg"))
+        self.assertEqual(expected.code, SvgToPgf(node).code)
+        # the parsed tree is cached as usual
+        self.assertIs(node, loader("a.svg"))
+
+    def test_prefetched_consumed_on_cache_hit(self):
+        cache = SvgParseCache()
+        loader = SvgFileLoader([self.tmp.name], cache)
+        loader.prefetch(["a.svg", "b.svg"], 2)
+        # another loader sharing the cache loads the file meanwhile
+        node = SvgFileLoader([self.tmp.name], cache)("a.svg")
+        self.assertIs(node, loader("a.svg"))
+        self.assertEqual(1, len(loader.prefetched))
+
+    def test_prefetch_planned_ids(self):
+        loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        loader.planned_ids["b.svg"] = ("b",)
+        loader.prefetch(["a.svg", "b.svg"], 2)
+        node = loader("b.svg")
+        self.assertEqual(["b"], [c.id for c in node.children])
+        # bounding box of the whole document
+        self.assertEqual((0.0, 0.0, 15.0, 10.0), node.svg_bbox())
+        self.assertEqual(1, len(loader.prefetched))
+        self.assertEqual(1, len(loader.document_bboxes))
+
+    def test_prefetch_single_file(self):
+        loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        with patch("pgfgen.templating.ProcessPoolExecutor") as pool:
+            loader.prefetch(["a.svg"], 2)
+            loader.prefetch(["a.svg", "b.svg"], 1)
+        pool.assert_not_called()
+        self.assertEqual({}, loader.prefetched)
+
+    def test_prefetch_skips_cached(self):
+        loader = SvgFileLoader([self.tmp.name], SvgParseCache())
+        loader("a.svg")
+        loader("b.svg")
+        with patch("pgfgen.templating.ProcessPoolExecutor") as pool:
+            loader.prefetch(["a.svg", "b.svg"], 2)
+        pool.assert_not_called()
+
+    def test_get_template_with_jobs(self):
+        path = [self.tmp.name]
+        factory = EnvironmentFactory(path, path, SvgParseCache(), jobs=2)
+        env = factory.get_environment()
+        with patch.object(SvgFileLoader, "prefetch") as prefetch:
+            factory.get_template(env, "main.tex")
+        prefetch.assert_called_once()
+        self.assertEqual(["a.svg", "b.svg", "c.svg"], sorted(prefetch.call_args[0][0]))
+        self.assertEqual(2, prefetch.call_args[0][1])
+
+        serial = EnvironmentFactory(path, path, SvgParseCache())
+        env = serial.get_environment()
+        expected = serial.get_template(env, "main.tex").render()
+        env = factory.get_environment()
+        self.assertEqual(expected, factory.get_template(env, "main.tex").render())
+        self.assertEqual({}, env.globals["loadsvg"].prefetched)
+
+
+if __name__ == "__main__":
+    main()
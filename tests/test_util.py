@@ -4,6 +4,7 @@ from unittest import TestCase, main
 from pgfgen.exceptions import InvalidPath
 from pgfgen.util import split_sanitize_path
 from pgfgen.util import find_in_search_path
+from pgfgen.util import svg_variants
 
 
 class TestUtilFunctions(TestCase):
@@ -46,6 +47,29 @@ class TestUtilFunctions(TestCase):
         result = find_in_search_path(search_path, "inexistent", exists)
         self.assertIsNone(result)
 
+    def test_find_in_search_path_variants(self):
+        filesystem = {"/a/foo.svgz", "/a/bar.svg", "/b/bar.svg", "/b/foo.svg"}
+        search_path = ["/a", "/b"]
+
+        def exists(f: str) -> bool:
+            return f in filesystem
+
+        def find(path: str) -> str | None:
+            return find_in_search_path(search_path, path, exists, svg_variants)
+
+        self.assertEqual("/a/foo.svgz", find("foo.svg"))
+        self.assertEqual("/a/foo.svgz", find("foo.svgz"))
+        self.assertEqual("/a/bar.svg", find("bar.svg"))
+        self.assertIsNone(find("bar.svgz"))
+        self.assertIsNone(find("foo"))
+        result = find_in_search_path(search_path, "foo.svg", exists)
+        self.assertEqual("/b/foo.svg", result)
+
+    def test_svg_variants(self):
+        self.assertEqual(("a.svg", "a.svgz"), svg_variants("a.svg"))
+        self.assertEqual(("a.svgz",), svg_variants("a.svgz"))
+        self.assertEqual(("a.txt",), svg_variants("a.txt"))
+
 
 if __name__ == "__main__":
     main()  # pragma: no cover